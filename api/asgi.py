@@ -0,0 +1,405 @@
+"""
+Async (ASGI) serving mode for VerifyAI
+
+Serves the same routes as api/index.py. The model-bound endpoints
+(/api/verify, /api/analyze, /api/startup, /api/bio-authenticity) run
+natively on the event loop with non-blocking model calls, so one process
+can keep hundreds of requests in flight; every other route is bridged to
+the Flask app unchanged.
+
+Run from the repository root:
+    pip install -r requirements-asgi.txt
+    uvicorn api.asgi:app --host 0.0.0.0 --port 5000
+"""
+
+import os
+import json
+import time
+import asyncio
+import functools
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.middleware.wsgi import WSGIMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Mount, Route
+from api import index as flask_api
+from api.index import UploadError
+from lib import deadline, metrics
+from lib.image_pipeline import ImageTooLargeError
+from lib.key_pool import KeysExhausted
+from lib.metrics import stage, record_fallback
+from lib.singleflight import AsyncSingleFlight
+
+# Model calls allowed in flight at once, and requests allowed to wait for a slot before 503
+ASGI_MAX_IN_FLIGHT = int(os.getenv('ASGI_MAX_IN_FLIGHT', '256'))
+ASGI_MAX_QUEUED = int(os.getenv('ASGI_MAX_QUEUED', '1024'))
+# Cap on a single model call attempt (seconds); retries and hedges share the request deadline
+ASGI_MODEL_TIMEOUT = float(os.getenv('ASGI_MODEL_TIMEOUT', '25'))
+# Threads for CPU-bound preprocessing and the synchronous bio-authenticity analyzer
+ASGI_BLOCKING_WORKERS = int(os.getenv('ASGI_BLOCKING_WORKERS', '32'))
+
+_blocking_executor = ThreadPoolExecutor(max_workers=ASGI_BLOCKING_WORKERS, thread_name_prefix='asgi-blocking')
+
+
+class Overloaded(Exception):
+    """Raised when the model-call queue is full"""
+
+
+class Backpressure:
+    """
+    Caps concurrent model calls and sheds load once too many requests are
+    already waiting, so latency stays bounded instead of queueing forever.
+    """
+
+    def __init__(self, max_in_flight, max_queued):
+        self.max_in_flight = max_in_flight
+        self.max_queued = max_queued
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._semaphore = None
+
+    async def __aenter__(self):
+        if self._semaphore is None:
+            # Created lazily so it binds to the serving event loop
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        if self._semaphore.locked() and self.waiting >= self.max_queued:
+            self.rejected += 1
+            raise Overloaded('Server is at capacity, retry shortly')
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    def stats(self):
+        return {
+            'in_flight': self.in_flight,
+            'waiting': self.waiting,
+            'rejected': self.rejected,
+            'max_in_flight': self.max_in_flight,
+            'max_queued': self.max_queued
+        }
+
+
+backpressure = Backpressure(ASGI_MAX_IN_FLIGHT, ASGI_MAX_QUEUED)
+single_flight = AsyncSingleFlight()
+
+
+async def _run_blocking(func, *args):
+    """Run a blocking function on the shared executor, in a copy of the request context"""
+    loop = asyncio.get_running_loop()
+    call = functools.partial(contextvars.copy_context().run, func, *args)
+    return await loop.run_in_executor(_blocking_executor, call)
+
+
+def instrumented(endpoint):
+    """Record latency, status and stage timings for a native handler, like index.py's hooks"""
+    def decorator(handler):
+        @functools.wraps(handler)
+        async def wrapper(request):
+            started = time.perf_counter()
+            metrics.start_request(endpoint)
+            deadline.start(flask_api.REQUEST_DEADLINE)
+            response = await handler(request)
+            metrics.REQUEST_DURATION.observe(time.perf_counter() - started, endpoint=endpoint)
+            metrics.REQUESTS.inc(endpoint=endpoint, status=response.status_code)
+            timings = metrics.request_timings()
+            if flask_api.SERVER_TIMING_ENABLED and timings:
+                response.headers['Server-Timing'] = metrics.server_timing_header(timings)
+            return response
+        return wrapper
+    return decorator
+
+
+async def generate_content_async(model, contents):
+    """Non-blocking model call with retries and hedging within the request deadline"""
+    return await flask_api.model_caller.generate_async(model, contents, timeout=ASGI_MODEL_TIMEOUT)
+
+
+async def run_image_analysis_async(endpoint, image_data):
+    """Async counterpart of index.run_image_analysis, same results and fallbacks"""
+    cache_key, cached = flask_api._cache_lookup(image_data, endpoint, flask_api.IMAGE_ENDPOINTS[endpoint][0])
+    if cached is not None:
+        return cached, True
+
+    result, shared = await single_flight.do(cache_key, lambda: _run_model_analysis(endpoint, image_data, cache_key))
+    if not shared:
+        flask_api._record_report(endpoint, result)
+    return result, False
+
+
+async def _run_model_analysis(endpoint, image_data, cache_key):
+    """Preprocess the image and make the model call for run_image_analysis_async"""
+    prompt, mock_result = flask_api.IMAGE_ENDPOINTS[endpoint]
+    try:
+        with stage('preprocess'):
+            image = await _run_blocking(flask_api.image_preprocessor.prepare, image_data)
+        scope = flask_api._near_duplicate_scope(endpoint, prompt)
+        near_duplicate, reused = await _run_blocking(flask_api._near_duplicate, image, endpoint, scope)
+        if reused is not None:
+            result = {**reused, 'near_duplicate': near_duplicate}
+            flask_api._cache_store(cache_key, result)
+            return result
+
+        model = flask_api.model_registry.for_endpoint(endpoint)
+        async with backpressure:
+            with stage('model_call'):
+                response = await generate_content_async(model, [prompt, image.as_model_part()])
+
+        with stage('parse'):
+            result = flask_api._parse_model_json(response.text)
+        if near_duplicate:
+            result['near_duplicate'] = near_duplicate
+        flask_api._cache_store(cache_key, result)
+        await _run_blocking(flask_api._remember_near_duplicate, image, scope, cache_key)
+        return result
+
+    except (ImageTooLargeError, Overloaded):
+        raise
+    except json.JSONDecodeError:
+        record_fallback(endpoint, 'parse')
+        return {**mock_result, 'note': 'Using mock data - JSON parsing failed'}
+    except KeysExhausted:
+        record_fallback(endpoint, 'quota')
+        return {**mock_result, 'note': 'Using mock data - API quota exhausted'}
+    except TimeoutError:
+        record_fallback(endpoint, 'timeout')
+        return {**mock_result, 'note': 'Using mock data - model call timed out'}
+    except Exception as e:
+        record_fallback(endpoint, 'error')
+        return {**mock_result, 'note': f'Using mock data - {str(e)}'}
+
+
+@instrumented('health')
+async def health(request):
+    """Health check endpoint"""
+    return JSONResponse({
+        **flask_api.health_payload(),
+        'serving': 'asgi',
+        'backpressure': backpressure.stats(),
+        'coalescing': single_flight.stats()
+    })
+
+
+@instrumented('verify')
+async def verify_identity(request):
+    """Verify identity from image"""
+    return await _image_analysis_response(request, 'verify')
+
+
+@instrumented('analyze')
+async def analyze_image(request):
+    """Analyze image for deepfake detection"""
+    return await _image_analysis_response(request, 'analyze')
+
+
+async def _image_analysis_response(request, endpoint):
+    """Shared handler for the single-prompt image endpoints"""
+    start_time = time.time()
+
+    try:
+        try:
+            with stage('decode'):
+                image_data, _ = await _read_image_request(request)
+        except UploadError as e:
+            return JSONResponse({'error': str(e)}, status_code=e.status_code)
+
+        try:
+            result, cache_hit = await run_image_analysis_async(endpoint, image_data)
+        except ImageTooLargeError as e:
+            return JSONResponse({'error': str(e)}, status_code=413)
+        except Overloaded as e:
+            return _overloaded_response(e)
+
+        result['processingTime'] = f"{(time.time() - start_time) * 1000:.2f}ms"
+        return JSONResponse(result, headers={'X-Cache': 'HIT'} if cache_hit else None)
+
+    except Exception as e:
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+@instrumented('startup')
+async def analyze_startup(request):
+    """Analyze startup idea"""
+    start_time = time.time()
+
+    try:
+        try:
+            data = json.loads(await _read_body(request))
+        except (UploadError, ValueError):
+            data = None
+
+        if not isinstance(data, dict) or 'idea' not in data:
+            return JSONResponse({'error': 'Missing idea text'}, status_code=400)
+
+        cached = flask_api._startup_cache_lookup(data.get('idea'))
+        if cached is not None:
+            cached['processingTime'] = f"{(time.time() - start_time) * 1000:.2f}ms"
+            return JSONResponse(cached, headers={'X-Cache': 'HIT'})
+
+        try:
+            model = flask_api.model_registry.for_endpoint('startup')
+            async with backpressure:
+                with stage('model_call'):
+                    response = await generate_content_async(model, flask_api.STARTUP_PROMPT.format(idea=data.get('idea')))
+            with stage('parse'):
+                result = flask_api._parse_model_json(response.text)
+            flask_api._startup_cache_store(data.get('idea'), result)
+        except Overloaded as e:
+            return _overloaded_response(e)
+        except json.JSONDecodeError:
+            record_fallback('startup', 'parse')
+            result = {**flask_api.STARTUP_MOCK_RESULT, 'note': 'Using mock data - JSON parsing failed'}
+        except KeysExhausted:
+            record_fallback('startup', 'quota')
+            result = {**flask_api.STARTUP_MOCK_RESULT, 'note': 'Using mock data - API quota exhausted'}
+        except TimeoutError:
+            record_fallback('startup', 'timeout')
+            result = {**flask_api.STARTUP_MOCK_RESULT, 'note': 'Using mock data - model call timed out'}
+        except Exception as e:
+            record_fallback('startup', 'error')
+            result = {**flask_api.STARTUP_MOCK_RESULT, 'note': f'Using mock data - {str(e)}'}
+
+        result['processingTime'] = f"{(time.time() - start_time) * 1000:.2f}ms"
+        return JSONResponse(result)
+
+    except Exception as e:
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+@instrumented('bio-authenticity')
+async def bio_authenticity(request):
+    """
+    Comprehensive Bio-Authenticity analysis. The analyzer's own fan-out runs
+    on the blocking executor, so the event loop stays free while it waits.
+    """
+    start_time = time.time()
+
+    try:
+        try:
+            with stage('decode'):
+                image_data, params = await _read_image_request(request)
+            stated_age = flask_api._int_param(params, 'stated_age')
+            mode = params.get('mode')
+            if mode and mode not in flask_api.BioAuthenticityAnalyzer.ANALYSIS_MODES:
+                raise UploadError(f'Unknown mode: {mode}')
+        except UploadError as e:
+            return JSONResponse({'error': str(e)}, status_code=e.status_code)
+
+        try:
+            cache_key, cached = flask_api._cache_lookup(
+                image_data, 'bio-authenticity', flask_api._bio_prompt_version(mode, stated_age)
+            )
+            if cached is not None:
+                cached['processingTime'] = f"{(time.time() - start_time) * 1000:.2f}ms"
+                return JSONResponse(cached, headers={'X-Cache': 'HIT'})
+
+            report, _ = await single_flight.do(
+                cache_key,
+                lambda: _run_bio_report(image_data, stated_age, mode, cache_key)
+            )
+            report['processingTime'] = f"{(time.time() - start_time) * 1000:.2f}ms"
+            return JSONResponse(report)
+
+        except ImageTooLargeError as e:
+            return JSONResponse({'error': str(e)}, status_code=413)
+        except Overloaded as e:
+            return _overloaded_response(e)
+        except Exception as e:
+            return JSONResponse({
+                'status': 'error',
+                'message': str(e),
+                'processingTime': f"{(time.time() - start_time) * 1000:.2f}ms"
+            })
+
+    except Exception as e:
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+
+async def _run_bio_report(image_data, stated_age, mode, cache_key):
+    """Run index._run_bio_report on the blocking executor under backpressure"""
+    async with backpressure:
+        return await _run_blocking(flask_api._run_bio_report, image_data, stated_age, mode, cache_key)
+
+
+def _overloaded_response(error):
+    return JSONResponse({'error': str(error)}, status_code=503, headers={'Retry-After': '1'})
+
+
+async def _read_image_request(request: Request):
+    """
+    Return (image bytes, params) for any supported upload form, mirroring
+    index._read_image_request: raw body, multipart 'image' file or JSON base64
+    """
+    mimetype = request.headers.get('content-type', '').split(';')[0].strip().lower()
+
+    if mimetype == 'application/octet-stream' or mimetype.startswith('image/'):
+        image_data = await _read_body(request)
+        if not image_data:
+            raise UploadError('Missing image data')
+        return image_data, request.query_params
+
+    if mimetype == 'multipart/form-data':
+        _check_content_length(request)
+        form = await request.form()
+        upload = form.get('image')
+        if upload is None or isinstance(upload, str):
+            raise UploadError('Missing image data')
+        return await upload.read(), form
+
+    try:
+        data = json.loads(await _read_body(request))
+    except ValueError:
+        data = None
+    if not isinstance(data, dict) or not data.get('image'):
+        raise UploadError('Missing image data')
+    return flask_api._decode_base64_image(data['image']), data
+
+
+async def _read_body(request: Request) -> bytes:
+    """Read a request body into a single buffer bounded by MAX_UPLOAD_BYTES"""
+    _check_content_length(request)
+    chunks = []
+    total = 0
+    async for chunk in request.stream():
+        total += len(chunk)
+        if total > flask_api.MAX_UPLOAD_BYTES:
+            raise UploadError('Image too large', 413)
+        chunks.append(chunk)
+    return b''.join(chunks)
+
+
+def _check_content_length(request: Request):
+    length = request.headers.get('content-length')
+    if length and length.isdigit() and int(length) > flask_api.MAX_UPLOAD_BYTES:
+        raise UploadError('Image too large', 413)
+
+
+app = Starlette(middleware=[
+    Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])
+], routes=[
+    Route('/api/health', health, methods=['GET']),
+    Route('/api/verify', verify_identity, methods=['POST']),
+    Route('/api/analyze', analyze_image, methods=['POST']),
+    Route('/api/startup', analyze_startup, methods=['POST']),
+    Route('/api/bio-authenticity', bio_authenticity, methods=['POST']),
+    # Everything else (batch, streaming, static, cache stats) is served by the Flask app
+    Mount('/', app=WSGIMiddleware(flask_api.app)),
+])
+
+
+if __name__ == '__main__':
+    import uvicorn
+    port = int(os.getenv('PORT', '5000'))
+    uvicorn.run(app, host='0.0.0.0', port=port)
@@ -2,171 +2,896 @@ import os
 import json
 import time
 import base64
-from io import BytesIO
-from flask import Flask, render_template, request, jsonify, send_from_directory
+import hashlib
+import binascii
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import contextvars
+from flask import Flask, Response, render_template, request, jsonify, send_from_directory, g
 from flask_cors import CORS
-from PIL import Image
-import google.generativeai as genai
+from werkzeug.exceptions import RequestEntityTooLarge
 from dotenv import load_dotenv
-from lib.bio_authenticity import BioAuthenticityAnalyzer
+from lib.bio_authenticity import BioAuthenticityAnalyzer, PixelPrescreen, TierPolicy
+from lib.face_regions import FaceRegionLocator
+from lib.key_pool import KeyPool, KeysExhausted, parse_model_variants
+from lib.model_backends import backend_from_env
+from lib.model_registry import ModelRegistry
+from lib.result_cache import ResultCache, DiskCacheBackend, SqliteCacheBackend
+from lib.semantic_cache import SemanticCache
+from lib.singleflight import SingleFlight
+from lib.image_pipeline import ImagePreprocessor, ImageTooLargeError
+from lib.keyframes import KeyframeSelector, UnsupportedClipError, iter_clip_frames, iter_sequence_frames
+from lib.report_store import ReportStore, parse_time
+from lib.job_queue import JobQueue, JobWorkerPool, QueueFullError, valid_callback_url
+from lib import deadline, metrics
+from lib.deadline import CallPolicy, ModelCaller
+from lib.metrics import stage, record_fallback
 
 load_dotenv()
 
 app = Flask(__name__, static_folder='../public', static_url_path='')
 CORS(app)
 
-# Load API key from environment variable only
-GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
-if not GEMINI_API_KEY:
+# MODEL_BACKEND: gemini (default) or fake, a local stand-in for benchmarks and offline work
+MODEL_BACKEND = os.getenv('MODEL_BACKEND', 'gemini').lower()
+
+# Load API keys from environment variables only; GEMINI_API_KEYS (comma-separated) adds keys to the pool
+GEMINI_API_KEYS = [key.strip() for key in os.getenv('GEMINI_API_KEYS', '').split(',') if key.strip()]
+GEMINI_API_KEY = os.getenv('GEMINI_API_KEY') or (GEMINI_API_KEYS[0] if GEMINI_API_KEYS else None)
+if GEMINI_API_KEY and GEMINI_API_KEY not in GEMINI_API_KEYS:
+    GEMINI_API_KEYS.insert(0, GEMINI_API_KEY)
+if not GEMINI_API_KEY and MODEL_BACKEND == 'gemini':
     raise ValueError('GEMINI_API_KEY environment variable is not set. Please configure it in your environment.')
-# Configure Gemini API
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
-else:
-    print('WARNING: GEMINI_API_KEY not configured. Some features will be unavailable.')
 
-bio_analyzer = BioAuthenticityAnalyzer(GEMINI_API_KEY)
+model_backend = backend_from_env(os.environ, GEMINI_API_KEY)
+
+# Model calls are spread over every key (and MODEL_VARIANTS), each with a token bucket of
+# GEMINI_KEY_RPM requests per minute (0 disables it); throttled or failing keys cool down
+# while another key or variant can take their calls
+key_pool = KeyPool(
+    GEMINI_API_KEYS,
+    model_backend,
+    requests_per_minute=float(os.getenv('GEMINI_KEY_RPM', '0')),
+    burst=float(os.getenv('GEMINI_KEY_BURST', '0')) or None,
+    routing=os.getenv('KEY_POOL_ROUTING', 'least-loaded').lower(),
+    cooldown=float(os.getenv('KEY_POOL_COOLDOWN', '30')),
+    max_cooldown=float(os.getenv('KEY_POOL_MAX_COOLDOWN', '300')),
+    error_threshold=int(os.getenv('KEY_POOL_ERROR_THRESHOLD', '3')),
+    max_wait=float(os.getenv('KEY_POOL_MAX_WAIT', '5')),
+    model_variants=parse_model_variants(os.getenv('MODEL_VARIANTS'))
+) if GEMINI_API_KEYS else None
+
+# Models are built once per process; each endpoint picks its model through config
+GEMINI_MODEL = os.getenv('GEMINI_MODEL', 'gemini-1.5-flash')
+model_registry = ModelRegistry(
+    default_model=GEMINI_MODEL,
+    backend=model_backend,
+    key_pool=key_pool,
+    endpoint_models={
+        'verify': os.getenv('VERIFY_MODEL'),
+        'analyze': os.getenv('ANALYZE_MODEL'),
+        'startup': os.getenv('STARTUP_MODEL'),
+        'bio-authenticity': os.getenv('BIO_MODEL')
+    }
+)
+# MODEL_WARMUP: off, on (build clients) or probe (also open the connection)
+MODEL_WARMUP = os.getenv('MODEL_WARMUP', 'on').lower()
+if MODEL_WARMUP in ('on', 'probe'):
+    model_registry.warm_up_in_background(probe=MODEL_WARMUP == 'probe')
+
+# Deadline budget (seconds) shared by all model calls of a request; keep it under the platform's 30s limit
+REQUEST_DEADLINE = float(os.getenv('REQUEST_DEADLINE', '27')) or None
+
+# Model calls retry transient failures with jittered backoff and send a hedged
+# duplicate once an attempt is slower than MODEL_HEDGE_PERCENTILE (0 disables)
+model_caller = ModelCaller(
+    CallPolicy(
+        max_attempts=int(os.getenv('MODEL_MAX_ATTEMPTS', '3')),
+        base_delay=float(os.getenv('MODEL_RETRY_BASE_DELAY', '0.25')),
+        max_delay=float(os.getenv('MODEL_RETRY_MAX_DELAY', '2')),
+        hedge_percentile=float(os.getenv('MODEL_HEDGE_PERCENTILE', '95')),
+        hedge_min_samples=int(os.getenv('MODEL_HEDGE_MIN_SAMPLES', '20'))
+    ),
+    max_workers=int(os.getenv('MODEL_CALL_WORKERS', '64'))
+)
+
+# Bio-authenticity fan-out: parallel feature analyses and per-call deadline (seconds)
+BIO_MAX_CONCURRENCY = int(os.getenv('BIO_MAX_CONCURRENCY', '3'))
+BIO_CALL_TIMEOUT = float(os.getenv('BIO_CALL_TIMEOUT', '25')) or None
+# Default analysis mode: per_feature (one call per analysis), fused (single call) or
+# tiered (BIO_TIERS in order, skipping the rest once the BIO_TIER_DECISIONS verdicts are settled)
+BIO_ANALYSIS_MODE = os.getenv('BIO_ANALYSIS_MODE', 'per_feature')
+BIO_TIERS = os.getenv('BIO_TIERS', 'skin,eye|dental')
+BIO_TIER_DECISIONS = os.getenv('BIO_TIER_DECISIONS', 'authenticity,manipulation')
+# Local pixel pre-screen: off, observe (attach stats only), downgrade (fused call
+# when confident) or skip (local skin analysis when confident)
+PRESCREEN_POLICY = os.getenv('PRESCREEN_POLICY', 'off').lower()
+# Send each bio-authenticity analysis only its face region: off, auto (OpenCV Haar
+# cascades when installed, else a skin-tone heuristic), haar or skin
+BIO_REGION_CROPS = os.getenv('BIO_REGION_CROPS', 'off').lower()
+
+VERIFY_PROMPT = """Analyze this face image for identity verification. Provide a JSON response with:
+1. faceMatch: confidence score (0-1)
+2. ageEstimate: estimated age
+3. livenessScore: liveness detection score (0-1)
+4. status: VERIFIED or FAILED
+Return ONLY valid JSON, no other text."""
+
+VERIFY_FRAMES_PROMPT = """These images are keyframes from a short clip of one person, in time order. Analyze them together for identity verification and liveness. A live person shows natural changes between frames (blinks, head turns, expression changes, parallax, lighting shifts); a printed photo or a screen replay shows none, or moves as one flat surface. Provide a JSON response with:
+1. faceMatch: confidence score (0-1) that every frame shows the same real face
+2. ageEstimate: estimated age
+3. livenessScore: liveness detection score (0-1) based on the changes across frames
+4. sameSubject: true or false
+5. motionEvidence: list of natural motion cues seen
+6. spoofIndicators: brief description, or none
+7. status: VERIFIED or FAILED
+Return ONLY valid JSON, no other text."""
+
+ANALYZE_PROMPT = """Analyze this image for deepfake detection. Provide a JSON response with:
+1. deepfakeScore: probability of being deepfake (0-1)
+2. faceDetection: face detection confidence (0-1)
+3. contentAnalysis: description of content
+4. authenticity: Genuine or Suspicious
+Return ONLY valid JSON, no other text."""
+
+STARTUP_PROMPT = """Analyze this startup idea: "{idea}"
+            
+Provide a JSON response with:
+1. marketPotential: score 0-10
+2. tam: Total Addressable Market estimate
+3. sam: Serviceable Available Market estimate
+4. som: Serviceable Obtainable Market estimate
+5. competitorCount: estimated number of competitors
+6. startupGrade: A-F grading
+7. keyInsights: brief insights
+
+Return ONLY valid JSON, no other text."""
+
+VERIFY_MOCK_RESULT = {
+    'faceMatch': 0.98,
+    'ageEstimate': 28,
+    'livenessScore': 0.96,
+    'status': 'VERIFIED'
+}
+
+ANALYZE_MOCK_RESULT = {
+    'deepfakeScore': 0.02,
+    'faceDetection': 0.99,
+    'contentAnalysis': 'Natural image',
+    'authenticity': 'Genuine'
+}
+
+STARTUP_MOCK_RESULT = {
+    'marketPotential': 8.5,
+    'tam': '$50B',
+    'sam': '$5B',
+    'som': '$500M',
+    'competitorCount': 12,
+    'startupGrade': 'A',
+    'keyInsights': 'High market demand with moderate competition.'
+}
+
+# Single-prompt image endpoints: name -> (prompt, mock fallback)
+IMAGE_ENDPOINTS = {
+    'verify': (VERIFY_PROMPT, VERIFY_MOCK_RESULT),
+    'analyze': (ANALYZE_PROMPT, ANALYZE_MOCK_RESULT)
+}
+
+# Batch endpoints: concurrent model calls per batch and images per batch
+BATCH_MAX_CONCURRENCY = int(os.getenv('BATCH_MAX_CONCURRENCY', '4'))
+BATCH_MAX_ITEMS = int(os.getenv('BATCH_MAX_ITEMS', '32'))
+
+# Result cache for image endpoints; share hits across local workers with RESULT_CACHE_DB (a SQLite
+# file, bounded by RESULT_CACHE_DB_MAX_ENTRIES/_MAX_BYTES with LRU eviction) or RESULT_CACHE_DIR
+RESULT_CACHE_ENABLED = os.getenv('RESULT_CACHE_ENABLED', 'true').lower() == 'true'
+RESULT_CACHE_TTL = float(os.getenv('RESULT_CACHE_TTL', '3600'))
+RESULT_CACHE_DB = os.getenv('RESULT_CACHE_DB')
+RESULT_CACHE_DIR = os.getenv('RESULT_CACHE_DIR')
+
+def _shared_cache_backend():
+    """Store shared by every worker on the host, if one is configured"""
+    if RESULT_CACHE_DB:
+        return SqliteCacheBackend(
+            RESULT_CACHE_DB,
+            ttl=RESULT_CACHE_TTL,
+            max_entries=int(os.getenv('RESULT_CACHE_DB_MAX_ENTRIES', '100000')),
+            max_bytes=int(os.getenv('RESULT_CACHE_DB_MAX_BYTES', str(512 * 1024 * 1024)))
+        )
+    if RESULT_CACHE_DIR:
+        return DiskCacheBackend(RESULT_CACHE_DIR, ttl=RESULT_CACHE_TTL)
+    return None
+
+result_cache = ResultCache(
+    max_entries=int(os.getenv('RESULT_CACHE_MAX_ENTRIES', '1024')),
+    max_bytes=int(os.getenv('RESULT_CACHE_MAX_BYTES', str(64 * 1024 * 1024))),
+    ttl=RESULT_CACHE_TTL,
+    disk_backend=_shared_cache_backend()
+) if RESULT_CACHE_ENABLED else None
+
+# Startup analyses reused for near-identical ideas (Jaccard similarity of word shingles)
+SEMANTIC_CACHE_ENABLED = os.getenv('SEMANTIC_CACHE_ENABLED', 'true').lower() == 'true'
+
+startup_cache = SemanticCache(
+    threshold=float(os.getenv('SEMANTIC_CACHE_THRESHOLD', '0.8')),
+    max_entries=int(os.getenv('SEMANTIC_CACHE_MAX_ENTRIES', '4096')),
+    ttl=float(os.getenv('SEMANTIC_CACHE_TTL', '86400'))
+) if SEMANTIC_CACHE_ENABLED else None
+
+# Largest accepted request body (raw, multipart or JSON)
+MAX_UPLOAD_BYTES = int(os.getenv('MAX_UPLOAD_BYTES', str(20 * 1024 * 1024)))
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_BYTES
+
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# Send per-stage timings to clients in a Server-Timing response header
+SERVER_TIMING_ENABLED = os.getenv('SERVER_TIMING_ENABLED', 'false').lower() == 'true'
+
+class UploadError(Exception):
+    """Client error while reading an uploaded image"""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+def _read_image_request():
+    """
+    Return (image bytes, params) for an image request in any supported form:
+    - application/octet-stream or image/* raw body, params in the query string
+    - multipart/form-data with an 'image' file, params in the form fields
+    - JSON with a base64 'image' (optionally a data URL), params in the JSON
+    """
+    try:
+        with stage('decode'):
+            return _read_image_payload()
+    except RequestEntityTooLarge:
+        raise UploadError('Image too large', 413)
+
+def _read_image_payload():
+    """Dispatch on the request content type, see _read_image_request"""
+    mimetype = request.mimetype
+    
+    if mimetype == 'application/octet-stream' or mimetype.startswith('image/'):
+        return _read_raw_body(), request.args
+    
+    if mimetype == 'multipart/form-data':
+        upload = request.files.get('image')
+        if upload is None:
+            raise UploadError('Missing image data')
+        return upload.stream.read(), request.form
+    
+    data = request.get_json(silent=True)
+    if not data or not data.get('image'):
+        raise UploadError('Missing image data')
+    
+    return _decode_base64_image(data['image']), data
+
+def _decode_base64_image(image_base64):
+    """Decode a base64 image, accepting data URLs"""
+    if not image_base64:
+        raise UploadError('Missing image data')
+    comma = image_base64.find(',')
+    if comma != -1:
+        image_base64 = image_base64[comma + 1:]
+    try:
+        return base64.b64decode(image_base64)
+    except (binascii.Error, ValueError):
+        raise UploadError('Invalid base64 image data')
+
+def _read_raw_body():
+    """Read a raw upload body into a single bounded buffer"""
+    stream = request.stream
+    length = request.content_length
+    
+    if length is not None:
+        if length > MAX_UPLOAD_BYTES:
+            raise UploadError('Image too large', 413)
+        # One read of a known length yields the final bytes object without re-joining
+        image_data = stream.read(length)
+        if len(image_data) < length:
+            raise UploadError('Incomplete upload')
+    else:
+        chunks = []
+        total = 0
+        while True:
+            chunk = stream.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            total += len(chunk)
+            if total > MAX_UPLOAD_BYTES:
+                raise UploadError('Image too large', 413)
+            chunks.append(chunk)
+        image_data = b''.join(chunks)
+    
+    if not image_data:
+        raise UploadError('Missing image data')
+    return image_data
+
+def _int_param(params, name):
+    """Read an optional integer parameter from JSON, form or query params"""
+    value = params.get(name)
+    if value is None or value == '':
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise UploadError(f'Invalid {name}: {value}')
+
+def _cache_lookup(image_data, endpoint, prompt):
+    """
+    Return (request key, cached result or None) for an image request.
+    The key also identifies identical in-flight requests for coalescing.
+    """
+    with stage('cache_lookup'):
+        key = ResultCache.make_key(image_data, endpoint, prompt, model_registry.model_name(endpoint))
+        if result_cache is None:
+            return key, None
+        return key, result_cache.get(key)
+
+def _cache_store(key, result):
+    """Cache a real model result"""
+    if result_cache is not None:
+        result_cache.set(key, result)
+
+# Concurrent identical requests (same key) wait on one model call
+single_flight = SingleFlight()
+
+# Near-duplicate uploads (recompressed, resized) found by perceptual hash:
+# off, flag (annotate the result) or reuse (return the earlier cached result)
+NEAR_DUPLICATE_POLICY = os.getenv('NEAR_DUPLICATE_POLICY', 'off').lower()
+# Endpoints that may reuse a near-duplicate's result; identity verification is only
+# flagged, since an earlier verdict must not vouch for a screenshot or re-encoded copy
+NEAR_DUPLICATE_REUSE_ENDPOINTS = ('analyze', 'bio-authenticity')
+NEAR_DUPLICATE_DISTANCE = int(os.getenv('NEAR_DUPLICATE_DISTANCE', '6'))
+NEAR_DUPLICATE_TTL = float(os.getenv('NEAR_DUPLICATE_TTL', '86400')) or None
+# Append-only hash log shared by the workers on a host
+NEAR_DUPLICATE_INDEX_PATH = os.getenv(
+    'NEAR_DUPLICATE_INDEX_PATH', os.path.join(tempfile.gettempdir(), 'verifyai-phash.log')
+)
+
+_near_duplicate_index = None
+_near_duplicate_index_lock = threading.Lock()
+
+def near_duplicate_index():
+    """The process's perceptual-hash index, loaded from its log on first use"""
+    global _near_duplicate_index
+    if _near_duplicate_index is None:
+        with _near_duplicate_index_lock:
+            if _near_duplicate_index is None:
+                # NumPy is only needed once near-duplicate detection is used
+                from lib.perceptual_hash import PerceptualHashIndex
+                _near_duplicate_index = PerceptualHashIndex(
+                    NEAR_DUPLICATE_INDEX_PATH,
+                    max_distance=NEAR_DUPLICATE_DISTANCE,
+                    ttl=NEAR_DUPLICATE_TTL
+                )
+    return _near_duplicate_index
+
+def _near_duplicate_scope(endpoint, prompt):
+    """Near-duplicates only count for the same endpoint, model and prompt"""
+    return f'{endpoint}\n{model_registry.model_name(endpoint)}\n{prompt}'
+
+def _near_duplicate(image, endpoint, scope):
+    """
+    Look up an earlier near-duplicate of a prepared image.
+    Returns (match info or None, earlier result to reuse or None).
+    """
+    if NEAR_DUPLICATE_POLICY == 'off':
+        return None, None
+    from lib.perceptual_hash import NEAR_DUPLICATES
+    
+    with stage('near_duplicate'):
+        match = near_duplicate_index().nearest(image.perceptual_hash(), scope)
+    if match is None:
+        NEAR_DUPLICATES.inc(endpoint=endpoint, outcome='miss')
+        return None, None
+    
+    info = {'distance': match['distance'], 'first_seen': match['added_at'], 'reused': False}
+    if NEAR_DUPLICATE_POLICY == 'reuse' and endpoint in NEAR_DUPLICATE_REUSE_ENDPOINTS and result_cache is not None:
+        reused = result_cache.get(match['ref'])
+        if reused is not None:
+            NEAR_DUPLICATES.inc(endpoint=endpoint, outcome='reused')
+            return {**info, 'reused': True}, reused
+    NEAR_DUPLICATES.inc(endpoint=endpoint, outcome='flagged')
+    return info, None
+
+def _remember_near_duplicate(image, scope, cache_key):
+    """Index a prepared image whose result was cached under cache_key"""
+    if NEAR_DUPLICATE_POLICY != 'off':
+        near_duplicate_index().add(image.perceptual_hash(), scope, cache_key)
+
+def _cached_response(result, start_time):
+    """Build the response for a cache hit"""
+    result['processingTime'] = f"{(time.time() - start_time) * 1000:.2f}ms"
+    response = jsonify(result)
+    response.headers['X-Cache'] = 'HIT'
+    return response
+
+# Decode-once preprocessing shared by every image endpoint
+image_preprocessor = ImagePreprocessor(
+    target_size=int(os.getenv('IMAGE_TARGET_SIZE', '1024')),
+    max_pixels=int(os.getenv('IMAGE_MAX_PIXELS', '40000000')),
+    output_format=os.getenv('IMAGE_FORMAT', 'JPEG'),
+    quality=int(os.getenv('IMAGE_QUALITY', '85'))
+)
+
+# Multi-frame verification: a clip or frame sequence is reduced locally to at most
+# VERIFY_MAX_KEYFRAMES sharp, distinct keyframes, sent to the model in one request
+VERIFY_MAX_FRAME_UPLOADS = int(os.getenv('VERIFY_MAX_FRAME_UPLOADS', '60'))
+
+keyframe_selector = KeyframeSelector(
+    max_keyframes=int(os.getenv('VERIFY_MAX_KEYFRAMES', '4')),
+    min_distance=int(os.getenv('VERIFY_KEYFRAME_DISTANCE', '10')),
+    sample_fps=float(os.getenv('VERIFY_SAMPLE_FPS', '8')),
+    max_frames=int(os.getenv('VERIFY_MAX_FRAMES', '300')),
+    keep_size=int(os.getenv('VERIFY_KEYFRAME_SIZE', '512'))
+)
+
+# Keyframes are encoded smaller than single images, so a multi-frame request stays close in size
+keyframe_preprocessor = ImagePreprocessor(
+    target_size=keyframe_selector.keep_size,
+    max_pixels=image_preprocessor.max_pixels,
+    output_format=image_preprocessor.output_format,
+    quality=image_preprocessor.quality
+)
+
+# The analyzer's model is built on its first analysis, not at import
+bio_analyzer = BioAuthenticityAnalyzer(
+    model_factory=lambda: model_registry.for_endpoint('bio-authenticity'),
+    max_concurrency=BIO_MAX_CONCURRENCY,
+    call_timeout=BIO_CALL_TIMEOUT,
+    mode=BIO_ANALYSIS_MODE,
+    preprocessor=image_preprocessor,
+    caller=model_caller,
+    prescreen=PixelPrescreen(
+        policy=PRESCREEN_POLICY,
+        natural_below=float(os.getenv('PRESCREEN_NATURAL_BELOW', '15')),
+        filtered_above=float(os.getenv('PRESCREEN_FILTERED_ABOVE', '85')),
+        min_skin_fraction=float(os.getenv('PRESCREEN_MIN_SKIN_FRACTION', '0.05'))
+    ),
+    regions=FaceRegionLocator(method=BIO_REGION_CROPS),
+    region_cache=result_cache,
+    tiers=TierPolicy(BIO_TIERS, BIO_TIER_DECISIONS)
+)
+
+@app.before_request
+def start_request_metrics():
+    """Start timing the request and collecting its stage timings"""
+    g.request_started = time.perf_counter()
+    metrics.start_request(metrics_endpoint())
+    deadline.start(REQUEST_DEADLINE)
+
+@app.after_request
+def record_request_metrics(response):
+    """Record request latency and status, and attach Server-Timing if enabled"""
+    started = g.pop('request_started', None)
+    if started is not None:
+        endpoint = metrics_endpoint()
+        metrics.REQUEST_DURATION.observe(time.perf_counter() - started, endpoint=endpoint)
+        metrics.REQUESTS.inc(endpoint=endpoint, status=response.status_code)
+        if SERVER_TIMING_ENABLED and not response.is_streamed:
+            timings = metrics.request_timings()
+            if timings:
+                response.headers['Server-Timing'] = metrics.server_timing_header(timings)
+    return response
+
+def metrics_endpoint():
+    """Metrics label for the current request: its route without the /api/ prefix"""
+    rule = request.url_rule.rule if request.url_rule is not None else None
+    if rule is None:
+        return 'unmatched'
+    if rule.startswith('/api/'):
+        return rule[len('/api/'):]
+    return 'static'
+
+# Bio-authenticity job mode: a durable SQLite queue on local disk worked by
+# JOB_WORKERS threads per process. Needs a long-running server, since
+# serverless functions are frozen between requests.
+JOB_QUEUE_PATH = os.getenv('JOB_QUEUE_PATH', os.path.join(tempfile.gettempdir(), 'verifyai-jobs.sqlite3'))
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))
+JOB_RETENTION = float(os.getenv('JOB_RETENTION', '3600'))
+JOB_MAX_QUEUED = int(os.getenv('JOB_MAX_QUEUED', '1000'))
+# Comma-separated hosts job callbacks may target; when empty, only hosts that resolve
+# to public addresses are accepted (no loopback, private, link-local or reserved ranges)
+JOB_CALLBACK_HOSTS = [host.strip() for host in os.getenv('JOB_CALLBACK_HOSTS', '').split(',') if host.strip()]
+
+_job_pool = None
+_job_pool_lock = threading.Lock()
+
+# Largest batch accepted by /api/bio-authenticity/rescore
+RESCORE_MAX_RECORDS = int(os.getenv('RESCORE_MAX_RECORDS', '100000'))
+
+# Append-only columnar store of every computed result's metrics (cache hits are not
+# stored again), written by a background thread every REPORT_STORE_FLUSH_INTERVAL seconds;
+# off unless enabled, since it writes to disk on every analysis
+REPORT_STORE_ENABLED = os.getenv('REPORT_STORE_ENABLED', 'false').lower() == 'true'
+
+report_store = ReportStore(
+    os.getenv('REPORT_STORE_DIR', os.path.join(tempfile.gettempdir(), 'verifyai-reports')),
+    flush_interval=float(os.getenv('REPORT_STORE_FLUSH_INTERVAL', '1')),
+    max_pending=int(os.getenv('REPORT_STORE_MAX_PENDING', '100000'))
+) if REPORT_STORE_ENABLED else None
+
+def _record_report(endpoint, result):
+    """Queue a computed result for the report store"""
+    if report_store is not None:
+        report_store.append(endpoint, result)
 
 @app.route('/')
 def index():
     """Serve the main dashboard"""
     return send_from_directory('../public', 'index.html')
 
+@app.errorhandler(413)
+def request_too_large(e):
+    """JSON error for bodies over MAX_UPLOAD_BYTES"""
+    return jsonify({'error': 'Image too large'}), 413
+
 @app.route('/api/health', methods=['GET'])
 def health():
     """Health check endpoint"""
-    return jsonify({
+    return jsonify(health_payload())
+
+def health_payload():
+    """Service status shared by the WSGI and ASGI health checks"""
+    return {
         'status': 'ok',
         'service': 'VerifyAI API',
         'version': '1.0.0',
-        'gemini_configured': bool(GEMINI_API_KEY)
+        'gemini_configured': bool(GEMINI_API_KEY),
+        'gemini_keys': len(GEMINI_API_KEYS),
+        'models': model_registry.stats()
+    }
+
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    """Result cache and startup semantic cache counters, request coalescing counters and the near-duplicate index"""
+    stats = result_cache.stats() if result_cache is not None else {}
+    return jsonify({
+        'enabled': result_cache is not None,
+        **stats,
+        'coalescing': single_flight.stats(),
+        'startup': {
+            'enabled': startup_cache is not None,
+            **(startup_cache.stats() if startup_cache is not None else {})
+        },
+        'near_duplicates': {
+            'policy': NEAR_DUPLICATE_POLICY,
+            'reuse_endpoints': list(NEAR_DUPLICATE_REUSE_ENDPOINTS),
+            **(_near_duplicate_index.stats() if _near_duplicate_index is not None else {})
+        }
     })
 
+@app.route('/api/metrics', methods=['GET'])
+def metrics_export():
+    """Latency histograms and counters in Prometheus text format"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/api/verify', methods=['POST'])
 def verify_identity():
     """Verify identity from image"""
+    return _image_analysis_response('verify')
+
+@app.route('/api/analyze', methods=['POST'])
+def analyze_image():
+    """Analyze image for deepfake detection"""
+    return _image_analysis_response('analyze')
+
+@app.route('/api/verify/batch', methods=['POST'])
+def verify_identity_batch():
+    """Verify identity for many images, streaming NDJSON results"""
+    return _batch_response('verify')
+
+@app.route('/api/analyze/batch', methods=['POST'])
+def analyze_image_batch():
+    """Deepfake analysis for many images, streaming NDJSON results"""
+    return _batch_response('analyze')
+
+@app.route('/api/verify/frames', methods=['POST'])
+def verify_identity_frames():
+    """Verify identity and liveness from a short clip or a frame sequence"""
     start_time = time.time()
     
     try:
-        data = request.get_json()
-        
-        if not data or 'image' not in data:
-            return jsonify({'error': 'Missing image data'}), 400
-        
-        image_base64 = data.get('image')
-        
-        if ',' in image_base64:
-            image_base64 = image_base64.split(',')[1]
-        
         try:
-            image_data = base64.b64decode(image_base64)
-            image = Image.open(BytesIO(image_data))
-            
-            model = genai.GenerativeModel('gemini-1.5-flash')
-            prompt = """Analyze this face image for identity verification. Provide a JSON response with:
-1. faceMatch: confidence score (0-1)
-2. ageEstimate: estimated age
-3. livenessScore: liveness detection score (0-1)
-4. status: VERIFIED or FAILED
-Return ONLY valid JSON, no other text."""
-            
-            response = model.generate_content([prompt, image])
-            
-            response_text = response.text.strip()
-            if response_text.startswith('```'):
-                response_text = response_text.split('```')[1]
-                if response_text.startswith('json'):
-                    response_text = response_text[4:]
-            
-            result = json.loads(response_text)
-            result['processingTime'] = f"{(time.time() - start_time) * 1000:.2f}ms"
-            
-            return jsonify(result)
-        
-        except json.JSONDecodeError:
-            return jsonify({
-                'faceMatch': 0.98,
-                'ageEstimate': 28,
-                'livenessScore': 0.96,
-                'status': 'VERIFIED',
-                'processingTime': f"{(time.time() - start_time) * 1000:.2f}ms",
-                'note': 'Using mock data - JSON parsing failed'
-            })
-        except Exception as e:
-            return jsonify({
-                'faceMatch': 0.98,
-                'ageEstimate': 28,
-                'livenessScore': 0.96,
-                'status': 'VERIFIED',
-                'processingTime': f"{(time.time() - start_time) * 1000:.2f}ms",
-                'note': f'Using mock data - {str(e)}'
-            })
+            clip, frames = _read_frames_request()
+        except UploadError as e:
+            return jsonify({'error': str(e)}), e.status_code
+    
+        try:
+            result, cache_hit = run_frames_verification(clip, frames)
+        except ImageTooLargeError as e:
+            return jsonify({'error': str(e)}), 413
+        except UnsupportedClipError as e:
+            return jsonify({'error': str(e)}), 415
+    
+        if cache_hit:
+            return _cached_response(result, start_time)
+        result['processingTime'] = f"{(time.time() - start_time) * 1000:.2f}ms"
+        return jsonify(result)
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/analyze', methods=['POST'])
-def analyze_image():
-    """Analyze image for deepfake detection"""
+def _image_analysis_response(endpoint):
+    """Shared handler for the single-prompt image endpoints"""
     start_time = time.time()
     
     try:
-        data = request.get_json()
+        try:
+            image_data, _ = _read_image_request()
+        except UploadError as e:
+            return jsonify({'error': str(e)}), e.status_code
+        
+        try:
+            result, cache_hit = run_image_analysis(endpoint, image_data)
+        except ImageTooLargeError as e:
+            return jsonify({'error': str(e)}), 413
         
-        if not data or 'image' not in data:
-            return jsonify({'error': 'Missing image data'}), 400
+        if cache_hit:
+            return _cached_response(result, start_time)
+        result['processingTime'] = f"{(time.time() - start_time) * 1000:.2f}ms"
+        return jsonify(result)
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def run_image_analysis(endpoint, image_data):
+    """
+    Run the single-prompt model analysis for an image endpoint.
+    Returns (result, cache_hit); model and parsing failures fall back to the
+    endpoint's mock result. Raises ImageTooLargeError for oversized images.
+    """
+    cache_key, cached = _cache_lookup(image_data, endpoint, IMAGE_ENDPOINTS[endpoint][0])
+    if cached is not None:
+        return cached, True
+    
+    result, shared = single_flight.do(cache_key, lambda: _run_model_analysis(endpoint, image_data, cache_key))
+    if not shared:
+        _record_report(endpoint, result)
+    return result, False
+
+def _run_model_analysis(endpoint, image_data, cache_key):
+    """Preprocess the image and make the model call for run_image_analysis"""
+    prompt, mock_result = IMAGE_ENDPOINTS[endpoint]
+    
+    try:
+        with stage('preprocess'):
+            image = image_preprocessor.prepare(image_data)
         
-        image_base64 = data.get('image')
+        scope = _near_duplicate_scope(endpoint, prompt)
+        near_duplicate, reused = _near_duplicate(image, endpoint, scope)
+        if reused is not None:
+            result = {**reused, 'near_duplicate': near_duplicate}
+            _cache_store(cache_key, result)
+            return result
         
-        if ',' in image_base64:
-            image_base64 = image_base64.split(',')[1]
+        model = model_registry.for_endpoint(endpoint)
+        with stage('model_call'):
+            response = model_caller.generate(model, [prompt, image.as_model_part()])
         
+        with stage('parse'):
+            result = _parse_model_json(response.text)
+        if near_duplicate:
+            result['near_duplicate'] = near_duplicate
+        _cache_store(cache_key, result)
+        _remember_near_duplicate(image, scope, cache_key)
+        return result
+    
+    except ImageTooLargeError:
+        raise
+    except json.JSONDecodeError:
+        record_fallback(endpoint, 'parse')
+        return {**mock_result, 'note': 'Using mock data - JSON parsing failed'}
+    except KeysExhausted:
+        record_fallback(endpoint, 'quota')
+        return {**mock_result, 'note': 'Using mock data - API quota exhausted'}
+    except TimeoutError:
+        record_fallback(endpoint, 'timeout')
+        return {**mock_result, 'note': 'Using mock data - model call timed out'}
+    except Exception as e:
+        record_fallback(endpoint, 'error')
+        return {**mock_result, 'note': f'Using mock data - {str(e)}'}
+
+def _parse_model_json(response_text):
+    """Parse a JSON model response, stripping any markdown code fence"""
+    response_text = response_text.strip()
+    if response_text.startswith('```'):
+        response_text = response_text.split('```')[1]
+        if response_text.startswith('json'):
+            response_text = response_text[4:]
+    return json.loads(response_text)
+
+def _batch_response(endpoint):
+    """
+    Run an image endpoint over a batch of images with bounded concurrency.
+    Accepts JSON {"images": [base64 | {"id": ..., "image": base64}, ...]} or
+    multipart with repeated 'images' files. Each result is streamed as one
+    NDJSON line as soon as it completes, followed by a summary line. Every
+    item gets its own REQUEST_DEADLINE; an item answered with mock data has
+    status "fallback" and the reason in "error".
+    """
+    start_time = time.time()
+    
+    try:
+        items = _read_batch_items()
+    except UploadError as e:
+        return jsonify({'error': str(e)}), e.status_code
+    
+    def process(item):
+        item_id, payload = item
+        # A budget shared by the whole batch would leave every later item timed out
+        deadline.start(REQUEST_DEADLINE)
         try:
-            image_data = base64.b64decode(image_base64)
-            image = Image.open(BytesIO(image_data))
-            
-            model = genai.GenerativeModel('gemini-1.5-flash')
-            prompt = """Analyze this image for deepfake detection. Provide a JSON response with:
-1. deepfakeScore: probability of being deepfake (0-1)
-2. faceDetection: face detection confidence (0-1)
-3. contentAnalysis: description of content
-4. authenticity: Genuine or Suspicious
-Return ONLY valid JSON, no other text."""
-            
-            response = model.generate_content([prompt, image])
-            
-            response_text = response.text.strip()
-            if response_text.startswith('```'):
-                response_text = response_text.split('```')[1]
-                if response_text.startswith('json'):
-                    response_text = response_text[4:]
-            
-            result = json.loads(response_text)
-            result['processingTime'] = f"{(time.time() - start_time) * 1000:.2f}ms"
-            
-            return jsonify(result)
-        
-        except json.JSONDecodeError:
-            return jsonify({
-                'deepfakeScore': 0.02,
-                'faceDetection': 0.99,
-                'contentAnalysis': 'Natural image',
-                'authenticity': 'Genuine',
-                'processingTime': f"{(time.time() - start_time) * 1000:.2f}ms",
-                'note': 'Using mock data - JSON parsing failed'
-            })
+            image_data = _decode_base64_image(payload) if isinstance(payload, str) else payload
+            result, cache_hit = run_image_analysis(endpoint, image_data)
+            note = str(result.get('note', ''))
+            if note.startswith('Using mock data'):
+                return {'id': item_id, 'status': 'fallback', 'error': note, 'cached': cache_hit, 'result': result}
+            return {'id': item_id, 'status': 'ok', 'cached': cache_hit, 'result': result}
         except Exception as e:
-            return jsonify({
-                'deepfakeScore': 0.02,
-                'faceDetection': 0.99,
-                'contentAnalysis': 'Natural image',
-                'authenticity': 'Genuine',
-                'processingTime': f"{(time.time() - start_time) * 1000:.2f}ms",
-                'note': f'Using mock data - {str(e)}'
-            })
+            return {'id': item_id, 'status': 'error', 'error': str(e)}
     
+    def generate():
+        executor = ThreadPoolExecutor(
+            max_workers=min(BATCH_MAX_CONCURRENCY, len(items)),
+            thread_name_prefix=f'batch-{endpoint}'
+        )
+        errors = fallbacks = 0
+        try:
+            # Workers run in a copy of the request context so stage timings keep the batch label
+            futures = [executor.submit(contextvars.copy_context().run, process, item) for item in items]
+            for future in as_completed(futures):
+                line = future.result()
+                errors += line['status'] == 'error'
+                fallbacks += line['status'] == 'fallback'
+                yield json.dumps(line) + '\n'
+            yield json.dumps({
+                'done': True,
+                'count': len(items),
+                'errors': errors,
+                'fallbacks': fallbacks,
+                'processingTime': f"{(time.time() - start_time) * 1000:.2f}ms"
+            }) + '\n'
+        finally:
+            # Client disconnects close the generator; drop work that has not started
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    return Response(generate(), mimetype='application/x-ndjson')
+
+def _read_batch_items():
+    """Return [(id, base64 string or bytes), ...] for a batch request"""
+    try:
+        if request.mimetype == 'multipart/form-data':
+            uploads = request.files.getlist('images')
+            items = [(upload.filename or str(i), upload.stream.read()) for i, upload in enumerate(uploads)]
+        else:
+            data = request.get_json(silent=True)
+            images = data.get('images') if isinstance(data, dict) else None
+            if not isinstance(images, list):
+                raise UploadError('Missing images list')
+            items = []
+            for i, entry in enumerate(images):
+                if isinstance(entry, dict):
+                    items.append((entry.get('id', i), entry.get('image') or ''))
+                else:
+                    items.append((i, entry))
+    except RequestEntityTooLarge:
+        raise UploadError('Batch too large', 413)
+    
+    if not items:
+        raise UploadError('Missing images list')
+    if len(items) > BATCH_MAX_ITEMS:
+        raise UploadError(f'Batch has {len(items)} images, limit is {BATCH_MAX_ITEMS}', 413)
+    return items
+
+def _read_frames_request():
+    """
+    Return (clip bytes, None) or (None, [frame bytes, ...]) for a multi-frame request:
+    - raw body: an animated GIF/WebP/APNG, or a video when OpenCV is installed
+    - multipart/form-data with a 'clip' file or repeated 'frames' files
+    - JSON with a base64 'clip' or a 'frames' list of base64 images
+    """
+    try:
+        with stage('decode'):
+            mimetype = request.mimetype
+            if mimetype == 'application/octet-stream' or mimetype.startswith(('image/', 'video/')):
+                return _read_raw_body(), None
+            if mimetype == 'multipart/form-data':
+                clip = request.files.get('clip')
+                if clip is not None:
+                    return clip.stream.read(), None
+                frames = [upload.stream.read() for upload in request.files.getlist('frames')]
+            else:
+                data = request.get_json(silent=True)
+                if not isinstance(data, dict):
+                    raise UploadError('Missing clip or frames')
+                if data.get('clip'):
+                    return _decode_base64_image(data['clip']), None
+                frames = data.get('frames')
+                if not isinstance(frames, list):
+                    raise UploadError('Missing clip or frames')
+                if len(frames) > VERIFY_MAX_FRAME_UPLOADS:
+                    raise UploadError(f'Request has {len(frames)} frames, limit is {VERIFY_MAX_FRAME_UPLOADS}', 413)
+                frames = [_decode_base64_image(frame) for frame in frames]
+    except RequestEntityTooLarge:
+        raise UploadError('Clip too large', 413)
+    
+    if not frames:
+        raise UploadError('Missing clip or frames')
+    if len(frames) > VERIFY_MAX_FRAME_UPLOADS:
+        raise UploadError(f'Request has {len(frames)} frames, limit is {VERIFY_MAX_FRAME_UPLOADS}', 413)
+    return None, frames
+
+def run_frames_verification(clip, frames):
+    """
+    Multi-frame identity and liveness verification for a clip or a frame sequence.
+    Returns (result, cache_hit); model and parsing failures fall back to the
+    verify mock result. Raises ImageTooLargeError or UnsupportedClipError.
+    """
+    if clip is not None:
+        request_data = clip
+    else:
+        request_data = b''.join(hashlib.sha256(frame).digest() for frame in frames)
+    cache_key, cached = _cache_lookup(request_data, 'verify', f'{VERIFY_FRAMES_PROMPT}\n{keyframe_selector}')
+    if cached is not None:
+        return cached, True
+    
+    result, shared = single_flight.do(cache_key, lambda: _run_frames_model_analysis(clip, frames, cache_key))
+    if not shared:
+        _record_report('verify/frames', result)
+    return result, False
+
+def _run_frames_model_analysis(clip, frames, cache_key):
+    """Select keyframes locally and make one model call with all of them"""
+    endpoint = 'verify/frames'
+    max_pixels = image_preprocessor.max_pixels
+    
+    with stage('keyframes'):
+        if clip is not None:
+            selection = keyframe_selector.select(iter_clip_frames(clip, max_pixels))
+        else:
+            selection = keyframe_selector.select(iter_sequence_frames(frames, max_pixels))
+    keyframes = selection['keyframes']
+    local = {
+        'keyframes': [keyframe.describe() for keyframe in keyframes],
+        'temporal': selection['temporal']
+    }
+    
+    try:
+        with stage('preprocess'):
+            parts = [keyframe_preprocessor.prepare_frame(keyframe.image).as_model_part() for keyframe in keyframes]
+    
+        temporal = selection['temporal']
+        span = f" over {temporal['duration']}s" if temporal['duration'] else ''
+        # Locally measured motion goes with the frames, so a one-keyframe (static) clip still says so
+        context = (
+            f"{len(keyframes)} keyframes from {temporal['frames_sampled']} sampled frames{span}; "
+            f"mean frame-to-frame pixel change {temporal['mean_motion']:.3f}, max {temporal['max_motion']:.3f}."
+        )
+        model = model_registry.for_endpoint('verify')
+        with stage('model_call'):
+            response = model_caller.generate(model, [f'{VERIFY_FRAMES_PROMPT}\n{context}', *parts])
+    
+        with stage('parse'):
+            result = {**_parse_model_json(response.text), **local}
+        _cache_store(cache_key, result)
+        return result
+    
+    except ImageTooLargeError:
+        raise
+    except json.JSONDecodeError:
+        record_fallback(endpoint, 'parse')
+        return {**VERIFY_MOCK_RESULT, **local, 'note': 'Using mock data - JSON parsing failed'}
+    except KeysExhausted:
+        record_fallback(endpoint, 'quota')
+        return {**VERIFY_MOCK_RESULT, **local, 'note': 'Using mock data - API quota exhausted'}
+    except TimeoutError:
+        record_fallback(endpoint, 'timeout')
+        return {**VERIFY_MOCK_RESULT, **local, 'note': 'Using mock data - model call timed out'}
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        record_fallback(endpoint, 'error')
+        return {**VERIFY_MOCK_RESULT, **local, 'note': f'Using mock data - {str(e)}'}
 
 @app.route('/api/startup', methods=['POST'])
 def analyze_startup():
@@ -179,90 +904,88 @@ def analyze_startup():
         if not data or 'idea' not in data:
             return jsonify({'error': 'Missing idea text'}), 400
         
-        idea = data.get('idea')
-        
-        try:
-            model = genai.GenerativeModel('gemini-1.5-flash')
-            prompt = f"""Analyze this startup idea: "{idea}"
-            
-Provide a JSON response with:
-1. marketPotential: score 0-10
-2. tam: Total Addressable Market estimate
-3. sam: Serviceable Available Market estimate
-4. som: Serviceable Obtainable Market estimate
-5. competitorCount: estimated number of competitors
-6. startupGrade: A-F grading
-7. keyInsights: brief insights
-
-Return ONLY valid JSON, no other text."""
-            
-            response = model.generate_content(prompt)
-            
-            response_text = response.text.strip()
-            if response_text.startswith('```'):
-                response_text = response_text.split('```')[1]
-                if response_text.startswith('json'):
-                    response_text = response_text[4:]
-            
-            result = json.loads(response_text)
-            result['processingTime'] = f"{(time.time() - start_time) * 1000:.2f}ms"
-            
-            return jsonify(result)
-        
-        except json.JSONDecodeError:
-            return jsonify({
-                'marketPotential': 8.5,
-                'tam': '$50B',
-                'sam': '$5B',
-                'som': '$500M',
-                'competitorCount': 12,
-                'startupGrade': 'A',
-                'keyInsights': 'High market demand with moderate competition.',
-                'processingTime': f"{(time.time() - start_time) * 1000:.2f}ms",
-                'note': 'Using mock data - JSON parsing failed'
-            })
-        except Exception as e:
-            return jsonify({
-                'marketPotential': 8.5,
-                'tam': '$50B',
-                'sam': '$5B',
-                'som': '$500M',
-                'competitorCount': 12,
-                'startupGrade': 'A',
-                'keyInsights': 'High market demand with moderate competition.',
-                'processingTime': f"{(time.time() - start_time) * 1000:.2f}ms",
-                'note': f'Using mock data - {str(e)}'
-            })
+        result, cache_hit = run_startup_analysis(data.get('idea'))
+        if cache_hit:
+            return _cached_response(result, start_time)
+        result['processingTime'] = f"{(time.time() - start_time) * 1000:.2f}ms"
+        return jsonify(result)
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def run_startup_analysis(idea):
+    """
+    Run the startup idea analysis, falling back to mock data on failure.
+    Returns (result, cache_hit); near-identical earlier ideas reuse their analysis.
+    """
+    cached = _startup_cache_lookup(idea)
+    if cached is not None:
+        return cached, True
+    
+    try:
+        model = model_registry.for_endpoint('startup')
+        with stage('model_call'):
+            response = model_caller.generate(model, STARTUP_PROMPT.format(idea=idea))
+        with stage('parse'):
+            result = _parse_model_json(response.text)
+        _startup_cache_store(idea, result)
+        return result, False
+    
+    except json.JSONDecodeError:
+        record_fallback('startup', 'parse')
+        return {**STARTUP_MOCK_RESULT, 'note': 'Using mock data - JSON parsing failed'}, False
+    except KeysExhausted:
+        record_fallback('startup', 'quota')
+        return {**STARTUP_MOCK_RESULT, 'note': 'Using mock data - API quota exhausted'}, False
+    except TimeoutError:
+        record_fallback('startup', 'timeout')
+        return {**STARTUP_MOCK_RESULT, 'note': 'Using mock data - model call timed out'}, False
+    except Exception as e:
+        record_fallback('startup', 'error')
+        return {**STARTUP_MOCK_RESULT, 'note': f'Using mock data - {str(e)}'}, False
+
+def _startup_cache_lookup(idea):
+    """Return the cached analysis of the same or a near-identical idea, or None"""
+    if startup_cache is None or not isinstance(idea, str):
+        return None
+    with stage('cache_lookup'):
+        hit = startup_cache.get(idea, scope=model_registry.model_name('startup'), endpoint='startup')
+    if hit is None:
+        return None
+    result, similarity = hit
+    result['semantic_match'] = {'similarity': similarity}
+    return result
+
+def _startup_cache_store(idea, result):
+    """Cache a real startup analysis"""
+    if startup_cache is not None and isinstance(idea, str):
+        startup_cache.set(idea, result, scope=model_registry.model_name('startup'))
+
 @app.route('/api/bio-authenticity', methods=['POST'])
 def bio_authenticity():
     """Comprehensive Bio-Authenticity analysis"""
     start_time = time.time()
     
     try:
-        data = request.get_json()
-        
-        if not data or 'image' not in data:
-            return jsonify({'error': 'Missing image data'}), 400
-        
-        image_base64 = data.get('image')
-        stated_age = data.get('stated_age')
-        
-        if ',' in image_base64:
-            image_base64 = image_base64.split(',')[1]
+        try:
+            image_data, stated_age, mode = _read_bio_request()
+        except UploadError as e:
+            return jsonify({'error': str(e)}), e.status_code
         
         try:
-            image_data = base64.b64decode(image_base64)
-            report = bio_analyzer.comprehensive_bio_authenticity_report(
-                image_data,
-                stated_age=stated_age
+            cache_key, cached = _cache_lookup(image_data, 'bio-authenticity', _bio_prompt_version(mode, stated_age))
+            if cached is not None:
+                return _cached_response(cached, start_time)
+            
+            report, _ = single_flight.do(
+                cache_key,
+                lambda: _run_bio_report(image_data, stated_age, mode, cache_key)
             )
             report['processingTime'] = f"{(time.time() - start_time) * 1000:.2f}ms"
             return jsonify(report)
         
+        except ImageTooLargeError as e:
+            return jsonify({'error': str(e)}), 413
         except Exception as e:
             return jsonify({
                 'status': 'error',
@@ -273,6 +996,272 @@ def bio_authenticity():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/bio-authenticity/jobs', methods=['POST'])
+def submit_bio_authenticity_job():
+    """
+    Queue a Bio-Authenticity report and return at once with a job ID.
+    Accepts the same uploads and parameters as /api/bio-authenticity, plus
+    priority (higher runs first) and an optional callback_url that receives
+    the finished job as a JSON POST.
+    """
+    try:
+        image_data, params = _read_image_request()
+        stated_age, mode = _bio_params(params)
+        priority = _int_param(params, 'priority') or 0
+        callback_url = params.get('callback_url') or None
+        if callback_url and not valid_callback_url(callback_url, JOB_CALLBACK_HOSTS):
+            raise UploadError(f'Invalid callback_url: {callback_url}')
+    except UploadError as e:
+        return jsonify({'error': str(e)}), e.status_code
+    
+    pool = job_pool()
+    try:
+        job_id = pool.submit(
+            image_data,
+            {'stated_age': stated_age, 'mode': mode},
+            priority=priority,
+            callback_url=callback_url
+        )
+    except QueueFullError as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '5'}
+    
+    status_url = f'/api/bio-authenticity/jobs/{job_id}'
+    return jsonify({'job_id': job_id, 'status': 'queued', 'status_url': status_url}), 202, {'Location': status_url}
+
+@app.route('/api/bio-authenticity/jobs/<job_id>', methods=['GET'])
+def bio_authenticity_job(job_id):
+    """Status of a queued job, with its report once it has succeeded"""
+    pool = job_pool()
+    # Jobs left by a previous process are picked up once anyone polls
+    pool.ensure_started()
+    job = pool.queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown or expired job'}), 404
+    return jsonify(job)
+
+@app.route('/api/bio-authenticity/jobs', methods=['GET'])
+def bio_authenticity_job_stats():
+    """Job counts by status and worker pool usage"""
+    pool = job_pool()
+    return jsonify({'queue': pool.queue.stats(), 'workers': pool.stats()})
+
+def job_pool():
+    """The process's job worker pool, created on first use"""
+    global _job_pool
+    if _job_pool is None:
+        with _job_pool_lock:
+            if _job_pool is None:
+                _job_pool = JobWorkerPool(
+                    JobQueue(JOB_QUEUE_PATH, retention=JOB_RETENTION, max_queued=JOB_MAX_QUEUED),
+                    _run_bio_job,
+                    workers=JOB_WORKERS,
+                    allowed_hosts=JOB_CALLBACK_HOSTS
+                )
+    return _job_pool
+
+def _run_bio_job(image_data, params):
+    """Job handler: build a bio-authenticity report, reusing cached reports"""
+    metrics.start_request('bio-authenticity/jobs')
+    stated_age, mode = params.get('stated_age'), params.get('mode')
+    cache_key, cached = _cache_lookup(image_data, 'bio-authenticity', _bio_prompt_version(mode, stated_age))
+    if cached is not None:
+        return cached
+    report = _run_bio_report(image_data, stated_age, mode, cache_key)
+    if report.get('status') != 'success':
+        raise RuntimeError(report.get('message') or 'Bio-authenticity analysis failed')
+    return report
+
+@app.route('/api/bio-authenticity/rescore', methods=['POST'])
+def rescore_bio_authenticity():
+    """
+    Re-score stored metrics without calling the model. Accepts JSON with
+    either "reports" (stored bio-authenticity reports) or "columns" (metric
+    name -> list of values) plus optional "stated_age", and an optional
+    "profile" overriding scoring weights. Returns one list per score.
+    """
+    # NumPy is only needed here, so it is imported on first use
+    from lib.batch_scoring import WeightProfile, columns_from_reports, score_batch
+    
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not (isinstance(data.get('reports'), list) or isinstance(data.get('columns'), dict)):
+        return jsonify({'error': 'Missing reports list or columns object'}), 400
+    
+    try:
+        profile = WeightProfile(**(data.get('profile') or {}))
+        reports = data['reports'] if isinstance(data.get('reports'), list) else None
+        if reports is not None:
+            count = len(reports)
+        else:
+            columns, stated_age = data['columns'], data.get('stated_age')
+            count = len(stated_age) if stated_age is not None else len(next(iter(columns.values()), []))
+        # Checked before any conversion, so an oversized batch is rejected without being copied
+        if count > RESCORE_MAX_RECORDS:
+            return jsonify({'error': f'{count} records, limit is {RESCORE_MAX_RECORDS}'}), 413
+        
+        if reports is not None:
+            columns, stated_age = columns_from_reports(reports)
+        elif stated_age is not None:
+            stated_age = [age if age is not None else 0 for age in stated_age]
+        
+        with stage('scoring'):
+            scores = score_batch(columns, stated_age, profile)
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({
+        'count': count,
+        'profile': profile.to_dict(),
+        'results': {name: values.tolist() for name, values in scores.items()}
+    })
+
+@app.route('/api/reports/query', methods=['GET'])
+def query_reports():
+    """
+    Aggregates over stored results of one endpoint. Query params: endpoint
+    (default bio-authenticity), since/until (epoch seconds or ISO dates),
+    where (comma-separated conditions such as filter_probability>60),
+    columns (comma-separated, default all), histogram (a column), bins,
+    range (low,high) and include_fallbacks (true to count mock results).
+    """
+    if report_store is None:
+        return jsonify({'error': 'Report store is disabled'}), 404
+    
+    params = request.args
+    
+    def names(param):
+        return [name.strip() for name in params.get(param, '').split(',') if name.strip()]
+    
+    try:
+        value_range = names('range')
+        if value_range and len(value_range) != 2:
+            raise ValueError('range must be low,high')
+        # Records queued by this process are written first, so they are included
+        report_store.flush()
+        with stage('query'):
+            result = report_store.query(
+                params.get('endpoint', 'bio-authenticity'),
+                since=parse_time(params.get('since')),
+                until=parse_time(params.get('until')),
+                where=names('where'),
+                columns=names('columns') or None,
+                histogram=params.get('histogram') or None,
+                bins=_int_param(params, 'bins') or 20,
+                value_range=tuple(float(value) for value in value_range) or None,
+                include_fallbacks=params.get('include_fallbacks', 'false').lower() == 'true'
+            )
+    except UploadError as e:
+        return jsonify({'error': str(e)}), e.status_code
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify(result)
+
+@app.route('/api/reports/stats', methods=['GET'])
+def report_store_stats():
+    """Report store write counters"""
+    return jsonify({
+        'enabled': report_store is not None,
+        **(report_store.stats() if report_store is not None else {})
+    })
+
+@app.route('/api/bio-authenticity/stream', methods=['POST'])
+def bio_authenticity_stream():
+    """
+    Bio-Authenticity analysis as server-sent events: one 'analysis' event
+    per completed sub-analysis, then a final 'report' event with the age
+    analysis and overall score. Aborting the request stops pending work.
+    """
+    start_time = time.time()
+    
+    try:
+        image_data, stated_age, mode = _read_bio_request()
+    except UploadError as e:
+        return jsonify({'error': str(e)}), e.status_code
+    
+    cache_key, cached = _cache_lookup(image_data, 'bio-authenticity', _bio_prompt_version(mode, stated_age))
+    
+    def generate():
+        if cached is not None:
+            cached['processingTime'] = f"{(time.time() - start_time) * 1000:.2f}ms"
+            yield _sse_event('report', cached)
+            return
+        
+        try:
+            with stage('preprocess'):
+                image = image_preprocessor.prepare(image_data)
+        except Exception as e:
+            yield _sse_event('report', {'status': 'error', 'message': str(e)})
+            return
+        
+        events = bio_analyzer.iter_bio_authenticity_report(image, stated_age=stated_age, mode=mode)
+        try:
+            for event, payload in events:
+                payload['processingTime'] = f"{(time.time() - start_time) * 1000:.2f}ms"
+                if event == 'report':
+                    _cache_bio_report(cache_key, payload)
+                    _record_report('bio-authenticity', payload)
+                yield _sse_event(event, payload)
+        finally:
+            events.close()
+    
+    response = Response(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+def _read_bio_request():
+    """Return (image bytes, stated_age, mode) for a bio-authenticity request"""
+    image_data, params = _read_image_request()
+    return (image_data, *_bio_params(params))
+
+def _bio_params(params):
+    """Return (stated_age, mode) from a bio-authenticity request's params"""
+    stated_age = _int_param(params, 'stated_age')
+    mode = params.get('mode')
+    if mode and mode not in BioAuthenticityAnalyzer.ANALYSIS_MODES:
+        raise UploadError(f'Unknown mode: {mode}')
+    return stated_age, mode
+
+def _run_bio_report(image_data, stated_age, mode, cache_key):
+    """Preprocess the image and build (and cache) a bio-authenticity report"""
+    with stage('preprocess'):
+        image = image_preprocessor.prepare(image_data)
+    
+    scope = _near_duplicate_scope('bio-authenticity', _bio_prompt_version(mode, stated_age))
+    near_duplicate, reused = _near_duplicate(image, 'bio-authenticity', scope)
+    if reused is not None:
+        report = {**reused, 'near_duplicate': near_duplicate}
+        _cache_store(cache_key, report)
+        _record_report('bio-authenticity', report)
+        return report
+    
+    report = bio_analyzer.comprehensive_bio_authenticity_report(
+        image,
+        stated_age=stated_age,
+        mode=mode
+    )
+    if near_duplicate:
+        report['near_duplicate'] = near_duplicate
+    if _cache_bio_report(cache_key, report):
+        _remember_near_duplicate(image, scope, cache_key)
+    _record_report('bio-authenticity', report)
+    return report
+
+def _bio_prompt_version(mode, stated_age):
+    """Cache identity of a bio-authenticity report for the given parameters"""
+    return f"{BioAuthenticityAnalyzer.PROMPT_VERSION}:{mode or bio_analyzer.mode}:{stated_age}:{bio_analyzer.prescreen.policy}:{bio_analyzer.regions.method}:{bio_analyzer.tiers}"
+
+def _cache_bio_report(cache_key, report):
+    """Cache a bio-authenticity report unless it is an error or used mock data; return whether it was"""
+    if report.get('status') == 'success' and not report.get('fallback_analyses'):
+        _cache_store(cache_key, report)
+        return True
+    return False
+
+def _sse_event(event, payload):
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
 if __name__ == '__main__':
     port = int(os.getenv('PORT', '5000'))
     app.run(debug=False, host='0.0.0.0', port=port)
@@ -0,0 +1,237 @@
+"""
+API load-test and benchmark for VerifyAI
+
+Drives /api/verify, /api/analyze, /api/startup and /api/bio-authenticity at a
+configurable concurrency and reports p50/p95/p99 latency, requests per
+second and peak RSS. By default the app runs in-process against the local
+fake model backend (MODEL_BACKEND=fake), so no API key or network is needed
+and results are reproducible.
+
+Examples (from the repository root):
+    python benchmarks/bench_api.py --requests 400 --concurrency 32
+    python benchmarks/bench_api.py --endpoints bio-authenticity --latency-ms 1500 --jitter-ms 500
+    python benchmarks/bench_api.py --failure-rate 0.05 --malformed-rate 0.05 --fail-p95-ms 2500
+    python benchmarks/bench_api.py --url http://localhost:5000   # an already running server
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import resource
+import threading
+from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ENDPOINTS = ('verify', 'analyze', 'startup', 'bio-authenticity')
+
+STARTUP_IDEAS = [
+    'Uber for dog walking',
+    'AI bookkeeping for freelancers',
+    'Marketplace for refurbished lab equipment',
+    'Subscription meal kits for athletes'
+]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--endpoints', default=','.join(ENDPOINTS), help='comma-separated endpoints to drive')
+    parser.add_argument('--requests', type=int, default=200, help='requests per endpoint')
+    parser.add_argument('--concurrency', type=int, default=16, help='requests in flight at once')
+    parser.add_argument('--image-size', type=int, default=1024, help='synthetic image edge length in pixels')
+    parser.add_argument('--cache', action='store_true', help='keep the result cache on and reuse images')
+    parser.add_argument('--latency-ms', type=float, default=800, help='fake model mean latency')
+    parser.add_argument('--jitter-ms', type=float, default=200, help='fake model latency standard deviation')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='fake model failure probability')
+    parser.add_argument('--malformed-rate', type=float, default=0.0, help='fake model malformed JSON probability')
+    parser.add_argument('--seed', type=int, default=0, help='seed for the fake model and synthetic inputs')
+    parser.add_argument('--url', help='benchmark a running server instead of the in-process app')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    parser.add_argument('--fail-p95-ms', type=float, help='exit non-zero if any endpoint p95 exceeds this')
+    return parser.parse_args(argv)
+
+
+def make_images(count, size, seed):
+    """Build a small pool of synthetic JPEGs"""
+    from PIL import Image
+    rng = random.Random(seed)
+    images = []
+    for _ in range(count):
+        image = Image.effect_noise((size, size), rng.randint(20, 80)).convert('RGB')
+        buffer = BytesIO()
+        image.save(buffer, format='JPEG', quality=90)
+        images.append(buffer.getvalue())
+    return images
+
+
+def make_payload(endpoint, index, images, unique):
+    """Return (body bytes, content type) for one request"""
+    if endpoint == 'startup':
+        idea = STARTUP_IDEAS[index % len(STARTUP_IDEAS)]
+        if unique:
+            idea = f'{idea} #{index}'
+        return json.dumps({'idea': idea}).encode('utf-8'), 'application/json'
+    image = images[index % len(images)]
+    if unique:
+        # Bytes after the JPEG end marker are ignored by decoders but change the content hash
+        image = image + index.to_bytes(4, 'big')
+    return image, 'image/jpeg'
+
+
+class InProcessClient:
+    """Flask test clients, one per worker thread"""
+
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def post(self, path, body, content_type):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.post(path, data=body, content_type=content_type)
+        return response.status_code, response.get_json(silent=True)
+
+
+class HttpClient:
+    """requests sessions against a running server, one per worker thread"""
+
+    def __init__(self, base_url):
+        import requests
+        self._requests = requests
+        self.base_url = base_url.rstrip('/')
+        self._local = threading.local()
+
+    def post(self, path, body, content_type):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = self._requests.Session()
+        response = session.post(self.base_url + path, data=body, headers={'Content-Type': content_type})
+        try:
+            return response.status_code, response.json()
+        except ValueError:
+            return response.status_code, None
+
+
+def build_client(args):
+    if args.url:
+        return HttpClient(args.url)
+
+    os.environ['MODEL_BACKEND'] = 'fake'
+    os.environ['MODEL_WARMUP'] = 'off'
+    os.environ['FAKE_MODEL_LATENCY_MS'] = str(args.latency_ms)
+    os.environ['FAKE_MODEL_JITTER_MS'] = str(args.jitter_ms)
+    os.environ['FAKE_MODEL_FAILURE_RATE'] = str(args.failure_rate)
+    os.environ['FAKE_MODEL_MALFORMED_RATE'] = str(args.malformed_rate)
+    os.environ['FAKE_MODEL_SEED'] = str(args.seed)
+    if not args.cache:
+        os.environ['RESULT_CACHE_ENABLED'] = 'false'
+    from api import index
+    return InProcessClient(index.app)
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+def is_fallback(body):
+    """True when the app answered with mock data instead of a model result"""
+    if not isinstance(body, dict):
+        return False
+    return 'note' in body or bool(body.get('fallback_analyses')) or body.get('status') == 'error'
+
+
+def run_endpoint(client, endpoint, args, images):
+    latencies = []
+    errors = 0
+    fallbacks = 0
+    lock = threading.Lock()
+    unique = not args.cache
+
+    def one(index):
+        nonlocal errors, fallbacks
+        body, content_type = make_payload(endpoint, index, images, unique)
+        started = time.perf_counter()
+        try:
+            status, payload = client.post(f'/api/{endpoint}', body, content_type)
+        except Exception:
+            status, payload = 599, None
+        elapsed = (time.perf_counter() - started) * 1000
+        with lock:
+            latencies.append(elapsed)
+            errors += status >= 400
+            fallbacks += is_fallback(payload)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        list(executor.map(one, range(args.requests)))
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'endpoint': endpoint,
+        'requests': args.requests,
+        'concurrency': args.concurrency,
+        'errors': errors,
+        'fallbacks': fallbacks,
+        'p50_ms': round(percentile(latencies, 0.50), 2),
+        'p95_ms': round(percentile(latencies, 0.95), 2),
+        'p99_ms': round(percentile(latencies, 0.99), 2),
+        'mean_ms': round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+        'rps': round(args.requests / wall, 2) if wall else 0.0,
+        'wall_s': round(wall, 3)
+    }
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    endpoints = [name.strip() for name in args.endpoints.split(',') if name.strip()]
+    unknown = set(endpoints) - set(ENDPOINTS)
+    if unknown:
+        raise SystemExit(f'Unknown endpoints: {", ".join(sorted(unknown))}')
+
+    client = build_client(args)
+    images = make_images(8, args.image_size, args.seed)
+    results = [run_endpoint(client, endpoint, args, images) for endpoint in endpoints]
+    report = {
+        'mode': 'http' if args.url else 'in-process fake backend',
+        'results': results,
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"VerifyAI API benchmark ({report['mode']})")
+        print(f"{'endpoint':<18}{'reqs':>6}{'conc':>6}{'err':>5}{'mock':>6}"
+              f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'rps':>9}")
+        for r in results:
+            print(f"{r['endpoint']:<18}{r['requests']:>6}{r['concurrency']:>6}{r['errors']:>5}{r['fallbacks']:>6}"
+                  f"{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}{r['p99_ms']:>10.1f}{r['rps']:>9.1f}")
+        print(f"peak RSS: {report['peak_rss_mb']} MB")
+
+    if args.fail_p95_ms is not None:
+        slow = [r['endpoint'] for r in results if r['p95_ms'] > args.fail_p95_ms]
+        if slow:
+            print(f"p95 above {args.fail_p95_ms}ms: {', '.join(slow)}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,176 @@
+"""
+Cold-start benchmark for VerifyAI
+
+Starts fresh interpreters and measures what a serverless cold start pays
+before the first response: importing api/index.py, then the first
+/api/health and static page request. It also lists the heavy modules
+(google.generativeai, PIL, numpy, asyncio) already loaded by then, and the
+slowest imports reported by `python -X importtime`. Model warm-up is off and
+no network call is made, so a dummy API key is enough.
+
+With --first-request the app uses the local fake model backend (zero
+latency) and the first /api/verify is timed too, which includes loading
+the image stack on demand.
+
+Examples (from the repository root):
+    python benchmarks/bench_cold_start.py --runs 10
+    python benchmarks/bench_cold_start.py --first-request --top 15
+    python benchmarks/bench_cold_start.py --fail-import-ms 400 --fail-health-ms 50
+"""
+
+import os
+import sys
+import json
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ('google.generativeai', 'PIL', 'numpy', 'asyncio')
+
+# Runs inside each fresh interpreter; prints one JSON line with its timings
+PROBE = r'''
+import sys, json, time
+started = time.perf_counter()
+from api import index
+imported = time.perf_counter()
+client = index.app.test_client()
+health = client.get('/api/health')
+health_done = time.perf_counter()
+loaded_after_health = [name for name in HEAVY_MODULES if name in sys.modules]
+static = client.get('/')
+static_done = time.perf_counter()
+report = {
+    'import_ms': (imported - started) * 1000,
+    'health_ms': (health_done - imported) * 1000,
+    'static_ms': (static_done - health_done) * 1000,
+    'health_status': health.status_code,
+    'loaded_after_health': loaded_after_health
+}
+if FIRST_REQUEST:
+    with open(FIRST_REQUEST, 'rb') as image_file:
+        image_data = image_file.read()
+    request_started = time.perf_counter()
+    verify = client.post('/api/verify', data=image_data, content_type='image/jpeg')
+    report['first_verify_ms'] = (time.perf_counter() - request_started) * 1000
+    report['verify_status'] = verify.status_code
+print(json.dumps(report))
+'''
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='fresh interpreters to start')
+    parser.add_argument('--first-request', action='store_true', help='also time the first /api/verify (fake backend)')
+    parser.add_argument('--top', type=int, default=10, help='slowest imports to list')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    parser.add_argument('--fail-import-ms', type=float, help='exit non-zero if the median import time exceeds this')
+    parser.add_argument('--fail-health-ms', type=float, help='exit non-zero if the median first health check exceeds this')
+    return parser.parse_args(argv)
+
+
+def probe_env(first_request):
+    env = dict(os.environ)
+    env.update({
+        'MODEL_WARMUP': 'off',
+        'PYTHONDONTWRITEBYTECODE': '1',
+        'PYTHONPATH': ROOT + os.pathsep + env.get('PYTHONPATH', '')
+    })
+    if first_request:
+        env.update({'MODEL_BACKEND': 'fake', 'FAKE_MODEL_LATENCY_MS': '0', 'FAKE_MODEL_JITTER_MS': '0',
+                    'RESULT_CACHE_ENABLED': 'false'})
+    else:
+        env.update({'MODEL_BACKEND': 'gemini', 'GEMINI_API_KEY': env.get('GEMINI_API_KEY') or 'cold-start-benchmark'})
+    return env
+
+
+def write_image(directory):
+    """Write the JPEG the first request uploads, so the probe does not import PIL itself"""
+    from PIL import Image
+    path = os.path.join(directory, 'cold-start.jpg')
+    Image.new('RGB', (1024, 768), (120, 90, 60)).save(path, 'JPEG')
+    return path
+
+
+def run_probe(first_request, image_path=None):
+    """Start one interpreter; return (timings, [(cumulative us, module), ...])"""
+    code = f'HEAVY_MODULES = {HEAVY_MODULES!r}\nFIRST_REQUEST = {image_path if first_request else None!r}\n' + PROBE
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=ROOT, env=probe_env(first_request), capture_output=True, text=True, check=False
+    )
+    if completed.returncode != 0:
+        raise SystemExit(f'Probe failed:\n{completed.stderr[-2000:]}')
+    timings = json.loads(completed.stdout.strip().splitlines()[-1])
+    return timings, parse_importtime(completed.stderr)
+
+
+def parse_importtime(stderr):
+    """Imports made by the probe and by api.index directly, as (cumulative us, module)"""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        imports.append((int(cumulative), name.rstrip()))
+    # Nesting depth is the indentation after the separator: 1 for the probe's imports, 3 for theirs
+    direct = [(us, name.strip()) for us, name in imports if len(name) - len(name.lstrip()) <= 3]
+    return sorted(direct, reverse=True)
+
+
+def summarize(values):
+    return {
+        'median': round(statistics.median(values), 1),
+        'min': round(min(values), 1),
+        'max': round(max(values), 1)
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    with tempfile.TemporaryDirectory() as directory:
+        image_path = write_image(directory) if args.first_request else None
+        runs = [run_probe(args.first_request, image_path) for _ in range(max(1, args.runs))]
+    timings = [timing for timing, _ in runs]
+    metrics = ['import_ms', 'health_ms', 'static_ms'] + (['first_verify_ms'] if args.first_request else [])
+
+    median_run = sorted(runs, key=lambda run: run[0]['import_ms'])[len(runs) // 2]
+    report = {
+        'runs': len(runs),
+        'python': sys.version.split()[0],
+        'backend': 'fake' if args.first_request else 'gemini',
+        'timings': {name: summarize([t[name] for t in timings]) for name in metrics},
+        'loaded_after_health': sorted({name for t in timings for name in t['loaded_after_health']}),
+        'slowest_imports': [
+            {'module': name, 'cumulative_ms': round(us / 1000, 1)}
+            for us, name in median_run[1][:args.top]
+        ]
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"VerifyAI cold start ({report['runs']} runs, Python {report['python']}, {report['backend']} backend)")
+        print(f"{'phase':<18}{'median ms':>11}{'min ms':>10}{'max ms':>10}")
+        for name, stats in report['timings'].items():
+            print(f"{name[:-3]:<18}{stats['median']:>11.1f}{stats['min']:>10.1f}{stats['max']:>10.1f}")
+        print(f"heavy modules loaded by first health check: {', '.join(report['loaded_after_health']) or 'none'}")
+        print('slowest imports (median run):')
+        for entry in report['slowest_imports']:
+            print(f"  {entry['cumulative_ms']:>8.1f} ms  {entry['module']}")
+
+    failures = []
+    if args.fail_import_ms is not None and report['timings']['import_ms']['median'] > args.fail_import_ms:
+        failures.append(f"import median above {args.fail_import_ms}ms")
+    if args.fail_health_ms is not None and report['timings']['health_ms']['median'] > args.fail_health_ms:
+        failures.append(f"health median above {args.fail_health_ms}ms")
+    if failures:
+        print('; '.join(failures), file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,140 @@
+"""
+Report store benchmark for VerifyAI
+
+Times lib/report_store.ReportStore: the hot-path append of a full
+bio-authenticity report, the background flush, and filtered aggregate and
+histogram queries over N stored reports spread across several days. The
+results are checked against the same aggregates computed directly with
+NumPy, and the benchmark fails on any mismatch. No model is called.
+
+Examples (from the repository root):
+    python benchmarks/bench_report_store.py --records 2000000
+    python benchmarks/bench_report_store.py --records 200000 --days 3 --json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.report_store import SCHEMAS, ReportStore  # noqa: E402
+
+SCHEMA = SCHEMAS['bio-authenticity']
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', type=int, default=1_000_000, help='reports to store')
+    parser.add_argument('--days', type=int, default=7, help='days the reports are spread over')
+    parser.add_argument('--appends', type=int, default=50_000, help='reports appended one by one to time the hot path')
+    parser.add_argument('--seed', type=int, default=0, help='seed for the synthetic reports')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    return parser.parse_args(argv)
+
+
+def make_report(values):
+    """A bio-authenticity result shaped like build_report's, from one row of metric values"""
+    report = {'status': 'success', 'fallback_analyses': []}
+    for (name, path), value in zip(SCHEMA.items(), values):
+        target = report
+        for key in path[:-1]:
+            target = target.setdefault(key, {})
+        target[path[-1]] = int(value)
+    return report
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    rng = np.random.default_rng(args.seed)
+    root = tempfile.mkdtemp(prefix='verifyai-bench-reports-')
+    try:
+        store = ReportStore(root, flush_interval=3600)
+        start = time.time() - args.days * 86400
+        values = rng.integers(0, 101, (args.records, len(SCHEMA))).astype(np.float32)
+        timestamps = np.sort(rng.uniform(start, start + args.days * 86400, args.records))
+
+        # Hot path: one full report per append, as the endpoints do
+        sample = make_report(values[0])
+        started = time.perf_counter()
+        for _ in range(args.appends):
+            store.append('bio-authenticity', sample, timestamp=timestamps[0])
+        append_us = (time.perf_counter() - started) / args.appends * 1e6
+        store._pending.clear()
+
+        # Bulk load through the same queue and flush, in chunks the writer thread would see;
+        # only the flushes (the writer thread's work) are timed
+        flush_s = 0.0
+        chunk = 100_000
+        for offset in range(0, args.records, chunk):
+            for row, ts in zip(values[offset:offset + chunk].tolist(), timestamps[offset:offset + chunk].tolist()):
+                store._pending.append(('bio-authenticity', ts, False, tuple(row)))
+            started = time.perf_counter()
+            store.flush()
+            flush_s += time.perf_counter() - started
+
+        since = float(timestamps[args.records // 4])
+        where = ['filter_probability>60', 'eye_filtering<=50']
+        started = time.perf_counter()
+        result = store.query('bio-authenticity', since=since, where=where,
+                             columns=['tooth_wear', 'age_manipulation_probability'],
+                             histogram='age_manipulation_probability', bins=10, value_range=(0, 100))
+        query_s = time.perf_counter() - started
+        started = time.perf_counter()
+        store.query('bio-authenticity')
+        full_query_s = time.perf_counter() - started
+
+        names = list(SCHEMA)
+        mask = (
+            (timestamps >= since)
+            & (values[:, names.index('filter_probability')] > 60)
+            & (values[:, names.index('eye_filtering')] <= 50)
+        )
+        tooth_wear = values[mask, names.index('tooth_wear')].astype(np.float64)
+        manipulation = values[mask, names.index('age_manipulation_probability')]
+        expected_counts = np.histogram(manipulation, bins=np.linspace(0, 100, 11))[0].tolist()
+        mismatches = []
+        if result['count'] != int(mask.sum()):
+            mismatches.append({'field': 'count', 'store': result['count'], 'numpy': int(mask.sum())})
+        if abs(result['columns']['tooth_wear']['mean'] - float(tooth_wear.mean())) > 1e-3:
+            mismatches.append({'field': 'tooth_wear.mean', 'store': result['columns']['tooth_wear']['mean'],
+                               'numpy': round(float(tooth_wear.mean()), 4)})
+        if result['histogram']['counts'] != expected_counts:
+            mismatches.append({'field': 'histogram', 'store': result['histogram']['counts'], 'numpy': expected_counts})
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    report = {
+        'records': args.records,
+        'days': args.days,
+        'append_us': round(append_us, 2),
+        'flush_s': round(flush_s, 3),
+        'query_ms': round(query_s * 1000, 2),
+        'full_query_ms': round(full_query_s * 1000, 2),
+        'rows_scanned': result['rows_scanned'],
+        'segments': result['segments'],
+        'matched': result['count'],
+        'mismatches': mismatches
+    }
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"append (hot path): {report['append_us']}us per report")
+        print(f"flushed {report['records']} reports over {report['days']} days in {report['flush_s']}s")
+        print(f"filtered query with histogram: {report['query_ms']}ms "
+              f"({report['rows_scanned']} rows in {report['segments']} segments, {report['matched']} matched)")
+        print(f"all-column query over every report: {report['full_query_ms']}ms")
+        print(f"mismatches against NumPy: {len(mismatches)}")
+        for mismatch in mismatches:
+            print(f"  {mismatch}")
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
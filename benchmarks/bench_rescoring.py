@@ -0,0 +1,113 @@
+"""
+Batch re-scoring benchmark for VerifyAI
+
+Times lib/batch_scoring.score_batch over N synthetic stored records and
+checks a sample of them against the scalar scoring in
+BioAuthenticityAnalyzer (calculate_true_age_vs_apparent_age and
+build_report). The check fails on any mismatch. No model is called.
+
+Examples (from the repository root):
+    python benchmarks/bench_rescoring.py --records 1000000
+    python benchmarks/bench_rescoring.py --records 200000 --verify 200000 --float-metrics
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.batch_scoring import COLUMNS, METRIC_COLUMNS, score_batch  # noqa: E402
+from lib.bio_authenticity import BioAuthenticityAnalyzer  # noqa: E402
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', type=int, default=1_000_000, help='records to re-score')
+    parser.add_argument('--verify', type=int, default=20_000, help='records to check against the scalar path')
+    parser.add_argument('--float-metrics', action='store_true', help='use fractional metric values instead of integers')
+    parser.add_argument('--seed', type=int, default=0, help='seed for the synthetic records')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    return parser.parse_args(argv)
+
+
+def make_records(count, float_metrics, seed):
+    """Synthetic metric columns (0-100) and stated ages (NaN where none was given)"""
+    rng = np.random.default_rng(seed)
+    if float_metrics:
+        columns = {name: np.round(rng.uniform(0, 100, count), 2) for name in COLUMNS}
+    else:
+        columns = {name: rng.integers(0, 101, count).astype(np.float64) for name in COLUMNS}
+    stated_age = rng.integers(16, 80, count).astype(np.float64)
+    stated_age[rng.random(count) < 0.3] = np.nan
+    return columns, stated_age
+
+
+def scalar_score(analyzer, columns, stated_age, i, float_metrics):
+    """Score record i through the analyzer's own scalar code"""
+    cast = float if float_metrics else int
+    analyses = {}
+    for (name, section) in zip(('skin', 'eye', 'dental'), METRIC_COLUMNS):
+        metrics = {metric: cast(columns[metric][i]) for metric in METRIC_COLUMNS[section]}
+        analyses[name] = {'status': 'success', section: metrics}
+    stated = None if np.isnan(stated_age[i]) else int(stated_age[i])
+    report = analyzer.build_report(analyses, stated)
+    age = report['age_analysis']
+    return {
+        'apparent_age': age['apparent_age'],
+        'true_age': age['true_age'],
+        'age_difference': age['age_difference'],
+        'age_manipulation_probability': age['age_manipulation_probability'],
+        'is_age_manipulated': age['is_age_manipulated'],
+        'filter_impact_score': age['filter_impact_score'],
+        'confidence_score': age['confidence_score'],
+        'overall_authenticity_score': report['overall_authenticity_score'],
+        'is_authentic': report['is_authentic']
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    columns, stated_age = make_records(args.records, args.float_metrics, args.seed)
+
+    started = time.perf_counter()
+    results = score_batch(columns, stated_age)
+    elapsed = time.perf_counter() - started
+
+    analyzer = BioAuthenticityAnalyzer(model=object())
+    checked = min(args.verify, args.records)
+    mismatches = []
+    scalar_started = time.perf_counter()
+    for i in range(checked):
+        expected = scalar_score(analyzer, columns, stated_age, i, args.float_metrics)
+        for name, value in expected.items():
+            if results[name][i].item() != value:
+                mismatches.append({'record': i, 'field': name, 'scalar': value, 'batch': results[name][i].item()})
+    scalar_elapsed = time.perf_counter() - scalar_started
+
+    report = {
+        'records': args.records,
+        'batch_s': round(elapsed, 3),
+        'records_per_s': round(args.records / elapsed) if elapsed else None,
+        'verified': checked,
+        'scalar_records_per_s': round(checked / scalar_elapsed) if scalar_elapsed else None,
+        'mismatches': len(mismatches),
+        'first_mismatches': mismatches[:5]
+    }
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"re-scored {report['records']} records in {report['batch_s']}s ({report['records_per_s']}/s)")
+        print(f"scalar path: {report['scalar_records_per_s']}/s over {checked} records")
+        print(f"mismatches against the scalar path: {report['mismatches']}")
+        for mismatch in report['first_mismatches']:
+            print(f"  {mismatch}")
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
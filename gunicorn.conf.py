@@ -0,0 +1,54 @@
+"""
+Prefork (multi-process) serving configuration for VerifyAI
+
+Loads api/index.py once in the master and forks the workers from it, so
+every worker starts warm. Workers share what can be shared on the host:
+- the result cache store (RESULT_CACHE_DB, a SQLite file in WAL mode,
+  defaults to one in the temp directory), so an image analysed by one
+  worker is a cache hit on every other
+- the near-duplicate index log (NEAR_DUPLICATE_INDEX_PATH)
+Model clients open network connections, so they are built in each worker
+after the fork, and the per-key request quota (GEMINI_KEY_RPM and
+GEMINI_KEY_BURST) is split between the workers.
+
+Run from the repository root:
+    pip install -r requirements-prefork.txt
+    gunicorn -c gunicorn.conf.py api.index:app
+"""
+
+import os
+import tempfile
+import multiprocessing
+
+from dotenv import load_dotenv
+
+# Read .env before the settings below derive values from it
+load_dotenv()
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', str(multiprocessing.cpu_count())))
+# Model calls are network-bound, so each worker serves several requests on threads
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', '8'))
+preload_app = True
+# A little longer than REQUEST_DEADLINE, so the deadline answers first
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = 30
+keepalive = 5
+
+os.environ.setdefault('RESULT_CACHE_DB', os.path.join(tempfile.gettempdir(), 'verifyai-results.sqlite3'))
+
+# Each worker has its own key pool, so each gets its share of every key's quota
+os.environ['GEMINI_KEY_RPM'] = str(float(os.getenv('GEMINI_KEY_RPM', '0')) / workers)
+if os.getenv('GEMINI_KEY_BURST'):
+    os.environ['GEMINI_KEY_BURST'] = str(float(os.environ['GEMINI_KEY_BURST']) / workers)
+
+# Warm up in the workers, not the master: connections opened before the fork would be shared
+_model_warmup = os.getenv('MODEL_WARMUP', 'on').lower()
+os.environ['MODEL_WARMUP'] = 'off'
+
+
+def post_fork(server, worker):
+    from api import index
+    if _model_warmup in ('on', 'probe'):
+        index.model_registry.warm_up_in_background(probe=_model_warmup == 'probe')
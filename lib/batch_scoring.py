@@ -0,0 +1,130 @@
+"""
+Batch Scoring Module for VerifyAI
+Vectorized re-scoring of stored skin/eye/dental metrics with NumPy, matching
+BioAuthenticityAnalyzer's scalar scoring exactly
+"""
+
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+from lib.weight_profile import DEFAULT_PROFILE, WeightProfile
+
+# Stored metrics the scoring reads, by report section
+METRIC_COLUMNS = {
+    "skin_analysis": ("wrinkle_prominence", "filter_probability"),
+    "eye_analysis": ("eyelid_drooping", "crows_feet", "eye_filtering"),
+    "dental_analysis": ("tooth_wear", "whitening_filtering"),
+}
+
+COLUMNS = tuple(name for names in METRIC_COLUMNS.values() for name in names)
+
+
+def score_batch(columns: Dict[str, Iterable], stated_age: Iterable = None,
+                profile: WeightProfile = None) -> Dict[str, np.ndarray]:
+    """
+    Score N records in one vectorized pass.
+
+    columns maps each name in COLUMNS to N metric values (missing columns
+    count as 0, like a missing key in the scalar path). stated_age holds N
+    ages, with 0 or NaN where none was stated. Every operation mirrors the
+    scalar scoring in the same order on float64, so results are identical
+    to calculate_true_age_vs_apparent_age and build_report for the same
+    profile.
+    """
+    profile = profile or DEFAULT_PROFILE
+    count = _batch_length(columns, stated_age)
+    metric = {
+        name: np.asarray(columns[name], dtype=np.float64) if name in columns else np.zeros(count)
+        for name in COLUMNS
+    }
+
+    # Apparent age, accumulated in the scalar path's order
+    weight_count = 0 + profile.skin_weight + profile.eye_weight + profile.dental_weight
+    age_score = (metric["wrinkle_prominence"] / 100) * profile.wrinkle_max_years * profile.skin_weight
+    age_score = age_score + (
+        (metric["eyelid_drooping"] + metric["crows_feet"]) / 200
+    ) * profile.eye_max_years * profile.eye_weight
+    age_score = age_score + (metric["tooth_wear"] / 100) * profile.dental_max_years * profile.dental_weight
+    apparent_age = np.trunc(age_score / weight_count).astype(np.int64) + profile.base_age
+
+    filter_impact = (
+        metric["filter_probability"] * profile.skin_filter_weight +
+        metric["eye_filtering"] * profile.eye_filter_weight +
+        metric["whitening_filtering"] * profile.dental_filter_weight
+    )
+    age_reduction = (filter_impact / 100) * profile.filter_max_years
+    true_age = apparent_age + np.trunc(age_reduction).astype(np.int64)
+
+    manipulation = (
+        np.where(metric["filter_probability"] > profile.skin_filter_threshold, profile.skin_filter_points, 0) +
+        np.where(metric["eye_filtering"] > profile.eye_filter_threshold, profile.eye_filter_points, 0) +
+        np.where(metric["whitening_filtering"] > profile.dental_filter_threshold, profile.dental_filter_points, 0)
+    )
+    if stated_age is not None:
+        stated = np.asarray(stated_age, dtype=np.float64)
+        stated_given = ~np.isnan(stated) & (stated != 0)
+        off = np.abs(np.where(stated_given, stated, 0) - true_age) > profile.stated_age_tolerance
+        manipulation = manipulation + np.where(stated_given & off, profile.stated_age_points, 0)
+    manipulation = np.minimum(manipulation, 100)
+
+    overall = 100 - (
+        (metric["filter_probability"] * profile.skin_authenticity_weight) +
+        (metric["eye_filtering"] * profile.eye_authenticity_weight) +
+        (metric["whitening_filtering"] * profile.dental_authenticity_weight)
+    )
+
+    return {
+        "apparent_age": apparent_age,
+        "true_age": true_age,
+        "age_difference": true_age - apparent_age,
+        "age_manipulation_probability": manipulation,
+        "is_age_manipulated": manipulation > profile.manipulated_threshold,
+        "filter_impact_score": np.trunc(filter_impact).astype(np.int64),
+        "confidence_score": np.where(
+            manipulation < profile.confidence_high_below, profile.confidence_high,
+            np.where(manipulation < profile.confidence_medium_below, profile.confidence_medium, profile.confidence_low)
+        ),
+        "overall_authenticity_score": np.maximum(0, np.trunc(overall).astype(np.int64)),
+        "is_authentic": overall > profile.authentic_threshold,
+    }
+
+
+def columns_from_reports(reports: List[Dict]):
+    """
+    Return (columns, stated_age) arrays from stored bio-authenticity reports.
+    Raises TypeError for a report or analysis section that is not a dict.
+    """
+    columns = {name: np.zeros(len(reports)) for name in COLUMNS}
+    stated_age = np.full(len(reports), np.nan)
+    for i, report in enumerate(reports):
+        if not isinstance(report, dict):
+            raise TypeError(f"Report {i} is not an object")
+        for section, names in METRIC_COLUMNS.items():
+            analysis = report.get(section) or {}
+            if not isinstance(analysis, dict):
+                raise TypeError(f"Report {i} {section} is not an object")
+            for name in names:
+                columns[name][i] = analysis.get(name, 0)
+        age_analysis = report.get("age_analysis") or {}
+        if not isinstance(age_analysis, dict):
+            raise TypeError(f"Report {i} age_analysis is not an object")
+        stated = age_analysis.get("stated_age")
+        if stated:
+            stated_age[i] = stated
+    return columns, stated_age
+
+
+def score_reports(reports: List[Dict], profile: WeightProfile = None) -> Dict[str, np.ndarray]:
+    """Re-score stored bio-authenticity reports, see score_batch"""
+    columns, stated_age = columns_from_reports(reports)
+    return score_batch(columns, stated_age, profile)
+
+
+def _batch_length(columns: Dict[str, Iterable], stated_age: Iterable = None) -> int:
+    lengths = {len(values) for values in columns.values()}
+    if stated_age is not None:
+        lengths.add(len(stated_age))
+    if len(lengths) > 1:
+        raise ValueError(f"Columns have different lengths: {sorted(lengths)}")
+    return lengths.pop() if lengths else 0
@@ -4,12 +4,225 @@ Advanced facial analysis for detecting beauty filters and age manipulation
 """
 
 import json
-import numpy as np
-from typing import Dict, List, Tuple
-import google.generativeai as genai
-from PIL import Image
+import math
+import time
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Dict, List, Tuple
 from io import BytesIO
-import base64
+from lib.image_pipeline import ImagePreprocessor, PreparedImage
+from lib.face_regions import FaceRegionLocator
+from lib.result_cache import ResultCache
+from lib.key_pool import KeysExhausted
+from lib.deadline import ModelCaller, current as current_deadline
+from lib.weight_profile import DEFAULT_PROFILE
+from lib import metrics
+from lib.metrics import stage, record_fallback
+
+PRESCREEN_DECISIONS = metrics.registry.counter(
+    "verifyai_prescreen_decisions_total",
+    "Pixel pre-screen outcomes for bio-authenticity reports",
+    ("decision",)
+)
+SKIPPED_ANALYSES = metrics.registry.counter(
+    "verifyai_bio_analyses_skipped_total",
+    "Feature analyses skipped in tiered mode because the verdict no longer depended on them",
+    ("analysis",)
+)
+
+
+class PixelPrescreen:
+    """
+    CPU-only pre-screen computed from the decoded image with NumPy before
+    any model call:
+    - laplacian_variance: overall edge/detail energy
+    - high_frequency_energy: share of spectral energy above a quarter of Nyquist
+    - noise_residual: robust spread of the image minus its 3x3 box blur
+    - skin_noise / skin_texture_uniformity: the same residual inside a
+      YCbCr skin-tone mask, where beauty filters smooth first
+    From these it estimates skin-analysis style smoothness and
+    filter_probability scores (0-100).
+
+    policy decides what happens when the estimate is confident (filter
+    probability at most natural_below, or at least filtered_above, with
+    enough skin visible):
+    - "off": no pre-screen
+    - "observe": compute and attach the statistics only
+    - "downgrade": run the single fused model call instead of one per feature
+    - "skip": use the local estimate as the skin analysis and call the model
+      for the eye and dental analyses only (in fused mode the single call
+      still runs and only its skin section is replaced)
+    The noise references are starting points; calibrate them against
+    model results gathered with "observe" before enabling skip or downgrade.
+    """
+
+    POLICIES = ("off", "observe", "downgrade", "skip")
+
+    # YCbCr chroma box commonly used for skin detection
+    SKIN_CB = (77, 127)
+    SKIN_CR = (133, 173)
+    # Skin residual (grey levels) of a typical unfiltered photo and of heavy smoothing
+    NOISE_NATURAL = 3.0
+    NOISE_FILTERED = 0.6
+
+    def __init__(self,
+                 policy: str = "off",
+                 natural_below: float = 15,
+                 filtered_above: float = 85,
+                 min_skin_fraction: float = 0.05,
+                 spectrum_size: int = 256):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown pre-screen policy: {policy}")
+        self.policy = policy
+        self.natural_below = natural_below
+        self.filtered_above = filtered_above
+        self.min_skin_fraction = min_skin_fraction
+        self.spectrum_size = spectrum_size
+
+    @property
+    def enabled(self) -> bool:
+        return self.policy != "off"
+
+    def analyze(self, image) -> Dict:
+        """Return pixel statistics, estimates and the policy decision for a PIL image"""
+        # NumPy stays off the cold-start path until the pre-screen is used
+        import numpy as np
+
+        ycbcr = np.asarray(image.convert("YCbCr"), dtype=np.float32)
+        luma, cb, cr = ycbcr[..., 0], ycbcr[..., 1], ycbcr[..., 2]
+
+        center = luma[1:-1, 1:-1]
+        laplacian = luma[1:-1, :-2] + luma[1:-1, 2:] + luma[:-2, 1:-1] + luma[2:, 1:-1] - 4 * center
+        # Separable 3x3 box blur: three-row sums, then three-column sums
+        rows = luma[:-2] + luma[1:-1] + luma[2:]
+        blur = (rows[:, :-2] + rows[:, 1:-1] + rows[:, 2:]) / 9
+        residual = np.abs(center - blur)
+
+        skin = (
+            (cb >= self.SKIN_CB[0]) & (cb <= self.SKIN_CB[1]) &
+            (cr >= self.SKIN_CR[0]) & (cr <= self.SKIN_CR[1])
+        )
+        skin_inner = skin[1:-1, 1:-1]
+        skin_fraction = float(skin.mean())
+        has_skin = bool(skin_inner.any())
+        # 1.4826 * median absolute deviation estimates the noise standard deviation;
+        # every other pixel is plenty for the medians and halves their cost twice over
+        sample, skin_sample = residual[::2, ::2], skin_inner[::2, ::2]
+        noise_residual = float(np.median(sample)) * 1.4826
+        skin_noise = (
+            float(np.median(sample[skin_sample])) * 1.4826 if skin_sample.any() else noise_residual
+        )
+
+        smoothness = self._scale(skin_noise, self.NOISE_NATURAL, 0.0)
+        filter_probability = self._scale(skin_noise, self.NOISE_NATURAL, self.NOISE_FILTERED)
+        stats = {
+            "laplacian_variance": round(float(laplacian.var()), 2),
+            "high_frequency_energy": round(self._high_frequency_energy(np, luma), 4),
+            "noise_residual": round(noise_residual, 3),
+            "skin_noise": round(skin_noise, 3),
+            "skin_fraction": round(skin_fraction, 3),
+            "skin_texture_uniformity": round(smoothness, 1),
+            "luminosity": round(float(luma[skin].mean() if has_skin else luma.mean()) / 2.55, 1),
+            "tone_uniformity": round(
+                100 - min(100.0, float(np.hypot(cb[skin].std(), cr[skin].std())) * 5) if has_skin else 0.0, 1
+            ),
+            "smoothness": round(smoothness, 1),
+            "filter_probability": round(filter_probability, 1),
+        }
+        stats["decision"] = self.decide(stats)
+        return stats
+
+    def decide(self, stats: Dict) -> str:
+        """Return "model", "downgrade" or "skip" for the computed statistics"""
+        confident = stats["skin_fraction"] >= self.min_skin_fraction and (
+            stats["filter_probability"] <= self.natural_below or
+            stats["filter_probability"] >= self.filtered_above
+        )
+        if not confident or self.policy in ("off", "observe"):
+            return "model"
+        return self.policy
+
+    @staticmethod
+    def skin_analysis(stats: Dict) -> Dict:
+        """Skin analysis in the model's schema, estimated from pixel statistics"""
+        return {
+            "luminosity": int(stats["luminosity"]),
+            "smoothness": int(stats["smoothness"]),
+            "pore_visibility": int(100 - stats["skin_texture_uniformity"]),
+            # Residual texture is the only wrinkle signal available locally
+            "wrinkle_prominence": int(max(0.0, 100 - stats["smoothness"]) / 2),
+            "tone_uniformity": int(stats["tone_uniformity"]),
+            "filter_probability": int(stats["filter_probability"]),
+            "analysis": "Local pixel-statistics estimate (no model call)",
+            "source": "prescreen"
+        }
+
+    def _high_frequency_energy(self, np, luma) -> float:
+        """Share of spectral energy above a quarter of Nyquist, on a centered crop"""
+        height, width = luma.shape
+        size = min(self.spectrum_size, height, width)
+        top, left = (height - size) // 2, (width - size) // 2
+        crop = luma[top:top + size, left:left + size]
+        power = np.abs(np.fft.rfft2(crop - crop.mean())) ** 2
+        fy = np.fft.fftfreq(size)[:, None]
+        fx = np.fft.rfftfreq(size)[None, :]
+        total = float(power.sum())
+        return float(power[np.hypot(fy, fx) > 0.125].sum()) / total if total else 0.0
+
+    @staticmethod
+    def _scale(value: float, zero_at: float, hundred_at: float) -> float:
+        """Map value linearly so zero_at -> 0 and hundred_at -> 100, clipped"""
+        return min(100.0, max(0.0, (zero_at - value) / (zero_at - hundred_at) * 100))
+
+
+class TierPolicy:
+    """
+    Execution plan of the "tiered" analysis mode. tiers lists the feature
+    analyses in the order they run, e.g. "skin,eye|dental": tiers separated
+    by "|" run one after another, the analyses within a tier in parallel.
+    Before each tier the analyzer bounds the final scores, with every
+    metric of the analyses not yet run anywhere in 0-100, and skips the
+    remaining tiers once the listed decisions come out the same at both
+    ends:
+    - "authenticity": is_authentic (overall_authenticity_score above 65)
+    - "manipulation": is_age_manipulated (age_manipulation_probability above 50)
+    The default runs skin and eye together, as they carry most of both
+    scores, and dental only when the verdict still depends on it.
+    """
+
+    # Decision -> (bounded score, threshold the report's verdict compares it with)
+    DECISIONS = {
+        "authenticity": ("overall_authenticity_score", 65),
+        "manipulation": ("age_manipulation_probability", 50),
+    }
+
+    def __init__(self, tiers: str = "skin,eye|dental", decisions: str = "authenticity,manipulation"):
+        self.tiers = [
+            [name.strip() for name in tier.split(",") if name.strip()]
+            for tier in tiers.split("|") if tier.strip()
+        ]
+        self.decisions = [decision.strip() for decision in decisions.split(",") if decision.strip()]
+        names = [name for tier in self.tiers for name in tier]
+        unknown = set(names) - set(BioAuthenticityAnalyzer.FEATURE_ANALYSES)
+        if unknown:
+            raise ValueError(f"Unknown analyses in tiers: {', '.join(sorted(unknown))}")
+        if sorted(names) != sorted(BioAuthenticityAnalyzer.FEATURE_ANALYSES):
+            raise ValueError("Tiers must list every feature analysis exactly once")
+        unknown = set(self.decisions) - set(self.DECISIONS)
+        if unknown:
+            raise ValueError(f"Unknown tier decisions: {', '.join(sorted(unknown))}")
+
+    def settled(self, bounds: Dict) -> bool:
+        """Whether every decision is the same at both ends of the score bounds"""
+        for decision in self.decisions:
+            score, threshold = self.DECISIONS[decision]
+            low, high = bounds[score]
+            if (low > threshold) != (high > threshold):
+                return False
+        return True
+
+    def __str__(self) -> str:
+        return "|".join(",".join(tier) for tier in self.tiers) + "/" + ",".join(self.decisions)
 
 
 class BioAuthenticityAnalyzer:
@@ -21,11 +234,88 @@ class BioAuthenticityAnalyzer:
     - True-Age vs Apparent-Age discrepancies
     """
 
-    def __init__(self, api_key: str = None):
-        """Initialize the analyzer with Gemini API"""
-        if api_key:
-            genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-1.5-flash')
+    # Feature analyses run by the comprehensive report, in report order:
+    # name -> (analyzer method, result key, mock fallback)
+    FEATURE_ANALYSES = {
+        "skin": ("analyze_skin_luminosity", "skin_analysis", "_get_mock_skin_analysis"),
+        "eye": ("analyze_eye_features", "eye_analysis", "_get_mock_eye_analysis"),
+        "dental": ("analyze_dental_features", "dental_analysis", "_get_mock_dental_analysis"),
+    }
+
+    # Metrics the age and authenticity scoring reads from each analysis
+    SCORED_METRICS = {
+        "skin": ("wrinkle_prominence", "filter_probability"),
+        "eye": ("eyelid_drooping", "crows_feet", "eye_filtering"),
+        "dental": ("tooth_wear", "whitening_filtering"),
+    }
+
+    # Bump whenever a prompt or the scoring changes, so cached reports are invalidated
+    PROMPT_VERSION = "1"
+
+    # "per_feature" makes one model call per analysis, "fused" a single combined call,
+    # "tiered" runs the analyses in tiers and stops once the verdict is settled (see TierPolicy)
+    ANALYSIS_MODES = ("per_feature", "fused", "tiered")
+
+    # Image region each analysis is sent when regions are located
+    REGION_FOR_ANALYSIS = {"skin": "face", "eye": "eyes", "dental": "mouth", "fused": "face"}
+
+    def __init__(self, api_key: str = None, max_concurrency: int = 3, call_timeout: float = None,
+                 mode: str = "per_feature", preprocessor: ImagePreprocessor = None,
+                 model=None, caller: ModelCaller = None, model_factory: Callable = None,
+                 prescreen: PixelPrescreen = None, regions: FaceRegionLocator = None,
+                 region_cache: ResultCache = None, tiers: TierPolicy = None):
+        """
+        Initialize the analyzer with Gemini API
+
+        max_concurrency caps how many feature analyses run in parallel for a
+        single report (1 runs them one after another). call_timeout is the
+        per-call deadline in seconds; a call that misses it falls back to the
+        mock analysis like any other failed call. mode is the default
+        analysis mode, see ANALYSIS_MODES. preprocessor decodes and
+        downscales each image once for all of a report's model calls.
+        model is a shared model instance (e.g. from ModelRegistry); without
+        one the analyzer configures Gemini and builds its own. model_factory
+        defers building the model to the first analysis, keeping model
+        clients off the cold-start path. caller makes
+        the model calls, retrying and hedging them within the request
+        deadline (see lib/deadline.py). prescreen is the local pixel
+        pre-screen and its policy (off by default). regions locates the
+        face, eyes and mouth so each analysis is sent only its crop (off by
+        default); region_cache then caches analyses per crop, so a region
+        seen before is not analyzed again. tiers is the execution plan of
+        the "tiered" mode.
+        """
+        if mode not in self.ANALYSIS_MODES:
+            raise ValueError(f"Unknown analysis mode: {mode}")
+        self.api_key = api_key
+        self.model_factory = model_factory
+        self._model = model
+        self.max_concurrency = max(1, int(max_concurrency or 1))
+        self.call_timeout = call_timeout
+        self.mode = mode
+        self.preprocessor = preprocessor or ImagePreprocessor()
+        self.caller = caller or ModelCaller()
+        self.prescreen = prescreen or PixelPrescreen()
+        self.regions = regions or FaceRegionLocator(method="off")
+        self.region_cache = region_cache
+        self.tiers = tiers or TierPolicy()
+
+    @property
+    def model(self):
+        """The model used for analyses, built on first use"""
+        if self._model is None:
+            if self.model_factory is not None:
+                self._model = self.model_factory()
+            else:
+                import google.generativeai as genai
+                if self.api_key:
+                    genai.configure(api_key=self.api_key)
+                self._model = genai.GenerativeModel('gemini-1.5-flash')
+        return self._model
+
+    @model.setter
+    def model(self, model):
+        self._model = model
 
     def analyze_skin_luminosity(self, image_data: bytes) -> Dict:
         """
@@ -33,7 +323,7 @@ class BioAuthenticityAnalyzer:
         and beauty filter application
         """
         try:
-            image = Image.open(BytesIO(image_data))
+            image = self._model_image(image_data, "skin")
             
             prompt = """Analyze this facial image for skin characteristics:
 1. Analyze skin luminosity/brightness levels (0-100 scale)
@@ -54,20 +344,14 @@ Return ONLY valid JSON with these exact keys:
   "analysis": "brief description"
 }"""
 
-            response = self.model.generate_content([prompt, image])
-            result = self._parse_json_response(response.text)
+            with stage("model_call.skin"):
+                response = self.caller.generate(self.model, [prompt, image], timeout=self.call_timeout)
+            with stage("parse.skin"):
+                result = self._parse_json_response(response.text)
             
-            return {
-                "status": "success",
-                "skin_analysis": result,
-                "filter_detected": result.get("filter_probability", 0) > 60
-            }
+            return self._feature_result("skin", result)
         except Exception as e:
-            return {
-                "status": "error",
-                "message": str(e),
-                "skin_analysis": self._get_mock_skin_analysis()
-            }
+            return self._fallback_result("skin", str(e), reason=self._failure_reason(e))
 
     def analyze_eye_features(self, image_data: bytes) -> Dict:
         """
@@ -75,7 +359,7 @@ Return ONLY valid JSON with these exact keys:
         Detect signs of age-related changes and filter effects
         """
         try:
-            image = Image.open(BytesIO(image_data))
+            image = self._model_image(image_data, "eye")
             
             prompt = """Analyze the eye area in this facial image:
 1. Measure eyelid drooping level (0-100, where 100 is maximum drooping)
@@ -98,20 +382,14 @@ Return ONLY valid JSON:
   "age_indicators": "description"
 }"""
 
-            response = self.model.generate_content([prompt, image])
-            result = self._parse_json_response(response.text)
+            with stage("model_call.eye"):
+                response = self.caller.generate(self.model, [prompt, image], timeout=self.call_timeout)
+            with stage("parse.eye"):
+                result = self._parse_json_response(response.text)
             
-            return {
-                "status": "success",
-                "eye_analysis": result,
-                "age_signs_detected": result.get("eyelid_drooping", 0) > 30 or result.get("crows_feet", 0) > 40
-            }
+            return self._feature_result("eye", result)
         except Exception as e:
-            return {
-                "status": "error",
-                "message": str(e),
-                "eye_analysis": self._get_mock_eye_analysis()
-            }
+            return self._fallback_result("eye", str(e), reason=self._failure_reason(e))
 
     def analyze_dental_features(self, image_data: bytes) -> Dict:
         """
@@ -119,7 +397,7 @@ Return ONLY valid JSON:
         Detect age-related dental changes and smile authenticity
         """
         try:
-            image = Image.open(BytesIO(image_data))
+            image = self._model_image(image_data, "dental")
             
             prompt = """Analyze the dental and smile features in this facial image:
 1. Measure tooth visibility percentage (0-100)
@@ -144,20 +422,14 @@ Return ONLY valid JSON:
   "dental_age_indicators": "description"
 }"""
 
-            response = self.model.generate_content([prompt, image])
-            result = self._parse_json_response(response.text)
+            with stage("model_call.dental"):
+                response = self.caller.generate(self.model, [prompt, image], timeout=self.call_timeout)
+            with stage("parse.dental"):
+                result = self._parse_json_response(response.text)
             
-            return {
-                "status": "success",
-                "dental_analysis": result,
-                "authentic_smile": result.get("smile_authenticity", 0) > 70
-            }
+            return self._feature_result("dental", result)
         except Exception as e:
-            return {
-                "status": "error",
-                "message": str(e),
-                "dental_analysis": self._get_mock_dental_analysis()
-            }
+            return self._fallback_result("dental", str(e), reason=self._failure_reason(e))
 
     def calculate_true_age_vs_apparent_age(self, 
                                           skin_analysis: Dict,
@@ -253,6 +525,14 @@ Return ONLY valid JSON:
             # Cap manipulation score at 100
             age_manipulation_score = min(age_manipulation_score, 100)
 
+            # Confidence bands are shared with the vectorized re-scoring
+            if age_manipulation_score < DEFAULT_PROFILE.confidence_high_below:
+                confidence_score = DEFAULT_PROFILE.confidence_high
+            elif age_manipulation_score < DEFAULT_PROFILE.confidence_medium_below:
+                confidence_score = DEFAULT_PROFILE.confidence_medium
+            else:
+                confidence_score = DEFAULT_PROFILE.confidence_low
+
             return {
                 "status": "success",
                 "apparent_age": apparent_age,
@@ -264,7 +544,7 @@ Return ONLY valid JSON:
                 "filter_impact_score": int(filter_impact),
                 "age_indicators": age_indicators,
                 "manipulation_factors": manipulation_factors,
-                "confidence_score": 85 if age_manipulation_score < 30 else (70 if age_manipulation_score < 60 else 55),
+                "confidence_score": confidence_score,
                 "recommendation": self._get_age_recommendation(age_manipulation_score, true_age, stated_age)
             }
         except Exception as e:
@@ -277,17 +557,89 @@ Return ONLY valid JSON:
 
     def comprehensive_bio_authenticity_report(self,
                                              image_data: bytes,
-                                             stated_age: int = None) -> Dict:
+                                             stated_age: int = None,
+                                             mode: str = None) -> Dict:
         """
         Generate comprehensive Bio-Authenticity report
         Combines all analyses into a single report
         """
         try:
+            mode = self._resolve_mode(mode)
+
+            # Decode once; every sub-analysis reuses the compact encoding
+            image_data = self.prepare_image(image_data)
+            prescreen = self.run_prescreen(image_data)
+            mode, local = self._apply_prescreen(prescreen, mode)
+
             # Run all analyses
-            skin_analysis = self.analyze_skin_luminosity(image_data)
-            eye_analysis = self.analyze_eye_features(image_data)
-            dental_analysis = self.analyze_dental_features(image_data)
+            if mode == "fused":
+                analyses = {**self.analyze_all_features(image_data), **local}
+            elif mode == "tiered":
+                analyses = {**dict(self.iter_tiered_analyses(image_data, stated_age, local)), **local}
+            else:
+                names = [name for name in self.FEATURE_ANALYSES if name not in local]
+                analyses = {**self.run_feature_analyses(image_data, names), **local}
+
+            ordered = {name: analyses[name] for name in self.FEATURE_ANALYSES}
+            report = self._with_prescreen(self.build_report(ordered, stated_age, mode), prescreen)
+            return self._with_regions(report, image_data)
+        except Exception as e:
+            return {
+                "status": "error",
+                "message": str(e)
+            }
+
+    def iter_bio_authenticity_report(self,
+                                     image_data: bytes,
+                                     stated_age: int = None,
+                                     mode: str = None):
+        """
+        Streaming variant of comprehensive_bio_authenticity_report.
+        Yields ("analysis", {"name": ..., **result}) as each feature analysis
+        completes, then ("report", report) once everything is in. Closing the
+        generator early cancels analyses that have not started yet.
+        """
+        try:
+            mode = self._resolve_mode(mode)
+            image_data = self.prepare_image(image_data)
+            prescreen = self.run_prescreen(image_data)
+            mode, local = self._apply_prescreen(prescreen, mode)
+
+            analyses = {}
+            for name, result in local.items():
+                analyses[name] = result
+                yield "analysis", {"name": name, **result}
+
+            if mode == "fused":
+                completed = self.analyze_all_features(image_data).items()
+            elif mode == "tiered":
+                completed = self.iter_tiered_analyses(image_data, stated_age, local)
+            else:
+                names = [name for name in self.FEATURE_ANALYSES if name not in local]
+                completed = self.iter_feature_analyses(image_data, names)
 
+            for name, result in completed:
+                if name in local:
+                    continue
+                analyses[name] = result
+                yield "analysis", {"name": name, **result}
+
+            ordered = {name: analyses[name] for name in self.FEATURE_ANALYSES}
+            report = self._with_prescreen(self.build_report(ordered, stated_age, mode), prescreen)
+            yield "report", self._with_regions(report, image_data)
+        except Exception as e:
+            yield "report", {
+                "status": "error",
+                "message": str(e)
+            }
+
+    def build_report(self, analyses: Dict, stated_age: int = None, mode: str = None) -> Dict:
+        """Score completed skin/eye/dental analyses into the final report"""
+        skin_analysis = analyses["skin"]
+        eye_analysis = analyses["eye"]
+        dental_analysis = analyses["dental"]
+
+        with stage("scoring"):
             # Calculate age analysis
             age_analysis = self.calculate_true_age_vs_apparent_age(
                 skin_analysis,
@@ -297,34 +649,357 @@ Return ONLY valid JSON:
             )
 
             # Calculate overall authenticity score
-            overall_authenticity = 100 - (
-                (skin_analysis.get("skin_analysis", {}).get("filter_probability", 0) * 0.35) +
-                (eye_analysis.get("eye_analysis", {}).get("eye_filtering", 0) * 0.35) +
-                (dental_analysis.get("dental_analysis", {}).get("whitening_filtering", 0) * 0.30)
-            )
+            overall_authenticity = self._overall_authenticity(analyses)
 
-            return {
-                "status": "success",
-                "report_type": "Bio-Authenticity Analysis",
-                "overall_authenticity_score": max(0, int(overall_authenticity)),
-                "is_authentic": overall_authenticity > 65,
-                "skin_analysis": skin_analysis.get("skin_analysis", {}),
-                "eye_analysis": eye_analysis.get("eye_analysis", {}),
-                "dental_analysis": dental_analysis.get("dental_analysis", {}),
-                "age_analysis": age_analysis,
-                "summary": self._generate_summary(
-                    skin_analysis,
-                    eye_analysis,
-                    dental_analysis,
-                    age_analysis,
-                    overall_authenticity
-                )
+        report = {
+            "status": "success",
+            "report_type": "Bio-Authenticity Analysis",
+            "analysis_mode": mode or self.mode,
+            "overall_authenticity_score": max(0, int(overall_authenticity)),
+            "is_authentic": overall_authenticity > 65,
+            "skin_analysis": skin_analysis.get("skin_analysis", {}),
+            "eye_analysis": eye_analysis.get("eye_analysis", {}),
+            "dental_analysis": dental_analysis.get("dental_analysis", {}),
+            "age_analysis": age_analysis,
+            "fallback_analyses": [
+                name for name, analysis in analyses.items()
+                if analysis.get("status") not in ("success", "skipped")
+            ],
+            "skipped_analyses": [
+                name for name, analysis in analyses.items()
+                if analysis.get("status") == "skipped"
+            ],
+            "summary": self._generate_summary(
+                skin_analysis,
+                eye_analysis,
+                dental_analysis,
+                age_analysis,
+                overall_authenticity
+            )
+        }
+        if report["skipped_analyses"]:
+            # Skipped metrics score as 0; the bounds show how far they could have moved the scores
+            report["score_bounds"] = {
+                score: [round(low, 2), round(high, 2)]
+                for score, (low, high) in self.score_bounds(analyses, stated_age).items()
             }
-        except Exception as e:
-            return {
-                "status": "error",
-                "message": str(e)
+        return report
+
+    def score_bounds(self, analyses: Dict, stated_age: int = None) -> Dict:
+        """
+        (low, high) of overall_authenticity and age_manipulation_probability
+        over every value (0-100) the metrics of the analyses missing from
+        analyses, or skipped, could take. Both scores are monotone in each
+        metric except through the stated-age check, so the extremes come
+        from scoring with all unknown metrics at 0 and at 100, and the
+        stated-age check is bounded by the range of true_age between them.
+        """
+        known = {name: result for name, result in analyses.items() if result.get("status") != "skipped"}
+
+        def filled(value):
+            results = dict(known)
+            for name, (_, result_key, _) in self.FEATURE_ANALYSES.items():
+                if name not in results:
+                    results[name] = {result_key: {metric: value for metric in self.SCORED_METRICS[name]}}
+            return results
+
+        lowest, highest = filled(0), filled(100)
+        low_age = self.calculate_true_age_vs_apparent_age(lowest["skin"], lowest["eye"], lowest["dental"])
+        high_age = self.calculate_true_age_vs_apparent_age(highest["skin"], highest["eye"], highest["dental"])
+        # Filter indicators only, as no stated age was passed
+        low_manipulation = low_age["age_manipulation_probability"]
+        high_manipulation = high_age["age_manipulation_probability"]
+        if stated_age:
+            youngest, oldest = low_age["true_age"], high_age["true_age"]
+            if stated_age - oldest > 10 or youngest - stated_age > 10:
+                low_manipulation += 15
+            if stated_age - youngest > 10 or oldest - stated_age > 10:
+                high_manipulation += 15
+        return {
+            "overall_authenticity_score": (self._overall_authenticity(highest), self._overall_authenticity(lowest)),
+            "age_manipulation_probability": (min(low_manipulation, 100), min(high_manipulation, 100)),
+        }
+
+    def iter_tiered_analyses(self, image_data, stated_age: int = None, known: Dict = None):
+        """
+        Yield (name, result) for the feature analyses tier by tier (see
+        TierPolicy), then a skipped result for each analysis left once the
+        verdict no longer depends on it. known holds analyses already
+        available (e.g. from the pre-screen), which are not run or yielded.
+        """
+        analyses = dict(known or {})
+        for position, tier in enumerate(self.tiers.tiers):
+            names = [name for name in tier if name not in analyses]
+            if not names:
+                continue
+            if self.tiers.settled(self.score_bounds(analyses, stated_age)):
+                for name in (name for tier in self.tiers.tiers[position:] for name in tier):
+                    if name not in analyses:
+                        SKIPPED_ANALYSES.inc(analysis=name)
+                        yield name, self._skipped_result(name)
+                return
+            for name, result in self.iter_feature_analyses(image_data, names):
+                analyses[name] = result
+                yield name, result
+
+    def run_feature_analyses(self, image_data: bytes, names: List[str] = None) -> Dict:
+        """
+        Run the requested feature analyses (all by default) and return their
+        results keyed by name, see iter_feature_analyses.
+        """
+        names = list(names or self.FEATURE_ANALYSES)
+        results = dict(self.iter_feature_analyses(image_data, names))
+        return {name: results[name] for name in names}
+
+    def iter_feature_analyses(self, image_data: bytes, names: List[str] = None):
+        """
+        Yield (name, result) for the requested feature analyses as each one
+        completes. Calls fan out over a thread pool bounded by
+        max_concurrency; each one gets call_timeout seconds before it is
+        replaced by its mock fallback.
+        """
+        names = list(names or self.FEATURE_ANALYSES)
+        image_data = self.locate_regions(self.prepare_image(image_data))
+        if self.max_concurrency == 1 and self.call_timeout is None:
+            for name in names:
+                yield name, self._run_feature_analysis(name, image_data)
+            return
+
+        workers = min(self.max_concurrency, len(names))
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bio-analysis")
+        try:
+            futures = {
+                # Each task runs in a copy of the request context so its stage timings are attributed
+                executor.submit(contextvars.copy_context().run, self._run_feature_analysis, name, image_data): name
+                for name in names
             }
+            deadline = None
+            if self.call_timeout is not None:
+                # Calls queued behind the concurrency limit get their own slot of the budget
+                waves = math.ceil(len(names) / workers)
+                deadline = time.monotonic() + self.call_timeout * waves
+            request_deadline = current_deadline()
+            if request_deadline is not None:
+                deadline = min(deadline or request_deadline.expires_at, request_deadline.expires_at)
+
+            pending = set(futures)
+            while pending:
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    break
+                for future in done:
+                    name = futures[future]
+                    try:
+                        yield name, future.result()
+                    except Exception as e:
+                        yield name, self._fallback_result(name, str(e))
+
+            for future in pending:
+                future.cancel()
+                name = futures[future]
+                yield name, self._fallback_result(
+                    name, f"{name} analysis did not finish within its time budget", reason="timeout"
+                )
+        finally:
+            # Never block the response on a straggling model call
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def analyze_all_features(self, image_data: bytes) -> Dict:
+        """
+        Fused analysis: send the image once with a combined prompt and split
+        the response into the skin, eye and dental results the per-feature
+        calls would return. Sections missing from the response (or missing
+        any metric the age scoring consumes) are re-run with their
+        per-feature call.
+        """
+        image_data = self.locate_regions(self.prepare_image(image_data))
+        try:
+            image = self._model_image(image_data, "fused")
+
+            prompt = """Analyze this facial image for skin, eye area and dental/smile characteristics.
+All scores are 0-100.
+
+skin: luminosity (brightness), smoothness (100 is unnaturally smooth), pore_visibility
+(0 is no pores visible - likely filtered), wrinkle_prominence, tone_uniformity,
+filter_probability (probability of beauty filters or smoothing), analysis (brief description)
+
+eye: eyelid_drooping (100 is maximum drooping), eyebrow_drooping, eye_bags, crows_feet,
+under_eye_darkness, eye_filtering (probability of eye area smoothing/filtering),
+eye_openness (100 is fully open), age_indicators (description)
+
+dental: tooth_visibility, gum_exposure, tooth_whiteness, tooth_wear (wear/yellowing),
+smile_authenticity (100 is genuine Duchenne smile), smile_symmetry, mouth_elevation,
+whitening_filtering (probability of dental whitening/filtering), dental_age_indicators (description)
+
+Return ONLY valid JSON:
+{
+  "skin": {"luminosity": number, "smoothness": number, "pore_visibility": number, "wrinkle_prominence": number, "tone_uniformity": number, "filter_probability": number, "analysis": "brief description"},
+  "eye": {"eyelid_drooping": number, "eyebrow_drooping": number, "eye_bags": number, "crows_feet": number, "under_eye_darkness": number, "eye_filtering": number, "eye_openness": number, "age_indicators": "description"},
+  "dental": {"tooth_visibility": number, "gum_exposure": number, "tooth_whiteness": number, "tooth_wear": number, "smile_authenticity": number, "smile_symmetry": number, "mouth_elevation": number, "whitening_filtering": number, "dental_age_indicators": "description"}
+}"""
+
+            with stage("model_call.fused"):
+                response = self.caller.generate(self.model, [prompt, image], timeout=self.call_timeout)
+            with stage("parse.fused"):
+                fused = self._parse_json_response(response.text)
+        except Exception:
+            fused = {}
+
+        results = {}
+        missing = []
+        for name in self.FEATURE_ANALYSES:
+            section = fused.get(name) if isinstance(fused, dict) else None
+            if isinstance(section, dict) and all(key in section for key in self.SCORED_METRICS[name]):
+                results[name] = self._feature_result(name, section)
+            else:
+                missing.append(name)
+
+        if missing:
+            results.update(self.run_feature_analyses(image_data, missing))
+        return {name: results[name] for name in self.FEATURE_ANALYSES}
+
+    def run_prescreen(self, image_data) -> Dict:
+        """Pixel statistics for a prepared image, or None when the pre-screen is off"""
+        if not self.prescreen.enabled:
+            return None
+        with stage("prescreen"):
+            stats = self.prescreen.analyze(image_data.image)
+        PRESCREEN_DECISIONS.inc(decision=stats["decision"])
+        return stats
+
+    def _apply_prescreen(self, prescreen: Dict, mode: str):
+        """Return (mode, locally computed analyses) after the pre-screen decision"""
+        if prescreen is None or prescreen["decision"] == "model":
+            return mode, {}
+        if prescreen["decision"] == "downgrade":
+            return "fused", {}
+        return mode, {"skin": self._feature_result("skin", self.prescreen.skin_analysis(prescreen))}
+
+    @staticmethod
+    def _with_prescreen(report: Dict, prescreen: Dict) -> Dict:
+        if prescreen is not None:
+            report["prescreen"] = prescreen
+        return report
+
+    def _with_regions(self, report: Dict, image_data: PreparedImage) -> Dict:
+        """Add the located regions and their encoded sizes to a report"""
+        if not self.regions.enabled or image_data.regions is None:
+            return report
+        boxes = image_data.region_boxes or {}
+        report["regions"] = {
+            "method": boxes.get("method", "full_frame"),
+            "boxes": {name: list(box) for name, box in boxes.items() if name != "method"},
+            "encoded_bytes": {name: len(crop.data) for name, crop in image_data.regions.items()},
+            "full_frame_bytes": len(image_data.data)
+        }
+        return report
+
+    def _resolve_mode(self, mode: str = None) -> str:
+        """Return the requested analysis mode, defaulting to the analyzer's"""
+        mode = mode or self.mode
+        if mode not in self.ANALYSIS_MODES:
+            raise ValueError(f"Unknown analysis mode: {mode}")
+        return mode
+
+    def prepare_image(self, image_data) -> PreparedImage:
+        """Preprocess raw image bytes; already prepared images pass through"""
+        if isinstance(image_data, PreparedImage):
+            return image_data
+        with stage("preprocess"):
+            return self.preprocessor.prepare(image_data)
+
+    def locate_regions(self, image_data: PreparedImage) -> PreparedImage:
+        """
+        Crop the face, eye and mouth regions of a prepared image once, for
+        every analysis run on it (see REGION_FOR_ANALYSIS). Without a
+        locator, or when no face is found, analyses get the full frame.
+        """
+        if not self.regions.enabled or image_data.regions is not None:
+            return image_data
+        with stage("regions"):
+            boxes = self.regions.locate(image_data.image)
+            crops = {}
+            if boxes is not None:
+                crops = {name: self.preprocessor.crop(image_data, boxes[name]) for name in ("face", "eyes", "mouth")}
+        image_data.region_boxes = boxes
+        image_data.regions = crops
+        return image_data
+
+    def _model_image(self, image_data, analysis: str = None):
+        """Return the image part to send to the model, cropped to the analysis' region if located"""
+        if isinstance(image_data, PreparedImage):
+            crop = (image_data.regions or {}).get(self.REGION_FOR_ANALYSIS.get(analysis))
+            return (crop or image_data).as_model_part()
+        from PIL import Image
+        return Image.open(BytesIO(image_data))
+
+    @staticmethod
+    def _overall_authenticity(analyses: Dict) -> float:
+        """Overall authenticity score (before rounding) of skin/eye/dental analysis results"""
+        return 100 - (
+            (analyses["skin"].get("skin_analysis", {}).get("filter_probability", 0) * 0.35) +
+            (analyses["eye"].get("eye_analysis", {}).get("eye_filtering", 0) * 0.35) +
+            (analyses["dental"].get("dental_analysis", {}).get("whitening_filtering", 0) * 0.30)
+        )
+
+    def _skipped_result(self, name: str) -> Dict:
+        """Result of an analysis the tiered mode did not need to run"""
+        return {
+            "status": "skipped",
+            "message": f"{name} analysis skipped: the verdict no longer depended on it",
+            self.FEATURE_ANALYSES[name][1]: {}
+        }
+
+    def _feature_result(self, name: str, analysis: Dict) -> Dict:
+        """Wrap a parsed feature analysis in its success result"""
+        result_key = self.FEATURE_ANALYSES[name][1]
+        result = {"status": "success", result_key: analysis}
+        if name == "skin":
+            result["filter_detected"] = analysis.get("filter_probability", 0) > 60
+        elif name == "eye":
+            result["age_signs_detected"] = analysis.get("eyelid_drooping", 0) > 30 or analysis.get("crows_feet", 0) > 40
+        elif name == "dental":
+            result["authentic_smile"] = analysis.get("smile_authenticity", 0) > 70
+        return result
+
+    def _run_feature_analysis(self, name: str, image_data: bytes) -> Dict:
+        """Run a single feature analysis by name, reusing a cached analysis of the same region"""
+        method_name = self.FEATURE_ANALYSES[name][0]
+        key = self._region_cache_key(name, image_data)
+        if key is not None:
+            cached = self.region_cache.get(key)
+            if cached is not None:
+                return cached
+        result = getattr(self, method_name)(image_data)
+        if key is not None and result.get("status") == "success":
+            self.region_cache.set(key, result)
+        return result
+
+    def _region_cache_key(self, name: str, image_data) -> str:
+        """Cache key of an analysis of a cropped region, or None when it is not cached"""
+        if self.region_cache is None or not isinstance(image_data, PreparedImage) or not image_data.regions:
+            return None
+        crop = image_data.regions[self.REGION_FOR_ANALYSIS[name]]
+        model_name = getattr(self.model, "model_name", None) or type(self.model).__name__
+        return ResultCache.make_key(crop.data, f"bio-authenticity/{name}", self.PROMPT_VERSION, model_name)
+
+    @staticmethod
+    def _failure_reason(error: Exception) -> str:
+        """Metrics reason for a failed feature analysis"""
+        if isinstance(error, KeysExhausted):
+            return "quota"
+        return "timeout" if isinstance(error, TimeoutError) else "error"
+
+    def _fallback_result(self, name: str, message: str, reason: str = "error") -> Dict:
+        """Build the error result a failed feature analysis returns"""
+        _, result_key, mock_name = self.FEATURE_ANALYSES[name]
+        record_fallback(name, reason)
+        return {
+            "status": "error",
+            "message": message,
+            result_key: getattr(self, mock_name)()
+        }
 
     @staticmethod
     def _parse_json_response(response_text: str) -> Dict:
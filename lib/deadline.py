@@ -0,0 +1,329 @@
+"""
+Deadline Module for VerifyAI
+Request deadline budgets, and model calls that retry with jittered backoff and
+hedge slow calls within that budget
+"""
+
+import time
+import random
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, Optional
+from lib import metrics
+
+# Deadline of the request being served; pool threads see it when submitted
+# through contextvars.copy_context().run, like the metrics context
+_current_deadline = contextvars.ContextVar("verifyai_deadline", default=None)
+
+MODEL_RETRIES = metrics.registry.counter(
+    "verifyai_model_retries_total",
+    "Model calls retried after a transient failure or attempt timeout",
+    ("endpoint",)
+)
+MODEL_HEDGES = metrics.registry.counter(
+    "verifyai_model_hedges_total",
+    "Hedged duplicate model calls, by which call answered first",
+    ("endpoint", "winner")
+)
+DEADLINES_EXCEEDED = metrics.registry.counter(
+    "verifyai_model_deadline_exceeded_total",
+    "Model calls abandoned because the request deadline ran out",
+    ("endpoint",)
+)
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a model call cannot finish within the remaining budget"""
+
+
+class Deadline:
+    """A point in time by which a request must be answered"""
+
+    def __init__(self, budget: float):
+        self.budget = budget
+        self.expires_at = time.monotonic() + budget
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+
+def start(budget: Optional[float]) -> Optional[Deadline]:
+    """Give the current request a deadline budget in seconds (None for no deadline)"""
+    deadline = Deadline(budget) if budget else None
+    _current_deadline.set(deadline)
+    return deadline
+
+
+def current() -> Optional[Deadline]:
+    """Return the current request's deadline, if any"""
+    return _current_deadline.get()
+
+
+def time_left(timeout: float = None) -> Optional[float]:
+    """Seconds left for a call capped at timeout and the request deadline (None if unbounded)"""
+    deadline = current()
+    if deadline is None:
+        return timeout
+    if timeout is None:
+        return deadline.remaining()
+    return min(timeout, deadline.remaining())
+
+
+class CallPolicy:
+    """
+    How model calls are retried and hedged.
+
+    Failed attempts are retried up to max_attempts in total, sleeping a
+    random delay between 0 and min(max_delay, base_delay * 2**retry) first
+    ("full jitter") so clients that failed together do not retry together.
+
+    Once hedge_min_samples latencies have been seen for a model, an attempt
+    still running after the hedge_percentile latency gets a duplicate call;
+    whichever answers first wins. hedge_percentile=None disables hedging.
+    """
+
+    def __init__(self,
+                 max_attempts: int = 3,
+                 base_delay: float = 0.25,
+                 max_delay: float = 2.0,
+                 hedge_percentile: float = 95,
+                 hedge_min_samples: int = 20):
+        self.max_attempts = max(1, int(max_attempts))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge_percentile = hedge_percentile or None
+        self.hedge_min_samples = hedge_min_samples
+
+    def backoff(self, retry: int, rng: random.Random = random) -> float:
+        """Delay before the given retry (1 for the first)"""
+        return rng.uniform(0, min(self.max_delay, self.base_delay * (2 ** (retry - 1))))
+
+    @staticmethod
+    def is_retryable(error: Exception) -> bool:
+        """Transient failures worth another attempt: throttling, 5xx, timeouts, connection errors"""
+        # KeysExhausted means the key pool already waited as long as the call may; key_pool imports this module
+        from lib.key_pool import KeysExhausted
+        if isinstance(error, KeysExhausted):
+            return False
+        try:
+            from google.api_core import exceptions as api_exceptions
+        except ImportError:
+            api_exceptions = None
+        if api_exceptions is not None and isinstance(error, api_exceptions.GoogleAPICallError):
+            return isinstance(error, (
+                api_exceptions.ServerError,
+                api_exceptions.TooManyRequests,
+                api_exceptions.ResourceExhausted,
+                api_exceptions.Aborted
+            ))
+        # Bad input and programming errors fail the same way every time
+        return not isinstance(error, (ValueError, TypeError, AttributeError, KeyError))
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies per model"""
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, key: str, seconds: float):
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def percentile(self, key: str, percentile: float, min_samples: int = 1) -> Optional[float]:
+        """Return the latency percentile for key, or None with too few samples"""
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if not samples or len(samples) < min_samples:
+            return None
+        index = min(len(samples) - 1, int(len(samples) * percentile / 100))
+        return samples[index]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {key: len(samples) for key, samples in self._samples.items()}
+
+
+class ModelCaller:
+    """
+    Makes model calls within the request's deadline budget (see start):
+    each attempt gets the time left, transient failures are retried with
+    jittered backoff while budget remains, and slow attempts are hedged
+    according to the policy. Raises DeadlineExceeded when the budget runs
+    out, or the last error once attempts are exhausted.
+    """
+
+    def __init__(self, policy: CallPolicy = None, max_workers: int = 64):
+        self.policy = policy or CallPolicy()
+        self.latencies = LatencyTracker()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="model-call")
+        self._random = random.Random()
+
+    def generate(self, model, contents, timeout: float = None):
+        """Blocking generate_content; timeout caps each attempt"""
+        retry = 0
+        while True:
+            try:
+                return self._attempt(model, contents, timeout)
+            except Exception as e:
+                retry += 1
+                delay = self._retry_delay(e, retry, timeout)
+            time.sleep(delay)
+
+    async def generate_async(self, model, contents, timeout: float = None):
+        """Non-blocking generate_content; timeout caps each attempt"""
+        # asyncio is only needed when serving through api/asgi.py, so it stays off the WSGI cold start
+        import asyncio
+        retry = 0
+        while True:
+            try:
+                return await self._attempt_async(model, contents, timeout)
+            except Exception as e:
+                retry += 1
+                delay = self._retry_delay(e, retry, timeout)
+            await asyncio.sleep(delay)
+
+    def stats(self) -> Dict:
+        return {"latency_samples": self.latencies.stats()}
+
+    def _retry_delay(self, error: Exception, retry: int, timeout: float = None) -> float:
+        """Return the backoff before the next attempt, or re-raise error if there is none"""
+        if isinstance(error, DeadlineExceeded) or retry >= self.policy.max_attempts:
+            raise error
+        if not isinstance(error, TimeoutError) and not self.policy.is_retryable(error):
+            raise error
+        delay = self.policy.backoff(retry, self._random)
+        deadline = current()
+        if deadline is not None and deadline.remaining() <= delay:
+            raise error
+        MODEL_RETRIES.inc(endpoint=metrics.current_endpoint())
+        return delay
+
+    def _attempt(self, model, contents, timeout: float = None):
+        budget = self._budget(timeout)
+        hedge_after = self._hedge_after(model, budget)
+        started = time.monotonic()
+        if budget is None and hedge_after is None:
+            response = model.generate_content(contents)
+            self._record(model, started)
+            return response
+
+        futures = {self._submit(model, contents): "primary"}
+        try:
+            if hedge_after is not None:
+                done, _ = wait(futures, timeout=hedge_after)
+                if not done:
+                    futures[self._submit(model, contents)] = "hedge"
+
+            error = None
+            pending = set(futures)
+            while pending:
+                remaining = None if budget is None else budget - (time.monotonic() - started)
+                if remaining is not None and remaining <= 0:
+                    break
+                done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        response = future.result()
+                    except Exception as e:
+                        error = e
+                        continue
+                    self._record(model, started, futures, future)
+                    return response
+            if error is not None and not pending:
+                raise error
+            raise self._timeout(timeout)
+        finally:
+            # A straggler keeps its worker until the client library gives up; nobody waits for it
+            for future in futures:
+                future.cancel()
+
+    async def _attempt_async(self, model, contents, timeout: float = None):
+        import asyncio
+        budget = self._budget(timeout)
+        hedge_after = self._hedge_after(model, budget)
+        started = time.monotonic()
+
+        tasks = {asyncio.ensure_future(self._call_async(model, contents)): "primary"}
+        try:
+            if hedge_after is not None:
+                done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+                if not done:
+                    tasks[asyncio.ensure_future(self._call_async(model, contents))] = "hedge"
+
+            error = None
+            pending = set(tasks)
+            while pending:
+                remaining = None if budget is None else budget - (time.monotonic() - started)
+                if remaining is not None and remaining <= 0:
+                    break
+                done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                        continue
+                    self._record(model, started, tasks, task)
+                    return task.result()
+            if error is not None and not pending:
+                raise error
+            raise self._timeout(timeout)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _call_async(self, model, contents):
+        if hasattr(model, "generate_content_async"):
+            return await model.generate_content_async(contents)
+        import asyncio
+        loop = asyncio.get_running_loop()
+        call = contextvars.copy_context().run
+        return await loop.run_in_executor(self._executor, call, model.generate_content, contents)
+
+    def _submit(self, model, contents):
+        return self._executor.submit(contextvars.copy_context().run, model.generate_content, contents)
+
+    def _budget(self, timeout: float = None) -> Optional[float]:
+        """Time this attempt may take, raising DeadlineExceeded if none is left"""
+        budget = time_left(timeout)
+        if budget is not None and budget <= 0:
+            DEADLINES_EXCEEDED.inc(endpoint=metrics.current_endpoint())
+            raise DeadlineExceeded("Request deadline exceeded before the model call")
+        return budget
+
+    def _hedge_after(self, model, budget: Optional[float]) -> Optional[float]:
+        """Seconds after which to send a hedged duplicate, or None for no hedge"""
+        if self.policy.hedge_percentile is None:
+            return None
+        threshold = self.latencies.percentile(
+            self._model_key(model), self.policy.hedge_percentile, self.policy.hedge_min_samples
+        )
+        if threshold is None or (budget is not None and threshold >= budget):
+            return None
+        return threshold
+
+    def _record(self, model, started: float, calls: Dict = None, winner=None):
+        self.latencies.record(self._model_key(model), time.monotonic() - started)
+        if calls is not None and len(calls) > 1:
+            MODEL_HEDGES.inc(endpoint=metrics.current_endpoint(), winner=calls[winner])
+
+    def _timeout(self, timeout: float = None) -> TimeoutError:
+        """Error for an attempt that ran out of time"""
+        deadline = current()
+        if deadline is not None and deadline.expired():
+            DEADLINES_EXCEEDED.inc(endpoint=metrics.current_endpoint())
+            return DeadlineExceeded(f"Request deadline of {deadline.budget}s exceeded")
+        return TimeoutError(f"Model call timed out after {timeout}s")
+
+    @staticmethod
+    def _model_key(model) -> str:
+        return getattr(model, "model_name", None) or type(model).__name__
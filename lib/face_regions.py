@@ -0,0 +1,199 @@
+"""
+Face Regions Module for VerifyAI
+CPU-only face, eye and mouth localization, so each bio-authenticity
+analysis can send the model only the region it looks at
+"""
+
+import threading
+from typing import Dict, Optional, Tuple
+
+from lib import metrics
+
+REGION_LOCATIONS = metrics.registry.counter(
+    "verifyai_face_regions_total",
+    "Face region localizations by method (haar, skin, or none when the full frame is used)",
+    ("method",)
+)
+
+Box = Tuple[int, int, int, int]
+
+
+class FaceRegionLocator:
+    """
+    Finds the face, eyes and mouth of the main face in an image, as
+    (left, top, right, bottom) pixel boxes with some margin.
+
+    OpenCV's Haar cascades are used when opencv-python is installed (face,
+    then eyes within its upper half); otherwise, or when no face is
+    detected, a NumPy heuristic takes the largest YCbCr skin-tone blob as
+    the face and places the eye and mouth bands by facial proportions.
+    locate returns None when neither finds a plausible face, and callers
+    use the full frame.
+
+    method: "auto" (Haar if available, else skin), "haar", "skin" or "off".
+    """
+
+    METHODS = ("auto", "haar", "skin", "off")
+
+    # YCbCr chroma box commonly used for skin detection (as PixelPrescreen)
+    SKIN_CB = (77, 127)
+    SKIN_CR = (133, 173)
+
+    # Eye and mouth bands as fractions of the face box: (left, top, right, bottom)
+    EYE_BAND = (0.08, 0.18, 0.92, 0.55)
+    MOUTH_BAND = (0.2, 0.6, 0.8, 0.95)
+
+    def __init__(self,
+                 method: str = "auto",
+                 margin: float = 0.12,
+                 min_face_fraction: float = 0.02,
+                 work_size: int = 256):
+        if method not in self.METHODS:
+            raise ValueError(f"Unknown face region method: {method}")
+        self.method = method
+        self.margin = margin
+        self.min_face_fraction = min_face_fraction
+        self.work_size = work_size
+        self._cascades = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.method != "off"
+
+    def locate(self, image) -> Optional[Dict]:
+        """Return {"method", "face", "eyes", "mouth"} boxes for a PIL image, or None"""
+        regions = None
+        if self.method in ("auto", "haar") and self.cascades() is not None:
+            regions = self._locate_haar(image)
+        if regions is None and self.method in ("auto", "skin"):
+            regions = self._locate_skin(image)
+        REGION_LOCATIONS.inc(method=regions["method"] if regions else "none")
+        return regions
+
+    def cascades(self):
+        """(face, eye) Haar cascades, or None without OpenCV"""
+        if self._cascades is None:
+            with self._lock:
+                if self._cascades is None:
+                    try:
+                        import cv2
+                    except ImportError:
+                        self._cascades = ()
+                    else:
+                        self._cascades = (
+                            cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml"),
+                            cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_eye.xml"),
+                        )
+        return self._cascades or None
+
+    def _locate_haar(self, image) -> Optional[Dict]:
+        import numpy as np
+        face_cascade, eye_cascade = self.cascades()
+        gray = np.asarray(image.convert("L"))
+        height, width = gray.shape
+        min_side = int(min(width, height) * 0.1)
+        faces = face_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(min_side, min_side))
+        if len(faces) == 0:
+            return None
+        x, y, w, h = max(faces, key=lambda face: face[2] * face[3])
+        face = (int(x), int(y), int(x + w), int(y + h))
+        if not self._plausible(face, width, height):
+            return None
+
+        eyes_box = self._band(face, self.EYE_BAND)
+        upper = gray[y:y + h // 2 + 1, x:x + w]
+        eyes = eye_cascade.detectMultiScale(upper, scaleFactor=1.1, minNeighbors=5)
+        if len(eyes) > 0:
+            # The two largest detections, in image coordinates
+            eyes = sorted(eyes, key=lambda eye: eye[2] * eye[3], reverse=True)[:2]
+            eyes_box = (
+                int(x + min(ex for ex, _, _, _ in eyes)),
+                int(y + min(ey for _, ey, _, _ in eyes)),
+                int(x + max(ex + ew for ex, _, ew, _ in eyes)),
+                int(y + max(ey + eh for _, ey, _, eh in eyes)),
+            )
+        return self._regions("haar", face, eyes_box, self._band(face, self.MOUTH_BAND), width, height)
+
+    def _locate_skin(self, image) -> Optional[Dict]:
+        import numpy as np
+        width, height = image.size
+        small = image.copy()
+        small.thumbnail((self.work_size, self.work_size))
+        ycbcr = np.asarray(small.convert("YCbCr"))
+        cb, cr = ycbcr[..., 1], ycbcr[..., 2]
+        skin = (
+            (cb >= self.SKIN_CB[0]) & (cb <= self.SKIN_CB[1]) &
+            (cr >= self.SKIN_CR[0]) & (cr <= self.SKIN_CR[1])
+        )
+        if skin.mean() < self.min_face_fraction:
+            return None
+
+        # The face is the densest run of skin columns, then of skin rows within them.
+        # A neck or chest below the chin skews the first estimate, so the columns are
+        # re-estimated from the rows a face of that width spans (about 1.35x its width).
+        left, right = self._dense_run(skin.mean(axis=0))
+        for _ in range(2):
+            top, bottom = self._dense_run(skin[:, left:right].mean(axis=1))
+            bottom = min(bottom, top + int(round((right - left) * 1.35)))
+            left, right = self._dense_run(skin[top:bottom].mean(axis=0))
+        top, bottom = self._dense_run(skin[:, left:right].mean(axis=1))
+        bottom = min(bottom, top + int(round((right - left) * 1.35)))
+
+        scale_x, scale_y = width / skin.shape[1], height / skin.shape[0]
+        face = (int(left * scale_x), int(top * scale_y), int(right * scale_x), int(bottom * scale_y))
+        aspect = (face[3] - face[1]) / max(1, face[2] - face[0])
+        if not self._plausible(face, width, height) or not 0.6 <= aspect <= 2.0:
+            return None
+        return self._regions(
+            "skin", face, self._band(face, self.EYE_BAND), self._band(face, self.MOUTH_BAND), width, height
+        )
+
+    @staticmethod
+    def _dense_run(profile, max_gap: float = 0.05) -> Tuple[int, int]:
+        """
+        [start, end) of the run around the peak where profile is at least half
+        of it, bridging gaps up to max_gap of its length (eyes and mouth are not skin)
+        """
+        peak = int(profile.argmax())
+        dense = profile >= profile[peak] / 2
+        gap = max(1, int(len(profile) * max_gap))
+        start, end = peak, peak + 1
+        while True:
+            before = dense[max(0, start - gap):start]
+            if not before.any():
+                break
+            start -= len(before) - int(before.argmax())
+        while True:
+            after = dense[end:end + gap]
+            if not after.any():
+                break
+            end += len(after) - int(after[::-1].argmax())
+        return start, end
+
+    def _plausible(self, face: Box, width: int, height: int) -> bool:
+        area = (face[2] - face[0]) * (face[3] - face[1])
+        return area >= self.min_face_fraction * width * height
+
+    @staticmethod
+    def _band(face: Box, band: Tuple[float, float, float, float]) -> Box:
+        left, top, right, bottom = face
+        w, h = right - left, bottom - top
+        return (
+            int(left + band[0] * w), int(top + band[1] * h),
+            int(left + band[2] * w), int(top + band[3] * h)
+        )
+
+    def _regions(self, method: str, face: Box, eyes: Box, mouth: Box, width: int, height: int) -> Dict:
+        return {
+            "method": method,
+            "face": self._pad(face, width, height),
+            "eyes": self._pad(eyes, width, height),
+            "mouth": self._pad(mouth, width, height),
+        }
+
+    def _pad(self, box: Box, width: int, height: int) -> Box:
+        """Grow a box by margin on each side, clipped to the image"""
+        left, top, right, bottom = box
+        dx, dy = int((right - left) * self.margin), int((bottom - top) * self.margin)
+        return (max(0, left - dx), max(0, top - dy), min(width, right + dx), min(height, bottom + dy))
@@ -0,0 +1,153 @@
+"""
+Image Pipeline Module for VerifyAI
+Decode-once preprocessing: bounded decoding, EXIF orientation, downscaling
+and compact re-encoding shared by every model call on a request
+"""
+
+from io import BytesIO
+from typing import TYPE_CHECKING, Dict, Tuple
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+
+class ImageTooLargeError(ValueError):
+    """Raised when an image exceeds the decode pixel budget"""
+
+
+class PreparedImage:
+    """
+    A decoded, oriented and downscaled image plus its compact encoding.
+
+    Model calls should send `as_model_part()`: the library would otherwise
+    re-encode a PIL image as lossless PNG, which is far larger than the
+    source JPEG.
+    """
+
+    def __init__(self, image: "Image.Image", data: bytes, mime_type: str,
+                 original_size: Tuple[int, int], source_bytes: int):
+        self.image = image
+        self.data = data
+        self.mime_type = mime_type
+        self.original_size = original_size
+        self.source_bytes = source_bytes
+        self._perceptual_hash = None
+        # Region name -> cropped PreparedImage, once regions are located
+        self.regions = None
+        self.region_boxes = None
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        return self.image.size
+
+    def as_model_part(self) -> Dict:
+        """Return the blob part to send to the model"""
+        return {"mime_type": self.mime_type, "data": self.data}
+
+    def perceptual_hash(self) -> int:
+        """64-bit pHash of the decoded image (see lib/perceptual_hash.py), computed once"""
+        if self._perceptual_hash is None:
+            from lib.perceptual_hash import phash
+            self._perceptual_hash = phash(self.image)
+        return self._perceptual_hash
+
+    def describe(self) -> Dict:
+        """Summarize the preprocessing for logs and responses"""
+        return {
+            "original_size": list(self.original_size),
+            "size": list(self.size),
+            "source_bytes": self.source_bytes,
+            "encoded_bytes": len(self.data),
+            "mime_type": self.mime_type
+        }
+
+
+class ImagePreprocessor:
+    """
+    Decodes each upload once into a PreparedImage:
+    - rejects images above max_pixels from the header, before decoding
+    - uses JPEG draft mode so large photos decode directly at reduced scale
+    - applies EXIF orientation
+    - downscales to fit within target_size x target_size
+    - re-encodes as JPEG or WebP at the configured quality
+    """
+
+    FORMATS = {"JPEG": "image/jpeg", "WEBP": "image/webp"}
+
+    def __init__(self,
+                 target_size: int = 1024,
+                 max_pixels: int = 40_000_000,
+                 output_format: str = "JPEG",
+                 quality: int = 85):
+        output_format = output_format.upper()
+        if output_format not in self.FORMATS:
+            raise ValueError(f"Unsupported output format: {output_format}")
+        self.target_size = target_size
+        self.max_pixels = max_pixels
+        self.output_format = output_format
+        self.quality = quality
+
+    def prepare(self, image_data: bytes) -> PreparedImage:
+        """Decode, orient, downscale and re-encode an uploaded image"""
+        # Imported on first use to keep Pillow off the cold-start path
+        from PIL import Image, ImageOps
+        image = Image.open(BytesIO(image_data))
+        original_size = image.size
+
+        width, height = original_size
+        if width * height > self.max_pixels:
+            raise ImageTooLargeError(
+                f"Image is {width}x{height} ({width * height} pixels), "
+                f"limit is {self.max_pixels} pixels"
+            )
+
+        if image.format == "JPEG":
+            # Let the decoder scale by 1/2, 1/4 or 1/8 while still covering the target
+            image.draft("RGB", (self.target_size, self.target_size))
+
+        ImageOps.exif_transpose(image, in_place=True)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        image.thumbnail((self.target_size, self.target_size), Image.Resampling.LANCZOS)
+
+        return PreparedImage(
+            image=image,
+            data=self._encode(image),
+            mime_type=self.FORMATS[self.output_format],
+            original_size=original_size,
+            source_bytes=len(image_data)
+        )
+
+    def prepare_frame(self, image: "Image.Image") -> PreparedImage:
+        """Downscale and encode an already decoded frame (e.g. a clip keyframe)"""
+        from PIL import Image
+        original_size = image.size
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        else:
+            image = image.copy()
+        image.thumbnail((self.target_size, self.target_size), Image.Resampling.LANCZOS)
+        data = self._encode(image)
+        return PreparedImage(
+            image=image,
+            data=data,
+            mime_type=self.FORMATS[self.output_format],
+            original_size=original_size,
+            source_bytes=len(data)
+        )
+
+    def crop(self, prepared: PreparedImage, box: Tuple[int, int, int, int]) -> PreparedImage:
+        """Crop a prepared image to (left, top, right, bottom) and encode the crop the same way"""
+        image = prepared.image.crop(box)
+        return PreparedImage(
+            image=image,
+            data=self._encode(image),
+            mime_type=self.FORMATS[self.output_format],
+            original_size=prepared.size,
+            source_bytes=len(prepared.data)
+        )
+
+    def _encode(self, image: "Image.Image") -> bytes:
+        buffer = BytesIO()
+        image.save(buffer, format=self.output_format, quality=self.quality)
+        return buffer.getvalue()
@@ -0,0 +1,382 @@
+"""
+Job Queue Module for VerifyAI
+Durable SQLite-backed job queue with priorities, a bounded worker pool,
+result retention and completion callbacks
+"""
+
+import json
+import time
+import socket
+import logging
+import secrets
+import sqlite3
+import ipaddress
+import threading
+from urllib.parse import urlparse
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Raised when the queue already holds max_queued waiting jobs"""
+
+
+class JobQueue:
+    """
+    Jobs persisted in a SQLite database (WAL mode), so queued work survives
+    process restarts and is shared by every worker process on the host.
+
+    Jobs are claimed highest priority first, then oldest first. A running
+    job whose lease expires (its worker died) is claimed again, up to
+    max_attempts. Finished jobs keep their result for `retention` seconds;
+    their image payload is dropped as soon as they finish.
+    """
+
+    STATUSES = ("queued", "running", "succeeded", "failed")
+
+    def __init__(self,
+                 path: str,
+                 retention: float = 3600,
+                 lease: float = 300,
+                 max_attempts: int = 3,
+                 max_queued: int = 1000):
+        self.path = path
+        self.retention = retention
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.max_queued = max_queued
+        self._local = threading.local()
+        self._init_schema()
+
+    def submit(self, payload: bytes, params: Dict = None, priority: int = 0,
+               callback_url: str = None, kind: str = "bio-authenticity") -> str:
+        """Queue a job and return its ID"""
+        job_id = secrets.token_hex(16)
+        db = self._db()
+        with self._transaction(db):
+            queued = db.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+            if queued >= self.max_queued:
+                raise QueueFullError(f"Job queue is full ({queued} jobs waiting)")
+            db.execute(
+                "INSERT INTO jobs (id, kind, priority, status, payload, params, callback_url, created_at) "
+                "VALUES (?, ?, ?, 'queued', ?, ?, ?, ?)",
+                (job_id, kind, priority, sqlite3.Binary(payload), json.dumps(params or {}),
+                 callback_url, time.time())
+            )
+        return job_id
+
+    def claim(self) -> Optional[Dict]:
+        """Mark the next job running and return it with its payload, or None"""
+        now = time.time()
+        db = self._db()
+        with self._transaction(db):
+            row = db.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' "
+                "OR (status = 'running' AND lease_expires_at < ?) "
+                "ORDER BY priority DESC, created_at LIMIT 1",
+                (now,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row["attempts"] >= self.max_attempts:
+                self._finish(db, row["id"], "failed", error="Job exceeded its attempts (worker lost)")
+                return None
+            db.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, "
+                "started_at = ?, lease_expires_at = ? WHERE id = ?",
+                (now, now + self.lease, row["id"])
+            )
+        job = self._to_dict(row)
+        job.update(status="running", attempts=row["attempts"] + 1, payload=bytes(row["payload"]))
+        return job
+
+    def complete(self, job_id: str, result: Dict):
+        db = self._db()
+        with self._transaction(db):
+            self._finish(db, job_id, "succeeded", result=result)
+
+    def fail(self, job_id: str, error: str):
+        db = self._db()
+        with self._transaction(db):
+            self._finish(db, job_id, "failed", error=error)
+
+    def record_callback(self, job_id: str, status: str):
+        db = self._db()
+        with self._transaction(db):
+            db.execute("UPDATE jobs SET callback_status = ? WHERE id = ?", (status, job_id))
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Return a job's status (and result once finished), or None if unknown or expired"""
+        row = self._db().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None or self._expired(row):
+            return None
+        return self._to_dict(row)
+
+    def purge_expired(self) -> int:
+        """Delete finished jobs past their retention; return how many were removed"""
+        db = self._db()
+        with self._transaction(db):
+            cursor = db.execute(
+                "DELETE FROM jobs WHERE status IN ('succeeded', 'failed') AND finished_at < ?",
+                (time.time() - self.retention,)
+            )
+        return cursor.rowcount
+
+    def stats(self) -> Dict:
+        counts = dict.fromkeys(self.STATUSES, 0)
+        for status, count in self._db().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status"):
+            counts[status] = count
+        return {**counts, "retention": self.retention, "max_queued": self.max_queued}
+
+    def _finish(self, db, job_id: str, status: str, result: Dict = None, error: str = None):
+        db.execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, "
+            "payload = NULL, lease_expires_at = NULL WHERE id = ?",
+            (status, json.dumps(result) if result is not None else None, error, time.time(), job_id)
+        )
+
+    def _expired(self, row) -> bool:
+        return row["finished_at"] is not None and row["finished_at"] < time.time() - self.retention
+
+    @staticmethod
+    def _to_dict(row) -> Dict:
+        job = {
+            "job_id": row["id"],
+            "kind": row["kind"],
+            "status": row["status"],
+            "priority": row["priority"],
+            "attempts": row["attempts"],
+            "params": json.loads(row["params"]),
+            "callback_url": row["callback_url"],
+            "callback_status": row["callback_status"],
+            "created_at": row["created_at"],
+            "started_at": row["started_at"],
+            "finished_at": row["finished_at"]
+        }
+        if row["result"] is not None:
+            job["result"] = json.loads(row["result"])
+        if row["error"] is not None:
+            job["error"] = row["error"]
+        return job
+
+    def _db(self) -> sqlite3.Connection:
+        """One connection per thread, in autocommit mode with explicit transactions"""
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    @staticmethod
+    def _transaction(db):
+        return _ImmediateTransaction(db)
+
+    def _init_schema(self):
+        db = self._db()
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, kind TEXT NOT NULL, priority INTEGER NOT NULL DEFAULT 0, "
+            "status TEXT NOT NULL, payload BLOB, params TEXT NOT NULL DEFAULT '{}', "
+            "result TEXT, error TEXT, callback_url TEXT, callback_status TEXT, "
+            "attempts INTEGER NOT NULL DEFAULT 0, created_at REAL NOT NULL, started_at REAL, "
+            "finished_at REAL, lease_expires_at REAL)"
+        )
+        db.execute("CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (status, priority DESC, created_at)")
+        db.execute("CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (finished_at)")
+
+
+class _ImmediateTransaction:
+    """BEGIN IMMEDIATE ... COMMIT, so concurrent claimers never take the same job"""
+
+    def __init__(self, db: sqlite3.Connection):
+        self.db = db
+
+    def __enter__(self):
+        self.db.execute("BEGIN IMMEDIATE")
+        return self.db
+
+    def __exit__(self, exc_type, exc, tb):
+        self.db.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+class JobWorkerPool:
+    """
+    Runs queued jobs on `workers` threads, which caps how many reports are
+    computed at once no matter how many clients submit. handler(payload,
+    params) returns the job result; an exception fails the job. Workers
+    start on the first submit, so idle processes pay nothing.
+
+    When a job has a callback URL, its final status is POSTed there as JSON.
+    The URL is checked again with valid_callback_url(url, allowed_hosts)
+    right before each delivery, and redirects are not followed.
+
+    A worker that hits an error outside the handler (e.g. a locked or full
+    database) logs it, backs off and carries on; ensure_started replaces
+    any worker thread that died anyway.
+    """
+
+    def __init__(self,
+                 queue: JobQueue,
+                 handler: Callable[[bytes, Dict], Dict],
+                 workers: int = 2,
+                 poll_interval: float = 1.0,
+                 callback_timeout: float = 5.0,
+                 callback_attempts: int = 3,
+                 allowed_hosts=None,
+                 max_backoff: float = 30.0):
+        self.queue = queue
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.poll_interval = poll_interval
+        self.callback_timeout = callback_timeout
+        self.callback_attempts = callback_attempts
+        self.allowed_hosts = allowed_hosts
+        self.max_backoff = max_backoff
+        self._wakeup = threading.Condition()
+        self._threads = []
+        self._busy = 0
+        self._lock = threading.Lock()
+        self._last_purge = 0.0
+
+    def submit(self, payload: bytes, params: Dict = None, priority: int = 0, callback_url: str = None) -> str:
+        """Queue a job, start the workers if needed and wake one up"""
+        job_id = self.queue.submit(payload, params, priority=priority, callback_url=callback_url)
+        self.ensure_started()
+        with self._wakeup:
+            self._wakeup.notify()
+        return job_id
+
+    def ensure_started(self):
+        """Start the workers, replacing any that have died"""
+        with self._lock:
+            self._threads = [thread for thread in self._threads if thread.is_alive()]
+            for i in range(len(self._threads), self.workers):
+                thread = threading.Thread(target=self._run, name=f"job-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stats(self) -> Dict:
+        return {
+            "workers": self.workers,
+            "started": bool(self._threads),
+            "alive": sum(thread.is_alive() for thread in self._threads),
+            "busy": self._busy
+        }
+
+    def _run(self):
+        failures = 0
+        while True:
+            try:
+                self._purge_if_due()
+                job = self.queue.claim()
+                if job is None:
+                    # Wait for a submit in this process; polling picks up other processes' jobs
+                    with self._wakeup:
+                        self._wakeup.wait(self.poll_interval)
+                else:
+                    with self._lock:
+                        self._busy += 1
+                    try:
+                        self._process(job)
+                    finally:
+                        with self._lock:
+                            self._busy -= 1
+                failures = 0
+            except Exception:
+                # A claimed job whose result could not be saved is claimed again once its lease expires
+                failures += 1
+                delay = min(self.poll_interval * 2 ** failures, self.max_backoff)
+                logger.exception("Job worker error, retrying in %.1fs", delay)
+                time.sleep(delay)
+
+    def _process(self, job: Dict):
+        try:
+            result = self.handler(job["payload"], job["params"])
+        except Exception as e:
+            self.queue.fail(job["job_id"], str(e))
+        else:
+            self.queue.complete(job["job_id"], result)
+        if job["callback_url"]:
+            self._send_callback(job["job_id"], job["callback_url"])
+
+    def _send_callback(self, job_id: str, url: str):
+        """POST the finished job to its callback URL, retrying with backoff"""
+        import urllib.request
+        body = json.dumps(self.queue.get(job_id)).encode("utf-8")
+        opener = _callback_opener()
+        status = "failed"
+        for attempt in range(self.callback_attempts):
+            if attempt:
+                time.sleep(min(2 ** (attempt - 1), 10))
+            # Checked on every attempt, so a host that now resolves to a private address is refused
+            if not valid_callback_url(url, self.allowed_hosts):
+                status = "rejected"
+                break
+            try:
+                request = urllib.request.Request(
+                    url, data=body, method="POST", headers={"Content-Type": "application/json"}
+                )
+                with opener.open(request, timeout=self.callback_timeout) as response:
+                    if 200 <= response.status < 300:
+                        status = "delivered"
+                        break
+            except Exception:
+                pass
+        self.queue.record_callback(job_id, status)
+
+    def _purge_if_due(self):
+        now = time.monotonic()
+        if now - self._last_purge >= 60:
+            self._last_purge = now
+            try:
+                self.queue.purge_expired()
+            except sqlite3.Error:
+                pass
+
+
+def valid_callback_url(url: str, allowed_hosts=None) -> bool:
+    """
+    http(s) URLs only. With allowed_hosts, the host must be one of them;
+    without, every address the host resolves to must be public (not
+    loopback, private, link-local, reserved or otherwise non-global), so
+    callbacks cannot reach the server's own network.
+    """
+    try:
+        parsed = urlparse(url)
+        hostname, port = parsed.hostname, parsed.port
+    except ValueError:
+        return False
+    if parsed.scheme not in ("http", "https") or not hostname:
+        return False
+    if allowed_hosts:
+        return hostname in allowed_hosts
+    return _resolves_to_public(hostname, port or (443 if parsed.scheme == "https" else 80))
+
+
+def _resolves_to_public(hostname: str, port: int) -> bool:
+    try:
+        addresses = socket.getaddrinfo(hostname, port, proto=socket.IPPROTO_TCP)
+    except (socket.gaierror, UnicodeError):
+        return False
+    for *_, sockaddr in addresses:
+        address = ipaddress.ip_address(sockaddr[0].split("%")[0])
+        if isinstance(address, ipaddress.IPv6Address) and address.ipv4_mapped:
+            address = address.ipv4_mapped
+        if not address.is_global:
+            return False
+    return bool(addresses)
+
+
+def _callback_opener():
+    """urllib opener that does not follow redirects, so a callback cannot be redirected inward"""
+    import urllib.request
+
+    class NoRedirect(urllib.request.HTTPRedirectHandler):
+        def redirect_request(self, *args, **kwargs):
+            return None
+
+    return urllib.request.build_opener(NoRedirect)
@@ -0,0 +1,387 @@
+"""
+Key Pool Module for VerifyAI
+Spreads model calls over several API keys and model variants, with a token
+bucket per key, health-aware routing and cooldowns for throttled keys
+"""
+
+import json
+import time
+import hashlib
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from lib import metrics
+from lib.deadline import time_left
+from lib.model_backends import ModelBackend
+
+KEY_REQUESTS = metrics.registry.counter(
+    "verifyai_key_pool_requests_total",
+    "Model calls per API key and model variant, by outcome (ok, throttled or error)",
+    ("key", "model", "outcome")
+)
+KEY_COOLDOWNS = metrics.registry.counter(
+    "verifyai_key_pool_cooldowns_total",
+    "Times an API key was taken out of rotation, by reason (throttled, errors or rejected)",
+    ("key", "model", "reason")
+)
+KEY_WAIT = metrics.registry.histogram(
+    "verifyai_key_pool_wait_seconds",
+    "Time a model call waited for a key with quota left",
+    ("model",),
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10)
+)
+
+
+class KeysExhausted(RuntimeError):
+    """Raised when no key has quota for a call within the time the call may wait"""
+
+
+class TokenBucket:
+    """
+    Requests-per-minute quota: holds up to burst tokens, refilled at rate
+    per second. Not thread-safe on its own; KeyPool holds its lock.
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until a token is available"""
+        self.refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+    def drain(self):
+        self.tokens = min(self.tokens, 0.0)
+
+
+class KeyLane:
+    """One API key serving one model variant, with its quota and health"""
+
+    def __init__(self, key_id: str, api_key: str, model_name: str, bucket: Optional[TokenBucket]):
+        self.key_id = key_id
+        self.api_key = api_key
+        self.model_name = model_name
+        self.bucket = bucket
+        self.in_flight = 0
+        self.latency = None  # Moving average of successful call latency, in seconds
+        self.cooldown_until = 0.0
+        self.cooldown = 0.0  # Length of the last cooldown, doubled while throttling continues
+        self.strikes = 0  # Consecutive transient errors
+        self.sole = False  # Whether it is the only lane of its model, which is then never cooled down
+        self.counters = {"requests": 0, "ok": 0, "throttled": 0, "errors": 0, "cooldowns": 0}
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until this lane can take a call"""
+        cooling = max(0.0, self.cooldown_until - now)
+        if self.bucket is None:
+            return cooling
+        return max(cooling, self.bucket.wait_time(now))
+
+    def describe(self, now: float) -> Dict:
+        return {
+            "key": self.key_id,
+            "model": self.model_name,
+            "in_flight": self.in_flight,
+            "tokens": round(self.bucket.tokens, 2) if self.bucket is not None else None,
+            "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None,
+            "cooling_down_for": round(max(0.0, self.cooldown_until - now), 2),
+            **self.counters
+        }
+
+
+class PooledModel:
+    """
+    Stand-in for a model that sends each call through the key pool: it
+    takes a lane, calls that lane's model and reports the outcome back.
+    Exposes the same model_name, generate_content and
+    generate_content_async as the backend's models.
+    """
+
+    def __init__(self, pool: "KeyPool", model_name: str, generation_config: Dict = None):
+        self.pool = pool
+        self.model_name = model_name
+        self.generation_config = generation_config
+
+    def generate_content(self, contents, **kwargs):
+        lane = self.pool.acquire(self.model_name)
+        started = time.monotonic()
+        try:
+            response = self.pool.lane_model(lane, self.generation_config).generate_content(contents, **kwargs)
+        except Exception as e:
+            self.pool.release(lane, started, e)
+            raise
+        self.pool.release(lane, started)
+        return response
+
+    async def generate_content_async(self, contents, **kwargs):
+        lane = await self.pool.acquire_async(self.model_name)
+        started = time.monotonic()
+        model = self.pool.lane_model(lane, self.generation_config)
+        try:
+            if hasattr(model, "generate_content_async"):
+                response = await model.generate_content_async(contents, **kwargs)
+            else:
+                import asyncio
+                response = await asyncio.get_running_loop().run_in_executor(None, model.generate_content, contents)
+        except Exception as e:
+            self.pool.release(lane, started, e)
+            raise
+        self.pool.release(lane, started)
+        return response
+
+
+class KeyPool:
+    """
+    A pool of API keys, each serving every configured variant of a model.
+    Every (key, variant) pair is a lane with its own token bucket of
+    requests_per_minute (burst defaults to a minute's worth), so the pool's
+    throughput grows with the number of keys.
+
+    A call takes a token from the best ready lane:
+    - "least-loaded" routing picks the lane with the fewest calls in flight,
+      then the most tokens left
+    - "latency" routing picks the lowest (calls in flight + 1) x average
+      latency, so slower keys or variants get proportionally less traffic
+    When no lane has a token, the call waits for the earliest one, up to
+    max_wait seconds and the request deadline, then raises KeysExhausted.
+
+    A lane that is throttled (HTTP 429) is drained and cooled down for
+    cooldown seconds, doubling while throttling continues up to
+    max_cooldown; error_threshold consecutive transient errors (5xx,
+    timeouts, connection failures) cool it down too, and a rejected key
+    (401/403) is cooled down for max_cooldown. A success resets the lane's
+    strikes and backoff. A model served by a single lane is never cooled
+    down, since there is no other lane to route to: backoff is left to the
+    caller's retries and deadline.
+
+    model_variants maps a model name to the variants that may serve it,
+    e.g. {"gemini-1.5-flash": ["gemini-1.5-flash-001", "gemini-1.5-flash-002"]};
+    a model without variants is served as itself.
+    """
+
+    ROUTINGS = ("least-loaded", "latency")
+    LATENCY_SMOOTHING = 0.2
+
+    def __init__(self,
+                 api_keys: List[str],
+                 backend: ModelBackend,
+                 requests_per_minute: float = 15,
+                 burst: float = None,
+                 routing: str = "least-loaded",
+                 cooldown: float = 30,
+                 max_cooldown: float = 300,
+                 error_threshold: int = 3,
+                 max_wait: float = 5,
+                 model_variants: Dict[str, List[str]] = None):
+        api_keys = [key for key in dict.fromkeys(api_keys) if key]
+        if not api_keys:
+            raise ValueError("KeyPool needs at least one API key")
+        if routing not in self.ROUTINGS:
+            raise ValueError(f"Unknown key pool routing: {routing}")
+        self.api_keys = api_keys
+        self.backend = backend
+        self.requests_per_minute = requests_per_minute
+        self.burst = burst or requests_per_minute
+        self.routing = routing
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.error_threshold = error_threshold
+        self.max_wait = max_wait
+        self.model_variants = {name: list(variants) for name, variants in (model_variants or {}).items() if variants}
+        self._lanes = {}  # model name -> lanes
+        self._lane_models = {}  # (lane id, generation config) -> backend model
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key_id(api_key: str) -> str:
+        """Short fingerprint that identifies a key in metrics and stats without revealing it"""
+        return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:8]
+
+    def model(self, model_name: str, generation_config: Dict = None) -> PooledModel:
+        return PooledModel(self, model_name, generation_config)
+
+    def lanes(self, model_name: str) -> List[KeyLane]:
+        """The lanes serving a model, created on first use"""
+        lanes = self._lanes.get(model_name)
+        if lanes is None:
+            with self._lock:
+                lanes = self._lanes.get(model_name)
+                if lanes is None:
+                    lanes = self._lanes[model_name] = [
+                        KeyLane(self.key_id(api_key), api_key, variant, self._bucket())
+                        for variant in self.model_variants.get(model_name, [model_name])
+                        for api_key in self.api_keys
+                    ]
+                    lanes[0].sole = len(lanes) == 1
+        return lanes
+
+    def lane_model(self, lane: KeyLane, generation_config: Dict = None):
+        """The backend model of a lane, built once per generation config"""
+        key = (id(lane), json.dumps(generation_config or {}, sort_keys=True))
+        model = self._lane_models.get(key)
+        if model is None:
+            with self._lock:
+                model = self._lane_models.get(key)
+                if model is None:
+                    model = self.backend.create_model(lane.model_name, generation_config, api_key=lane.api_key)
+                    self._lane_models[key] = model
+        return model
+
+    def acquire(self, model_name: str) -> KeyLane:
+        """Take a token from the best ready lane, waiting for one if needed"""
+        started = time.monotonic()
+        while True:
+            lane, wait = self._try_acquire(model_name, started)
+            if lane is not None:
+                KEY_WAIT.observe(time.monotonic() - started, model=model_name)
+                return lane
+            time.sleep(wait)
+
+    async def acquire_async(self, model_name: str) -> KeyLane:
+        import asyncio
+        started = time.monotonic()
+        while True:
+            lane, wait = self._try_acquire(model_name, started)
+            if lane is not None:
+                KEY_WAIT.observe(time.monotonic() - started, model=model_name)
+                return lane
+            await asyncio.sleep(wait)
+
+    def release(self, lane: KeyLane, started: float, error: Exception = None):
+        """Record the outcome of a call made on a lane"""
+        now = time.monotonic()
+        with self._lock:
+            lane.in_flight -= 1
+            if error is None:
+                elapsed = now - started
+                lane.latency = elapsed if lane.latency is None else (
+                    lane.latency + self.LATENCY_SMOOTHING * (elapsed - lane.latency)
+                )
+                lane.strikes = 0
+                lane.cooldown = 0.0
+                lane.counters["ok"] += 1
+                outcome = "ok"
+            else:
+                status = self._status(error)
+                if status == 429:
+                    lane.counters["throttled"] += 1
+                    outcome = "throttled"
+                    if not lane.sole:
+                        if lane.bucket is not None:
+                            lane.bucket.drain()
+                        self._cool_down(lane, now, min(self.max_cooldown, max(self.cooldown, 2 * lane.cooldown)),
+                                        "throttled")
+                else:
+                    lane.counters["errors"] += 1
+                    outcome = "error"
+                    if lane.sole:
+                        # No other lane to route to, so cooling it down would only turn calls into fallbacks
+                        pass
+                    elif status in (401, 403):
+                        self._cool_down(lane, now, self.max_cooldown, "rejected")
+                    elif self._transient(error, status):
+                        # Bad requests and bugs fail the same on every key, so only transient API errors count
+                        lane.strikes += 1
+                        if lane.strikes >= self.error_threshold:
+                            lane.strikes = 0
+                            self._cool_down(lane, now, self.cooldown, "errors")
+        KEY_REQUESTS.inc(key=lane.key_id, model=lane.model_name, outcome=outcome)
+
+    def warm_up(self, models: List[PooledModel], probe: bool = False):
+        """Build the lane models of every pooled model and let the backend prepare them"""
+        lane_models = [
+            self.lane_model(lane, model.generation_config)
+            for model in models
+            for lane in self.lanes(model.model_name)
+        ]
+        self.backend.warm_up(lane_models, probe=probe)
+
+    def stats(self) -> Dict:
+        now = time.monotonic()
+        with self._lock:
+            lanes = [lane.describe(now) for model_lanes in self._lanes.values() for lane in model_lanes]
+        return {
+            "keys": len(self.api_keys),
+            "routing": self.routing,
+            "requests_per_minute": self.requests_per_minute,
+            "burst": self.burst,
+            "lanes": lanes
+        }
+
+    def _try_acquire(self, model_name: str, started: float) -> Tuple[Optional[KeyLane], float]:
+        """(lane, 0) with a token taken, or (None, seconds to wait before trying again)"""
+        lanes = self.lanes(model_name)
+        now = time.monotonic()
+        with self._lock:
+            ready = [lane for lane in lanes if lane.wait_time(now) == 0]
+            if ready:
+                lane = min(ready, key=self._routing_key(ready))
+                if lane.bucket is not None:
+                    lane.bucket.take()
+                lane.in_flight += 1
+                lane.counters["requests"] += 1
+                return lane, 0.0
+            wait = min(lane.wait_time(now) for lane in lanes)
+
+        waited = now - started
+        allowed = time_left(self.max_wait - waited)
+        if allowed is not None and wait > allowed:
+            raise KeysExhausted(
+                f"No API key has quota for {model_name} within {max(0.0, allowed):.1f}s "
+                f"(next in {wait:.1f}s)"
+            )
+        return None, wait
+
+    def _routing_key(self, ready: List[KeyLane]):
+        if self.routing == "latency":
+            known = [lane.latency for lane in ready if lane.latency is not None]
+            # Lanes without samples are assumed average, so they get tried
+            default = sum(known) / len(known) if known else 1.0
+            return lambda lane: (lane.in_flight + 1) * (lane.latency if lane.latency is not None else default)
+        return lambda lane: (lane.in_flight, -(lane.bucket.tokens if lane.bucket is not None else 0))
+
+    def _bucket(self) -> Optional[TokenBucket]:
+        if not self.requests_per_minute:
+            return None
+        return TokenBucket(self.requests_per_minute / 60, self.burst)
+
+    def _cool_down(self, lane: KeyLane, now: float, seconds: float, reason: str):
+        lane.cooldown = seconds
+        lane.cooldown_until = max(lane.cooldown_until, now + seconds)
+        lane.counters["cooldowns"] += 1
+        KEY_COOLDOWNS.inc(key=lane.key_id, model=lane.model_name, reason=reason)
+
+    @staticmethod
+    def _transient(error: Exception, status: Optional[int]) -> bool:
+        """Whether an error is the API or network failing for now: a 5xx or 408, a timeout or a dropped connection"""
+        if status is not None:
+            return status >= 500 or status == 408
+        return isinstance(error, (TimeoutError, ConnectionError))
+
+    @staticmethod
+    def _status(error: Exception) -> Optional[int]:
+        """HTTP status of an API error (google.api_core errors carry it as .code)"""
+        try:
+            return int(getattr(error, "code", None))
+        except (TypeError, ValueError):
+            return None
+
+
+def parse_model_variants(value: str) -> Dict[str, List[str]]:
+    """Parse "model=variant|variant;model2=variant" into a variants map"""
+    variants = {}
+    for entry in (value or "").split(";"):
+        name, _, names = entry.partition("=")
+        if name.strip() and names.strip():
+            variants[name.strip()] = [variant.strip() for variant in names.split("|") if variant.strip()]
+    return variants
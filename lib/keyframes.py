@@ -0,0 +1,270 @@
+"""
+Keyframes Module for VerifyAI
+Streaming frame decoding for short clips and frame sequences, and local
+selection of a few sharp, distinct keyframes plus motion statistics for
+multi-frame liveness checks
+"""
+
+import os
+import tempfile
+from io import BytesIO
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from lib import metrics
+from lib.image_pipeline import ImageTooLargeError
+
+CLIP_FRAMES = metrics.registry.counter(
+    "verifyai_clip_frames_total",
+    "Clip frames by stage: decoded, sampled for analysis, or selected as keyframes",
+    ("stage",)
+)
+
+
+class UnsupportedClipError(ValueError):
+    """Raised when a clip cannot be decoded"""
+
+
+def iter_clip_frames(data: bytes, max_pixels: int = 40_000_000) -> Iterator[Tuple[Optional[float], "Image.Image"]]:
+    """
+    Yield (seconds from start, frame) for a clip, one frame at a time:
+    animated GIF, WebP, APNG or multi-page TIFF through Pillow, other
+    containers (MP4, WebM, MOV...) through OpenCV when opencv-python is
+    installed. Frames are only valid until the next one is requested.
+    """
+    from PIL import Image, ImageSequence, UnidentifiedImageError
+    try:
+        clip = Image.open(BytesIO(data))
+    except UnidentifiedImageError:
+        yield from _iter_video_frames(data, max_pixels)
+        return
+
+    width, height = clip.size
+    if width * height > max_pixels:
+        raise ImageTooLargeError(f"Clip frames are {width}x{height}, limit is {max_pixels} pixels")
+    elapsed = 0.0
+    for frame in ImageSequence.Iterator(clip):
+        yield elapsed, frame
+        elapsed += (frame.info.get("duration") or 0) / 1000
+
+
+def iter_sequence_frames(frames: Iterable[bytes], max_pixels: int = 40_000_000) -> Iterator[Tuple[Optional[float], "Image.Image"]]:
+    """Yield (None, frame) for a sequence of encoded still images, decoding each only when reached"""
+    from PIL import Image, ImageOps, UnidentifiedImageError
+    for data in frames:
+        try:
+            frame = Image.open(BytesIO(data))
+        except UnidentifiedImageError:
+            raise UnsupportedClipError("A frame is not a decodable image")
+        width, height = frame.size
+        if width * height > max_pixels:
+            raise ImageTooLargeError(f"Frame is {width}x{height}, limit is {max_pixels} pixels")
+        yield None, ImageOps.exif_transpose(frame)
+
+
+def _iter_video_frames(data: bytes, max_pixels: int):
+    try:
+        import cv2
+    except ImportError:
+        raise UnsupportedClipError(
+            "Video clips need opencv-python; send an animated GIF/WebP or a frame sequence instead"
+        )
+    from PIL import Image
+    # VideoCapture reads from a path, so the upload is spooled to a temporary file
+    fd, path = tempfile.mkstemp(prefix="verifyai-clip-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        capture = cv2.VideoCapture(path)
+        if not capture.isOpened():
+            raise UnsupportedClipError("Clip format is not supported")
+        try:
+            width = int(capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+            height = int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            if width * height > max_pixels:
+                raise ImageTooLargeError(f"Clip frames are {width}x{height}, limit is {max_pixels} pixels")
+            fps = capture.get(cv2.CAP_PROP_FPS) or 0
+            index = 0
+            while True:
+                ok, frame = capture.read()
+                if not ok:
+                    break
+                yield (index / fps if fps else None), Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+                index += 1
+        finally:
+            capture.release()
+    finally:
+        os.remove(path)
+
+
+class Keyframe:
+    """A candidate keyframe: its position in the clip, dHash, sharpness and downscaled pixels"""
+
+    def __init__(self, index: int, time: Optional[float], hash_value: int, sharpness: float, image):
+        self.index = index
+        self.time = time
+        self.hash = hash_value
+        self.anchor_hash = hash_value
+        self.sharpness = sharpness
+        self.image = image
+
+    def describe(self) -> Dict:
+        return {
+            "index": self.index,
+            "time": round(self.time, 3) if self.time is not None else None,
+            "sharpness": round(self.sharpness, 1)
+        }
+
+
+class KeyframeSelector:
+    """
+    Picks up to max_keyframes sharp, mutually distinct frames from a clip
+    in one streaming pass, keeping only a few downscaled frames in memory.
+
+    Frames are sampled at up to sample_fps (every frame of an untimed
+    sequence) and at most max_frames are read. Each sampled frame is
+    reduced to an analysis_size greyscale thumbnail for its dHash, its
+    sharpness (variance of the Laplacian, low when blurred) and its mean
+    absolute difference from the previous sample (motion). Consecutive
+    frames within min_distance bits of a run's first frame belong to the
+    same run, which keeps only its sharpest frame; past max_candidates
+    runs, the two most similar neighbouring runs are merged.
+
+    The keyframes are then chosen greedily from the runs: the sharpest
+    first, then the run farthest (in dHash bits) from those already
+    chosen, while it is at least min_distance away. Runs blurrier than
+    blur_ratio times the median sharpness are only used when nothing else
+    is left. Keyframes are returned in clip order with the motion
+    statistics, so a still photo held to the camera yields one keyframe
+    and near-zero motion.
+    """
+
+    def __init__(self,
+                 max_keyframes: int = 4,
+                 min_distance: int = 10,
+                 sample_fps: float = 8,
+                 max_frames: int = 300,
+                 max_candidates: int = 16,
+                 blur_ratio: float = 0.35,
+                 analysis_size: int = 128,
+                 keep_size: int = 512):
+        self.max_keyframes = max(1, max_keyframes)
+        self.min_distance = min_distance
+        self.sample_fps = sample_fps
+        self.max_frames = max_frames
+        self.max_candidates = max(self.max_keyframes, max_candidates)
+        self.blur_ratio = blur_ratio
+        self.analysis_size = analysis_size
+        self.keep_size = keep_size
+
+    def select(self, frames: Iterable[Tuple[Optional[float], "Image.Image"]]) -> Dict:
+        """Return {"keyframes": [Keyframe], "temporal": {...}} for (time, frame) pairs"""
+        # NumPy and the hashes are only needed for clips, so they are imported on first use
+        import numpy as np
+        from lib.perceptual_hash import dhash, hamming
+
+        runs: List[Keyframe] = []
+        motions = []
+        previous = None
+        decoded = sampled = 0
+        next_sample = 0.0
+        last_time = None
+        for index, (time, frame) in enumerate(frames):
+            if decoded >= self.max_frames:
+                break
+            decoded += 1
+            if time is not None:
+                last_time = time
+                if self.sample_fps and time < next_sample:
+                    continue
+                next_sample = time + 1 / self.sample_fps if self.sample_fps else 0.0
+            sampled += 1
+
+            thumb = self._thumbnail(frame)
+            pixels = np.asarray(thumb, dtype=np.float32)
+            hash_value = dhash(thumb)
+            sharpness = self._sharpness(pixels)
+            if previous is not None and previous.shape == pixels.shape:
+                motions.append(float(np.abs(pixels - previous).mean()) / 255)
+            previous = pixels
+
+            run = runs[-1] if runs else None
+            if run is None or hamming(hash_value, run.anchor_hash) >= self.min_distance:
+                runs.append(Keyframe(index, time, hash_value, sharpness, self._keep(frame)))
+                if len(runs) > self.max_candidates:
+                    self._merge_closest(runs, hamming)
+            elif sharpness > run.sharpness:
+                run.index, run.time, run.hash, run.sharpness = index, time, hash_value, sharpness
+                run.image = self._keep(frame)
+
+        CLIP_FRAMES.inc(decoded, stage="decoded")
+        CLIP_FRAMES.inc(sampled, stage="sampled")
+        if not runs:
+            raise UnsupportedClipError("Clip has no frames")
+
+        keyframes = self._choose(runs, hamming)
+        CLIP_FRAMES.inc(len(keyframes), stage="keyframes")
+        return {
+            "keyframes": keyframes,
+            "temporal": {
+                "frames_decoded": decoded,
+                "frames_sampled": sampled,
+                "duration": round(last_time, 3) if last_time is not None else None,
+                "distinct_runs": len(runs),
+                "mean_motion": round(float(np.mean(motions)), 4) if motions else 0.0,
+                "max_motion": round(float(np.max(motions)), 4) if motions else 0.0
+            }
+        }
+
+    def _choose(self, runs: List[Keyframe], hamming) -> List[Keyframe]:
+        sharpness = sorted(run.sharpness for run in runs)
+        floor = self.blur_ratio * sharpness[len(sharpness) // 2]
+        usable = [run for run in runs if run.sharpness >= floor] or runs
+
+        chosen = [max(usable, key=lambda run: run.sharpness)]
+        remaining = [run for run in usable if run is not chosen[0]]
+        while remaining and len(chosen) < self.max_keyframes:
+            distances = [min(hamming(run.hash, other.hash) for other in chosen) for run in remaining]
+            best = max(range(len(remaining)), key=lambda i: (distances[i], remaining[i].sharpness))
+            if distances[best] < self.min_distance:
+                break
+            chosen.append(remaining.pop(best))
+        return sorted(chosen, key=lambda run: run.index)
+
+    @staticmethod
+    def _merge_closest(runs: List[Keyframe], hamming):
+        """Merge the two most similar neighbouring runs, keeping the sharper frame"""
+        i = min(range(len(runs) - 1), key=lambda i: hamming(runs[i].anchor_hash, runs[i + 1].anchor_hash))
+        first, second = runs[i], runs.pop(i + 1)
+        if second.sharpness > first.sharpness:
+            first.index, first.time, first.hash, first.sharpness, first.image = (
+                second.index, second.time, second.hash, second.sharpness, second.image
+            )
+
+    def _thumbnail(self, frame):
+        from PIL import Image
+        thumb = frame.convert("L")
+        thumb.thumbnail((self.analysis_size, self.analysis_size), Image.Resampling.BILINEAR)
+        return thumb
+
+    def _keep(self, frame):
+        """A downscaled RGB copy of a frame, independent of the decoder's buffer"""
+        from PIL import Image
+        image = frame.convert("RGB")
+        image.thumbnail((self.keep_size, self.keep_size), Image.Resampling.LANCZOS)
+        return image
+
+    @staticmethod
+    def _sharpness(pixels) -> float:
+        """Variance of the 4-neighbour Laplacian"""
+        laplacian = (
+            4 * pixels[1:-1, 1:-1]
+            - pixels[:-2, 1:-1] - pixels[2:, 1:-1]
+            - pixels[1:-1, :-2] - pixels[1:-1, 2:]
+        )
+        return float(laplacian.var()) if laplacian.size else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.max_keyframes}:{self.min_distance}:{self.sample_fps}:"
+            f"{self.max_frames}:{self.blur_ratio}:{self.keep_size}"
+        )
@@ -0,0 +1,207 @@
+"""
+Metrics Module for VerifyAI
+Per-stage latency histograms and counters in Prometheus text format, plus
+per-request stage timings for the Server-Timing header
+"""
+
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+# Seconds; covers cache hits through slow multimodal model calls
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30)
+
+# Endpoint label and stage timings of the request being served. Worker threads
+# see them when submitted through contextvars.copy_context().run.
+_current_endpoint = contextvars.ContextVar("verifyai_endpoint", default="none")
+_current_timings = contextvars.ContextVar("verifyai_timings", default=None)
+
+
+def _label_key(label_names: Tuple[str, ...], labels: Dict) -> Tuple[str, ...]:
+    return tuple(str(labels.get(name, "")) for name in label_names)
+
+
+def _format_labels(label_names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [
+        '{}="{}"'.format(name, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", " "))
+        for name, value in zip(label_names, values)
+    ]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Monotonic counter with a fixed label set"""
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(self.label_names, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(_label_key(self.label_names, labels), 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.label_names, key)} {value}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram with a fixed label set"""
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label values -> [bucket counts..., count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _label_key(self.label_names, labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def snapshot(self, **labels) -> Dict:
+        """Return count and sum for one label set"""
+        with self._lock:
+            series = self._series.get(_label_key(self.label_names, labels))
+            if series is None:
+                return {"count": 0, "sum": 0.0}
+            return {"count": series[-2], "sum": series[-1]}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                labels = _format_labels(self.label_names, key)
+                for bound, count in zip(self.buckets, series):
+                    bucket_labels = _format_labels(self.label_names, key, 'le="%s"' % bound)
+                    lines.append(f"{self.name}_bucket{bucket_labels} {count}")
+                inf_labels = _format_labels(self.label_names, key, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{inf_labels} {series[-2]}")
+                lines.append(f"{self.name}_count{labels} {series[-2]}")
+                lines.append(f"{self.name}_sum{labels} {series[-1]:.6f}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds every metric and renders them for /api/metrics"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help_text: str, label_names: Tuple[str, ...] = ()) -> Counter:
+        return self._register(name, lambda: Counter(name, help_text, label_names))
+
+    def histogram(self, name: str, help_text: str, label_names: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(name, lambda: Histogram(name, help_text, label_names, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def _register(self, name, factory):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = factory()
+            return metric
+
+
+registry = MetricsRegistry()
+
+STAGE_DURATION = registry.histogram(
+    "verifyai_stage_duration_seconds",
+    "Time spent in each processing stage",
+    ("endpoint", "stage")
+)
+REQUEST_DURATION = registry.histogram(
+    "verifyai_request_duration_seconds",
+    "End-to-end request handling time",
+    ("endpoint",)
+)
+REQUESTS = registry.counter(
+    "verifyai_requests_total",
+    "Requests served by endpoint and HTTP status",
+    ("endpoint", "status")
+)
+MOCK_FALLBACKS = registry.counter(
+    "verifyai_mock_fallbacks_total",
+    "Responses or sub-analyses that fell back to mock data",
+    ("endpoint", "analysis", "reason")
+)
+
+
+def start_request(endpoint: str):
+    """Begin collecting stage timings for the current request"""
+    _current_endpoint.set(endpoint)
+    _current_timings.set([])
+
+
+def current_endpoint() -> str:
+    """Return the endpoint label of the request being served"""
+    return _current_endpoint.get()
+
+
+def request_timings() -> List[Tuple[str, float]]:
+    """Return (stage, seconds) pairs recorded for the current request"""
+    return list(_current_timings.get() or [])
+
+
+def server_timing_header(timings: List[Tuple[str, float]] = None) -> str:
+    """Format stage timings as a Server-Timing header value"""
+    timings = request_timings() if timings is None else timings
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings)
+
+
+@contextmanager
+def stage(name: str):
+    """Time a block as a processing stage of the current request"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_DURATION.observe(elapsed, endpoint=_current_endpoint.get(), stage=name)
+        timings = _current_timings.get()
+        if timings is not None:
+            timings.append((name, elapsed))
+
+
+def record_fallback(analysis: str, reason: str):
+    """Count a mock-data fallback for the current request's endpoint"""
+    MOCK_FALLBACKS.inc(endpoint=_current_endpoint.get(), analysis=analysis, reason=reason)
+
+
+def render() -> str:
+    """Render every metric in Prometheus text exposition format"""
+    return registry.render()
@@ -0,0 +1,312 @@
+"""
+Model Backends Module for VerifyAI
+Pluggable model backends: Gemini for production and a deterministic local
+fake for benchmarks, load tests and offline development
+"""
+
+import abc
+import json
+import time
+import random
+import hashlib
+import threading
+from typing import Dict
+
+
+class ModelBackend(abc.ABC):
+    """
+    Interface for model backends. create_model returns an object exposing
+    the subset of genai.GenerativeModel the app uses: model_name,
+    generate_content(contents) and generate_content_async(contents), whose
+    responses carry the model output in `.text`. A backend that does not
+    implement create_model cannot be instantiated.
+    """
+
+    name = "base"
+
+    @abc.abstractmethod
+    def create_model(self, model_name: str, generation_config: Dict = None, api_key: str = None):
+        """Build a model; api_key, when given, is used instead of the backend's own key"""
+
+    def warm_up(self, models, probe: bool = False):
+        """Prepare connections for the given models ahead of the first request"""
+
+
+class GeminiBackend(ModelBackend):
+    """
+    Google Gemini through google.generativeai. The library is imported and
+    configured on first use, so constructing the backend costs nothing at
+    cold start. Models built for another API key (see lib/key_pool.py) get
+    a service client of their own.
+    """
+
+    name = "gemini"
+
+    def __init__(self, api_key: str = None):
+        self.api_key = api_key
+        self._genai = None
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    @property
+    def genai(self):
+        """The google.generativeai module, imported and configured once"""
+        if self._genai is None:
+            with self._lock:
+                if self._genai is None:
+                    import google.generativeai as genai
+                    if self.api_key:
+                        # Configure exactly once: reconfiguring drops the cached service clients
+                        genai.configure(api_key=self.api_key)
+                    self._genai = genai
+        return self._genai
+
+    def create_model(self, model_name: str, generation_config: Dict = None, api_key: str = None):
+        model = self.genai.GenerativeModel(model_name, generation_config=generation_config)
+        if api_key and api_key != self.api_key:
+            # Per-key service clients let several keys serve side by side; genai.configure is process-wide
+            model._client = self.service_client(api_key)
+            model._async_client = _LazyClient(lambda: self.service_client(api_key, asynchronous=True))
+        return model
+
+    def service_client(self, api_key: str, asynchronous: bool = False):
+        """The generative service client for an API key, shared by every model using it"""
+        key = (api_key, asynchronous)
+        client = self._clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    import google.ai.generativelanguage as glm
+                    cls = glm.GenerativeServiceAsyncClient if asynchronous else glm.GenerativeServiceClient
+                    client = self._clients[key] = cls(client_options={"api_key": api_key})
+        return client
+
+    def warm_up(self, models, probe: bool = False):
+        self.genai
+        from google.generativeai import client as genai_client
+        from google.generativeai.types import content_types
+        default_service = genai_client.get_default_generative_client()
+        if probe:
+            for model in models:
+                # Models bound to a pool key carry their own service client
+                service = getattr(model, "_client", None) or default_service
+                try:
+                    service.count_tokens(model=model.model_name, contents=content_types.to_contents("ping"))
+                except Exception:
+                    pass
+
+
+class _LazyClient:
+    """
+    Builds a service client on first use. Async gRPC clients bind to the
+    event loop they are created on, so they must not be built at warm-up.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+
+    def __getattr__(self, name):
+        return getattr(self._factory(), name)
+
+
+class FakeModelError(Exception):
+    """Simulated model failure"""
+
+
+class FakeQuotaError(FakeModelError):
+    """Simulated per-key quota rejection; code mirrors google.api_core's ResourceExhausted"""
+
+    code = 429
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeModel:
+    """
+    Local stand-in for a GenerativeModel. Output is derived from a hash of
+    the request contents, so the same input always yields the same JSON;
+    latency, failures and malformed output are drawn from the backend's
+    seeded random stream.
+    """
+
+    def __init__(self, backend: "FakeModelBackend", model_name: str, api_key: str = None):
+        self.backend = backend
+        self.model_name = model_name
+        self.api_key = api_key
+
+    def generate_content(self, contents, **kwargs):
+        delay, outcome = self.backend.draw(self.api_key)
+        time.sleep(delay)
+        return self._respond(contents, outcome)
+
+    async def generate_content_async(self, contents, **kwargs):
+        import asyncio
+        delay, outcome = self.backend.draw(self.api_key)
+        await asyncio.sleep(delay)
+        return self._respond(contents, outcome)
+
+    def _respond(self, contents, outcome: str) -> FakeResponse:
+        self.backend.count(outcome)
+        if outcome == "throttled":
+            raise FakeQuotaError("Simulated quota exceeded for API key")
+        if outcome == "failure":
+            raise FakeModelError("Simulated model failure")
+        if outcome == "malformed":
+            return FakeResponse('{"truncated": ')
+
+        parts = contents if isinstance(contents, (list, tuple)) else [contents]
+        digest = hashlib.sha256()
+        prompt = ""
+        for part in parts:
+            if isinstance(part, str):
+                prompt = prompt or part
+                digest.update(part.encode("utf-8"))
+            elif isinstance(part, dict) and "data" in part:
+                digest.update(part["data"])
+        rng = random.Random(digest.digest())
+        return FakeResponse("```json\n" + json.dumps(_fake_payload(prompt, rng)) + "\n```")
+
+
+def _fake_payload(prompt: str, rng: random.Random) -> Dict:
+    """Build a plausible response for whichever app prompt was sent"""
+    def score():
+        return rng.randint(0, 100)
+
+    def skin():
+        return {
+            "luminosity": score(), "smoothness": score(), "pore_visibility": score(),
+            "wrinkle_prominence": score(), "tone_uniformity": score(),
+            "filter_probability": score(), "analysis": "Synthetic skin analysis"
+        }
+
+    def eye():
+        return {
+            "eyelid_drooping": score(), "eyebrow_drooping": score(), "eye_bags": score(),
+            "crows_feet": score(), "under_eye_darkness": score(), "eye_filtering": score(),
+            "eye_openness": score(), "age_indicators": "Synthetic eye analysis"
+        }
+
+    def dental():
+        return {
+            "tooth_visibility": score(), "gum_exposure": score(), "tooth_whiteness": score(),
+            "tooth_wear": score(), "smile_authenticity": score(), "smile_symmetry": score(),
+            "mouth_elevation": score(), "whitening_filtering": score(),
+            "dental_age_indicators": "Synthetic dental analysis"
+        }
+
+    if "skin, eye area and dental" in prompt:
+        return {"skin": skin(), "eye": eye(), "dental": dental()}
+    if "skin characteristics" in prompt:
+        return skin()
+    if "eye area" in prompt:
+        return eye()
+    if "dental and smile" in prompt:
+        return dental()
+    if "keyframes" in prompt and "identity verification" in prompt:
+        return {
+            "faceMatch": round(rng.random(), 2), "ageEstimate": rng.randint(18, 70),
+            "livenessScore": round(rng.random(), 2), "sameSubject": rng.random() > 0.1,
+            "motionEvidence": rng.sample(["blink", "head turn", "expression change", "parallax"], rng.randint(0, 2)),
+            "spoofIndicators": rng.choice(["none", "screen glare", "static frames"]),
+            "status": rng.choice(["VERIFIED", "FAILED"])
+        }
+    if "identity verification" in prompt:
+        return {
+            "faceMatch": round(rng.random(), 2), "ageEstimate": rng.randint(18, 70),
+            "livenessScore": round(rng.random(), 2), "status": rng.choice(["VERIFIED", "FAILED"])
+        }
+    if "deepfake" in prompt:
+        return {
+            "deepfakeScore": round(rng.random(), 2), "faceDetection": round(rng.random(), 2),
+            "contentAnalysis": "Synthetic content analysis",
+            "authenticity": rng.choice(["Genuine", "Suspicious"])
+        }
+    if "startup idea" in prompt:
+        return {
+            "marketPotential": round(rng.uniform(0, 10), 1), "tam": "$10B", "sam": "$1B", "som": "$100M",
+            "competitorCount": rng.randint(0, 50), "startupGrade": rng.choice("ABCDF"),
+            "keyInsights": "Synthetic startup analysis"
+        }
+    return {"result": "Synthetic response"}
+
+
+class FakeModelBackend(ModelBackend):
+    """
+    Deterministic local backend with configurable latency (mean and jitter,
+    in seconds), failure rate and malformed-JSON rate. With key_rpm, each
+    API key is limited to that many calls per minute and calls above it are
+    throttled, like a real per-key quota.
+    """
+
+    name = "fake"
+
+    def __init__(self,
+                 latency: float = 0.8,
+                 jitter: float = 0.2,
+                 failure_rate: float = 0.0,
+                 malformed_rate: float = 0.0,
+                 seed: int = 0,
+                 key_rpm: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.malformed_rate = malformed_rate
+        self.key_rpm = key_rpm
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._key_calls = {}  # API key -> times of its calls in the last minute
+        self._counters = {"ok": 0, "failure": 0, "malformed": 0, "throttled": 0}
+
+    def create_model(self, model_name: str, generation_config: Dict = None, api_key: str = None):
+        return FakeModel(self, model_name, api_key)
+
+    def draw(self, api_key: str = None):
+        """Return (delay seconds, outcome) for the next call"""
+        with self._lock:
+            delay = max(0.0, self._random.gauss(self.latency, self.jitter)) if self.jitter else self.latency
+            roll = self._random.random()
+            if self.key_rpm and self._over_quota(api_key):
+                return 0.0, "throttled"
+        if roll < self.failure_rate:
+            return delay, "failure"
+        if roll < self.failure_rate + self.malformed_rate:
+            return delay, "malformed"
+        return delay, "ok"
+
+    def _over_quota(self, api_key: str) -> bool:
+        now = time.monotonic()
+        calls = self._key_calls.setdefault(api_key, [])
+        calls[:] = [at for at in calls if at > now - 60]
+        if len(calls) >= self.key_rpm:
+            return True
+        calls.append(now)
+        return False
+
+    def count(self, outcome: str):
+        with self._lock:
+            self._counters[outcome] += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return dict(self._counters)
+
+
+def backend_from_env(env, api_key: str = None) -> ModelBackend:
+    """Build the backend selected by MODEL_BACKEND (gemini or fake)"""
+    name = env.get("MODEL_BACKEND", "gemini").lower()
+    if name == "fake":
+        return FakeModelBackend(
+            latency=float(env.get("FAKE_MODEL_LATENCY_MS", "800")) / 1000,
+            jitter=float(env.get("FAKE_MODEL_JITTER_MS", "200")) / 1000,
+            failure_rate=float(env.get("FAKE_MODEL_FAILURE_RATE", "0")),
+            malformed_rate=float(env.get("FAKE_MODEL_MALFORMED_RATE", "0")),
+            seed=int(env.get("FAKE_MODEL_SEED", "0")),
+            key_rpm=int(env.get("FAKE_MODEL_KEY_RPM", "0"))
+        )
+    if name == "gemini":
+        return GeminiBackend(api_key)
+    raise ValueError(f"Unknown MODEL_BACKEND: {name}")
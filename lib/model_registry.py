@@ -0,0 +1,99 @@
+"""
+Model Registry Module for VerifyAI
+Process-wide model clients, built once and shared by every endpoint
+"""
+
+import json
+import threading
+from typing import Dict
+from lib.model_backends import ModelBackend, GeminiBackend
+from lib.key_pool import KeyPool
+
+
+class ModelRegistry:
+    """
+    Builds each model once per (model name, generation config) and hands the
+    same instance to every request. Gemini models share the library's cached
+    service client, so the underlying connection is reused too.
+
+    endpoint_models maps endpoint names to model names, so endpoints pick
+    their model through configuration instead of a hard-coded string. The
+    backend decides what a model is (see lib/model_backends.py); it defaults
+    to Gemini configured with api_key.
+
+    With a key_pool (see lib/key_pool.py), each model is a pooled model
+    that spreads its calls over the pool's API keys and model variants.
+    """
+
+    def __init__(self,
+                 api_key: str = None,
+                 default_model: str = 'gemini-1.5-flash',
+                 endpoint_models: Dict[str, str] = None,
+                 backend: ModelBackend = None,
+                 key_pool: KeyPool = None):
+        self.default_model = default_model
+        self.endpoint_models = {
+            endpoint: name for endpoint, name in (endpoint_models or {}).items() if name
+        }
+        self.backend = backend or GeminiBackend(api_key)
+        self.key_pool = key_pool
+        self._models = {}
+        self._lock = threading.Lock()
+        self._warm = False
+
+    def model_name(self, endpoint: str = None) -> str:
+        """Return the model name configured for an endpoint"""
+        return self.endpoint_models.get(endpoint) or self.default_model
+
+    def get(self, model_name: str = None, generation_config: Dict = None):
+        """Return the shared model for a name and generation config"""
+        model_name = model_name or self.default_model
+        key = (model_name, json.dumps(generation_config or {}, sort_keys=True))
+        model = self._models.get(key)
+        if model is None:
+            with self._lock:
+                model = self._models.get(key)
+                if model is None:
+                    if self.key_pool is not None:
+                        model = self.key_pool.model(model_name, generation_config)
+                    else:
+                        model = self.backend.create_model(model_name, generation_config)
+                    self._models[key] = model
+        return model
+
+    def for_endpoint(self, endpoint: str, generation_config: Dict = None):
+        """Return the shared model configured for an endpoint"""
+        return self.get(self.model_name(endpoint), generation_config)
+
+    def warm_up(self, probe: bool = False):
+        """
+        Build every configured model and the backend's connections ahead of
+        the first request. With probe=True, the Gemini backend also issues a
+        token count per model so the connection handshake happens now
+        instead of on the hot path.
+        """
+        names = {self.default_model, *self.endpoint_models.values()}
+        models = [self.get(name) for name in names]
+        if self.key_pool is not None:
+            self.key_pool.warm_up(models, probe=probe)
+        else:
+            self.backend.warm_up(models, probe=probe)
+        self._warm = True
+
+    def warm_up_in_background(self, probe: bool = False) -> threading.Thread:
+        """Run warm_up on a daemon thread so startup is not blocked"""
+        thread = threading.Thread(target=self.warm_up, kwargs={"probe": probe},
+                                  name="model-warm-up", daemon=True)
+        thread.start()
+        return thread
+
+    def stats(self) -> Dict:
+        """Describe the registry for health checks"""
+        return {
+            "backend": self.backend.name,
+            "default_model": self.default_model,
+            "endpoint_models": dict(self.endpoint_models),
+            "models_built": len(self._models),
+            "warm": self._warm,
+            "key_pool": self.key_pool.stats() if self.key_pool is not None else None
+        }
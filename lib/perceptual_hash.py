@@ -0,0 +1,348 @@
+"""
+Perceptual Hash Module for VerifyAI
+64-bit dHash/pHash of decoded images and a multi-index hashing index for
+near-duplicate lookups by Hamming distance, persisted as an append-only log
+"""
+
+import os
+import time
+import hashlib
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+import numpy as np
+
+from lib import metrics
+
+try:
+    import fcntl
+except ImportError:
+    # No flock on Windows; the shared log is then never compacted
+    fcntl = None
+
+NEAR_DUPLICATES = metrics.registry.counter(
+    "verifyai_near_duplicates_total",
+    "Near-duplicate lookups by outcome (reused, flagged or miss)",
+    ("endpoint", "outcome")
+)
+
+HASH_BITS = 64
+
+# Popcount of every byte value, for vectorized Hamming distances
+_BYTE_POPCOUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+
+
+def dhash(image) -> int:
+    """
+    Difference hash: 1 where a pixel is brighter than its right neighbour on
+    a 9x8 greyscale thumbnail. Cheap, and stable under resizing and
+    recompression.
+    """
+    from PIL import Image
+    pixels = np.asarray(image.convert("L").resize((9, 8), Image.Resampling.LANCZOS), dtype=np.int16)
+    return _pack_bits(pixels[:, 1:] > pixels[:, :-1])
+
+
+def phash(image) -> int:
+    """
+    DCT hash: 1 where a low-frequency DCT coefficient of a 32x32 greyscale
+    thumbnail is above their median (the DC term excluded). More robust than
+    dHash to brightness, gamma and mild cropping changes.
+    """
+    from PIL import Image
+    pixels = np.asarray(image.convert("L").resize((32, 32), Image.Resampling.LANCZOS), dtype=np.float64)
+    low = (_DCT_8x32 @ pixels @ _DCT_8x32.T)
+    return _pack_bits(low > np.median(low.ravel()[1:]))
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def _dct_matrix(rows: int, size: int) -> np.ndarray:
+    """First `rows` basis vectors of the orthonormal DCT-II of length size"""
+    k = np.arange(rows)[:, None]
+    n = np.arange(size)[None, :]
+    matrix = np.cos(np.pi * (2 * n + 1) * k / (2 * size)) * np.sqrt(2 / size)
+    matrix[0] /= np.sqrt(2)
+    return matrix
+
+
+_DCT_8x32 = _dct_matrix(8, 32)
+
+
+def _pack_bits(bits: np.ndarray) -> int:
+    return int.from_bytes(np.packbits(bits.ravel()).tobytes(), "big")
+
+
+def _popcount(values: np.ndarray) -> np.ndarray:
+    """Set bits of each uint64"""
+    if hasattr(np, "bitwise_count"):
+        # NumPy 2 has a native popcount
+        return np.bitwise_count(values)
+    return _BYTE_POPCOUNT[values.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+
+class PerceptualHashIndex:
+    """
+    Near-duplicate index of 64-bit hashes using multi-index hashing: each
+    hash is split into four 16-bit chunks, and a hash within distance d of
+    the query must match it on at least one chunk to within d // 4 bits.
+    A lookup therefore only probes the chunk values within that radius of
+    the query's chunks (17 per chunk for d <= 7), each an O(1) bucket of
+    per-chunk sorted row numbers, then checks the full distance of those candidates, so it stays well
+    under a millisecond with millions of entries.
+
+    Entries are (hash, scope, ref): scope keeps hashes from different
+    endpoints or prompts apart, ref is a 32-byte hex key (e.g. the result
+    cache key of the image). New entries go to an unsorted tail that is
+    scanned directly and merged into the sorted chunks every merge_every
+    entries.
+
+    With a path, entries are appended to a binary log that every process on
+    the host shares; each process loads the log on first use and picks up
+    other processes' entries on its next lookup. Entries older than ttl are
+    ignored, and once they make up compact_ratio of the log it is rewritten
+    without them. Appends hold a shared flock on path + ".lock" and the
+    rewrite an exclusive one, so no append lands in the replaced file;
+    other processes see the new file and reload it on their next access.
+    """
+
+    CHUNKS = 4
+    CHUNK_BITS = HASH_BITS // CHUNKS
+    BUCKETS = 1 << CHUNK_BITS
+    RECORD = np.dtype([
+        ("hash", "<u8"),
+        ("scope", "<u8"),
+        ("ref", "u1", (32,)),
+        ("added_at", "<f8")
+    ])
+
+    def __init__(self,
+                 path: str = None,
+                 max_distance: int = 6,
+                 ttl: float = None,
+                 merge_every: int = 4096,
+                 compact_ratio: float = 0.5):
+        if not 0 <= max_distance < 4 * self.CHUNKS:
+            raise ValueError(f"max_distance must be between 0 and {4 * self.CHUNKS - 1}")
+        self.path = path
+        self.max_distance = max_distance
+        self.ttl = ttl
+        self.merge_every = merge_every
+        self.compact_ratio = compact_ratio
+        # Columns of every entry, in insertion order
+        self._hashes = np.zeros(1024, dtype=np.uint64)
+        self._scopes = np.zeros(1024, dtype=np.uint64)
+        self._refs = np.zeros((1024, 32), dtype=np.uint8)
+        self._added_at = np.zeros(1024, dtype=np.float64)
+        self._count = 0
+        self._sorted_count = 0
+        # Row numbers sorted by each chunk's value, all chunks back to back, and
+        # where the bucket of every (chunk, value) starts in them
+        self._chunk_order = np.zeros(0, dtype=np.uint32)
+        self._bucket_starts = np.zeros(self.CHUNKS * self.BUCKETS + 1, dtype=np.int64)
+        self._probe_masks = {}
+        self._file_offset = 0
+        self._file_id = None
+        self._lock = threading.Lock()
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with self._lock:
+                self._refresh()
+                self._merge()
+                self._compact_if_needed()
+
+    def add(self, hash_value: int, scope: str, ref: str):
+        """Index a hash under scope, pointing at ref"""
+        record = np.zeros(1, dtype=self.RECORD)
+        record["hash"] = hash_value
+        record["scope"] = self._scope_id(scope)
+        record["ref"] = np.frombuffer(bytes.fromhex(ref), dtype=np.uint8)
+        record["added_at"] = time.time()
+        with self._lock:
+            if self.path:
+                # One O_APPEND write per record, so concurrent writers never interleave
+                with self._file_lock(exclusive=False):
+                    fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                    try:
+                        os.write(fd, record.tobytes())
+                    finally:
+                        os.close(fd)
+                self._refresh()
+            else:
+                self._append(record)
+            if self._count - self._sorted_count >= self.merge_every:
+                self._merge()
+                self._compact_if_needed()
+
+    def nearest(self, hash_value: int, scope: str, max_distance: int = None) -> Optional[Dict]:
+        """
+        Return the closest entry in scope within max_distance (the index
+        default if None) as {"ref", "distance", "added_at"}, or None.
+        Ties go to the most recent entry.
+        """
+        distance = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+        scope_id = self._scope_id(scope)
+        with self._lock:
+            if self.path:
+                self._refresh()
+            # Candidates may repeat across chunks, which does not change the closest match
+            candidates = self._candidates(hash_value, distance // self.CHUNKS)
+            distances = _popcount(self._hashes[candidates] ^ np.uint64(hash_value))
+            close = distances <= distance
+            candidates, distances = candidates[close], distances[close]
+            keep = self._scopes[candidates] == scope_id
+            if self.ttl:
+                keep &= self._added_at[candidates] >= time.time() - self.ttl
+            candidates, distances = candidates[keep], distances[keep]
+            if not len(candidates):
+                return None
+            # Lowest distance first, then newest
+            added_at = self._added_at[candidates]
+            best = np.lexsort((-added_at, distances))[0]
+            return {
+                "ref": self._refs[candidates[best]].tobytes().hex(),
+                "distance": int(distances[best]),
+                "added_at": float(added_at[best])
+            }
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "entries": self._count,
+                "unmerged": self._count - self._sorted_count,
+                "compact_ratio": self.compact_ratio,
+                "max_distance": self.max_distance,
+                "ttl": self.ttl,
+                "persistent": bool(self.path)
+            }
+
+    def _candidates(self, hash_value: int, radius: int) -> np.ndarray:
+        """Row numbers of entries sharing a chunk within radius of the query, plus the tail"""
+        tail = np.arange(self._sorted_count, self._count, dtype=np.uint32)
+        if not self._sorted_count:
+            return tail
+        chunks = np.array([self._chunk(hash_value, chunk) for chunk in range(self.CHUNKS)], dtype=np.int64)
+        buckets = (self._masks(radius)[None, :] ^ chunks[:, None]) + self._bucket_offsets[:, None]
+        starts = self._bucket_starts[buckets.ravel()]
+        lengths = self._bucket_starts[buckets.ravel() + 1] - starts
+        # Concatenate the buckets' ranges: each start repeated over its length, plus 0..length-1
+        total = int(lengths.sum())
+        ends = np.cumsum(lengths)
+        positions = np.repeat(starts - (ends - lengths), lengths) + np.arange(total)
+        return np.concatenate((self._chunk_order[positions], tail))
+
+    def _masks(self, radius: int) -> np.ndarray:
+        """Every 16-bit value with at most radius bits set"""
+        masks = self._probe_masks.get(radius)
+        if masks is None:
+            values = np.arange(1 << self.CHUNK_BITS, dtype=np.uint32)
+            counts = _popcount(values.astype(np.uint64))
+            masks = self._probe_masks[radius] = values[counts <= radius].astype(np.int64)
+        return masks
+
+    @property
+    def _bucket_offsets(self) -> np.ndarray:
+        return np.arange(self.CHUNKS, dtype=np.int64) * self.BUCKETS
+
+    def _chunk(self, hash_value, chunk: int):
+        return (hash_value >> (chunk * self.CHUNK_BITS)) & ((1 << self.CHUNK_BITS) - 1)
+
+    def _merge(self):
+        """Rebuild the per-chunk buckets over every entry"""
+        hashes = self._hashes[:self._count]
+        orders, counts = [], []
+        for chunk in range(self.CHUNKS):
+            values = self._chunk(hashes, chunk).astype(np.uint16)
+            orders.append(np.argsort(values, kind="stable").astype(np.uint32))
+            counts.append(np.bincount(values, minlength=self.BUCKETS))
+        self._chunk_order = np.concatenate(orders)
+        self._bucket_starts = np.concatenate(([0], np.cumsum(np.concatenate(counts))))
+        self._sorted_count = self._count
+
+    def _append(self, records: np.ndarray):
+        needed = self._count + len(records)
+        if needed > len(self._hashes):
+            capacity = max(needed, 2 * len(self._hashes))
+            for name in ("_hashes", "_scopes", "_refs", "_added_at"):
+                column = getattr(self, name)
+                grown = np.zeros((capacity,) + column.shape[1:], dtype=column.dtype)
+                grown[:self._count] = column[:self._count]
+                setattr(self, name, grown)
+        self._hashes[self._count:needed] = records["hash"]
+        self._scopes[self._count:needed] = records["scope"]
+        self._refs[self._count:needed] = records["ref"]
+        self._added_at[self._count:needed] = records["added_at"]
+        self._count = needed
+
+    def _refresh(self):
+        """Load whole records appended to the log since the last read, or all of it once it was rewritten"""
+        try:
+            status = os.stat(self.path)
+        except OSError:
+            return
+        file_id = (status.st_dev, status.st_ino)
+        reload = self._file_id is not None and file_id != self._file_id
+        if reload:
+            # Another process compacted the log into a new file: read it from the start
+            self._count = self._sorted_count = self._file_offset = 0
+        self._file_id = file_id
+        complete = (status.st_size - self._file_offset) // self.RECORD.itemsize
+        if complete > 0:
+            with open(self.path, "rb") as f:
+                f.seek(self._file_offset)
+                records = np.fromfile(f, dtype=self.RECORD, count=complete)
+            self._file_offset += len(records) * self.RECORD.itemsize
+            self._append(records)
+        if reload:
+            self._merge()
+
+    def _compact_if_needed(self):
+        """Rewrite the log without expired entries once they make up compact_ratio of it"""
+        if not (self.path and self.ttl and self.compact_ratio and self._count) or fcntl is None:
+            # Without flock an append could land in the replaced file, so the log is left to grow
+            return
+        cutoff = time.time() - self.ttl
+        if np.count_nonzero(self._added_at[:self._count] < cutoff) < self.compact_ratio * self._count:
+            return
+        with self._file_lock(exclusive=True):
+            self._refresh()
+            keep = np.flatnonzero(self._added_at[:self._count] >= cutoff)
+            records = np.zeros(len(keep), dtype=self.RECORD)
+            records["hash"] = self._hashes[keep]
+            records["scope"] = self._scopes[keep]
+            records["ref"] = self._refs[keep]
+            records["added_at"] = self._added_at[keep]
+            tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                records.tofile(tmp_path)
+                os.replace(tmp_path, self.path)
+            except OSError:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                return
+            self._count = 0
+            self._append(records)
+            status = os.stat(self.path)
+            self._file_id = (status.st_dev, status.st_ino)
+            self._file_offset = status.st_size
+            self._merge()
+
+    @contextmanager
+    def _file_lock(self, exclusive: bool):
+        """flock on the log's lock file: shared for appends, exclusive for a rewrite"""
+        if fcntl is None:
+            yield
+            return
+        fd = os.open(f"{self.path}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def _scope_id(scope: str) -> int:
+        return int.from_bytes(hashlib.blake2b(scope.encode("utf-8"), digest_size=8).digest(), "little")
@@ -0,0 +1,501 @@
+"""
+Report Store Module for VerifyAI
+Append-only columnar store of the numeric metrics of every analysis result,
+in daily segments read through memory maps, with filtered aggregates and
+histograms over them
+"""
+
+import os
+import re
+import math
+import time
+import atexit
+import logging
+import secrets
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from lib import metrics
+
+logger = logging.getLogger(__name__)
+
+STORED_REPORTS = metrics.registry.counter(
+    "verifyai_report_store_records_total",
+    "Report store records by outcome (written, or dropped when the write queue is full)",
+    ("endpoint", "outcome")
+)
+
+# Numeric columns per endpoint: column -> path into the result, and for text
+# fields the value each known string is stored as
+SCHEMAS = {
+    "bio-authenticity": {
+        "overall_authenticity_score": ("overall_authenticity_score",),
+        "is_authentic": ("is_authentic",),
+        "luminosity": ("skin_analysis", "luminosity"),
+        "smoothness": ("skin_analysis", "smoothness"),
+        "pore_visibility": ("skin_analysis", "pore_visibility"),
+        "wrinkle_prominence": ("skin_analysis", "wrinkle_prominence"),
+        "tone_uniformity": ("skin_analysis", "tone_uniformity"),
+        "filter_probability": ("skin_analysis", "filter_probability"),
+        "eyelid_drooping": ("eye_analysis", "eyelid_drooping"),
+        "eyebrow_drooping": ("eye_analysis", "eyebrow_drooping"),
+        "eye_bags": ("eye_analysis", "eye_bags"),
+        "crows_feet": ("eye_analysis", "crows_feet"),
+        "under_eye_darkness": ("eye_analysis", "under_eye_darkness"),
+        "eye_filtering": ("eye_analysis", "eye_filtering"),
+        "eye_openness": ("eye_analysis", "eye_openness"),
+        "tooth_visibility": ("dental_analysis", "tooth_visibility"),
+        "gum_exposure": ("dental_analysis", "gum_exposure"),
+        "tooth_whiteness": ("dental_analysis", "tooth_whiteness"),
+        "tooth_wear": ("dental_analysis", "tooth_wear"),
+        "smile_authenticity": ("dental_analysis", "smile_authenticity"),
+        "smile_symmetry": ("dental_analysis", "smile_symmetry"),
+        "mouth_elevation": ("dental_analysis", "mouth_elevation"),
+        "whitening_filtering": ("dental_analysis", "whitening_filtering"),
+        "apparent_age": ("age_analysis", "apparent_age"),
+        "true_age": ("age_analysis", "true_age"),
+        "stated_age": ("age_analysis", "stated_age"),
+        "age_manipulation_probability": ("age_analysis", "age_manipulation_probability"),
+        "filter_impact_score": ("age_analysis", "filter_impact_score"),
+        "confidence_score": ("age_analysis", "confidence_score"),
+    },
+    "verify": {
+        "faceMatch": ("faceMatch",),
+        "ageEstimate": ("ageEstimate",),
+        "livenessScore": ("livenessScore",),
+        "verified": ("status", {"VERIFIED": 1, "FAILED": 0}),
+    },
+    "verify/frames": {
+        "faceMatch": ("faceMatch",),
+        "ageEstimate": ("ageEstimate",),
+        "livenessScore": ("livenessScore",),
+        "verified": ("status", {"VERIFIED": 1, "FAILED": 0}),
+        "keyframes": ("keyframes", len),
+        "mean_motion": ("temporal", "mean_motion"),
+        "max_motion": ("temporal", "max_motion"),
+    },
+    "analyze": {
+        "deepfakeScore": ("deepfakeScore",),
+        "faceDetection": ("faceDetection",),
+        "genuine": ("authenticity", {"Genuine": 1, "Suspicious": 0}),
+    },
+}
+
+# Columns every segment has besides the metrics
+TIME_COLUMN = "ts"
+FALLBACK_COLUMN = "fallback"
+
+OPERATORS = {
+    "<": lambda column, value: column < value,
+    "<=": lambda column, value: column <= value,
+    ">": lambda column, value: column > value,
+    ">=": lambda column, value: column >= value,
+    "==": lambda column, value: column == value,
+    "!=": lambda column, value: column != value,
+}
+
+_CONDITION = re.compile(r"^\s*(\w+)\s*(<=|>=|==|!=|<|>)\s*(-?[0-9.]+(?:e-?[0-9]+)?)\s*$")
+
+
+def parse_condition(text: str) -> Tuple[str, str, float]:
+    """Parse "column<op>number" (e.g. "filter_probability>=60") into (column, op, value)"""
+    match = _CONDITION.match(text)
+    if not match:
+        raise ValueError(f"Invalid condition: {text}")
+    return match.group(1), match.group(2), float(match.group(3))
+
+
+def parse_time(value) -> Optional[float]:
+    """Epoch seconds from a number or an ISO date/datetime (UTC unless it has an offset)"""
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    try:
+        parsed = datetime.fromisoformat(str(value))
+    except ValueError:
+        raise ValueError(f"Invalid time: {value}")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+# Result values stored as numbers; anything else is stored as NaN
+_NUMBERS = (int, float, bool)
+
+
+def _compile(path: Tuple) -> Tuple[Tuple[str, ...], Optional[Callable]]:
+    """Split a schema path into its keys and an optional final mapping or function"""
+    *keys, last = path
+    if isinstance(last, dict):
+        return tuple(keys), last.get
+    if callable(last):
+        return tuple(keys), last
+    return (*keys, last), None
+
+
+def _extract(result: Dict, accessors: List) -> Tuple[float, ...]:
+    """One number per compiled schema path, NaN where the result has none"""
+    row = []
+    for keys, transform in accessors:
+        value = result
+        for key in keys:
+            value = value.get(key) if type(value) is dict else None
+        if transform is not None and value is not None:
+            try:
+                value = transform(value)
+            except TypeError:
+                value = None
+        row.append(float(value) if type(value) in _NUMBERS else math.nan)
+    return tuple(row)
+
+
+def _is_fallback(result: Dict) -> bool:
+    """Whether a result is (partly) mock data rather than a model answer"""
+    return bool(
+        result.get("fallback_analyses")
+        or str(result.get("note", "")).startswith("Using mock data")
+        or result.get("status") == "error"
+    )
+
+
+class ReportStore:
+    """
+    Append-only store of analysis results as fixed-width numeric columns.
+
+    Layout: root/<endpoint>/<UTC day>/<writer>/<column>.f4 (float32, NaN
+    where a result had no value), plus ts.f8 (epoch seconds) and
+    fallback.u1 (1 for mock data). Each process writes its own directory,
+    so prefork workers never share a file.
+
+    A flush first cuts every column of a segment back to the number of
+    rows all of them hold, then appends the batch to each column. A write
+    that fails part-way can leave some columns longer than others; readers
+    only use the shortest column's length, and the next flush cuts the
+    extra tail off before the failed records, which are put back on the
+    queue, are written again. Records that no longer fit in the queue are
+    dropped and counted.
+
+    append only extracts the numbers and queues them (a few microseconds);
+    a daemon thread writes the queue every flush_interval seconds. When
+    max_pending records are already queued, new ones are dropped and
+    counted rather than slowing requests down.
+
+    query memory-maps only the columns it needs, skips days outside the
+    requested time range, and computes count, mean, std, min and max per
+    metric plus an optional histogram, excluding fallbacks by default.
+    """
+
+    DTYPES = {TIME_COLUMN: "f8", FALLBACK_COLUMN: "u1"}
+    METRIC_DTYPE = "f4"
+
+    def __init__(self,
+                 root: str,
+                 flush_interval: float = 1.0,
+                 max_pending: int = 100_000,
+                 schemas: Dict = None):
+        self.root = root
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.schemas = schemas or SCHEMAS
+        self._accessors = {
+            endpoint: [_compile(path) for path in schema.values()] for endpoint, schema in self.schemas.items()
+        }
+        self._pending = deque()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pid = None
+        self._writer_id = self._new_writer_id()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self._counters = {"appended": 0, "written": 0, "dropped": 0, "flushes": 0}
+
+    def append(self, endpoint: str, result: Dict, timestamp: float = None) -> bool:
+        """Queue a result's metrics; returns False if the endpoint has no schema or the queue is full"""
+        accessors = self._accessors.get(endpoint)
+        if accessors is None or not isinstance(result, dict):
+            return False
+        if self._pid != os.getpid():
+            self._start_writer()
+        if len(self._pending) >= self.max_pending:
+            self._counters["dropped"] += 1
+            STORED_REPORTS.inc(endpoint=endpoint, outcome="dropped")
+            return False
+        self._pending.append((endpoint, timestamp or time.time(), _is_fallback(result), _extract(result, accessors)))
+        self._counters["appended"] += 1
+        return True
+
+    def flush(self):
+        """
+        Write every queued record to its segment. If a write fails, the
+        records not yet written go back on the queue and the error is raised.
+        """
+        import numpy as np
+        with self._flush_lock:
+            batch = []
+            while self._pending:
+                batch.append(self._pending.popleft())
+            if not batch:
+                return
+            groups = {}
+            for record in batch:
+                groups.setdefault((record[0], int(record[1] // 86400)), []).append(record)
+
+            groups = list(groups.items())
+            for index, ((endpoint, day), records) in enumerate(groups):
+                day = time.strftime("%Y-%m-%d", time.gmtime(day * 86400))
+                segment = os.path.join(self.root, self._directory(endpoint), day, self._writer_id)
+                _, timestamps, fallbacks, rows = zip(*records)
+                columns = {
+                    TIME_COLUMN: np.asarray(timestamps, dtype=self.DTYPES[TIME_COLUMN]),
+                    FALLBACK_COLUMN: np.asarray(fallbacks, dtype=self.DTYPES[FALLBACK_COLUMN]),
+                }
+                values = np.asarray(rows, dtype=self.METRIC_DTYPE).reshape(len(rows), -1)
+                for i, name in enumerate(self.schemas[endpoint]):
+                    columns[name] = values[:, i]
+                try:
+                    self._write_segment(segment, columns, np)
+                except Exception:
+                    self._requeue([record for _, unwritten in groups[index:] for record in unwritten])
+                    raise
+                STORED_REPORTS.inc(len(records), endpoint=endpoint, outcome="written")
+                self._counters["written"] += len(records)
+            self._counters["flushes"] += 1
+
+    def _write_segment(self, segment: str, columns: Dict, np):
+        """Append columns of equal length to a segment, first cutting all of its columns to a common length"""
+        os.makedirs(segment, exist_ok=True)
+        paths = {}
+        rows = None
+        for name in columns:
+            dtype = self.DTYPES.get(name, self.METRIC_DTYPE)
+            path = paths[name] = os.path.join(segment, f"{name}.{dtype}")
+            # A segment belongs to one process and so to one schema: a missing column is a failed first write
+            held = os.path.getsize(path) // np.dtype(dtype).itemsize if os.path.exists(path) else 0
+            rows = held if rows is None else min(rows, held)
+        for name, column in columns.items():
+            path = paths[name]
+            if os.path.exists(path) and os.path.getsize(path) != rows * column.itemsize:
+                os.truncate(path, rows * column.itemsize)
+        for name, column in columns.items():
+            with open(paths[name], "ab") as f:
+                f.write(column.tobytes())
+
+    def _requeue(self, records: List):
+        """Put unwritten records back at the front of the queue, dropping those it has no room for"""
+        room = max(0, self.max_pending - len(self._pending))
+        self._pending.extendleft(reversed(records[:room]))
+        for endpoint, *_ in records[room:]:
+            self._counters["dropped"] += 1
+            STORED_REPORTS.inc(endpoint=endpoint, outcome="dropped")
+
+    def query(self,
+              endpoint: str,
+              since: float = None,
+              until: float = None,
+              where: Iterable = (),
+              columns: List[str] = None,
+              histogram: str = None,
+              bins: int = 20,
+              value_range: Tuple[float, float] = None,
+              include_fallbacks: bool = False) -> Dict:
+        """
+        Aggregate stored results of an endpoint recorded in [since, until).
+        where holds (column, op, value) conditions or "column<op>value"
+        strings, all of which must hold; columns defaults to every metric.
+        The histogram has bins equal-width bins over value_range, by default
+        the matched values' min and max.
+        """
+        import numpy as np
+        schema = self.schemas.get(endpoint)
+        if schema is None:
+            raise ValueError(f"No stored reports for endpoint: {endpoint}")
+        conditions = [
+            parse_condition(c) if isinstance(c, str) else (c[0], c[1], float(c[2])) for c in where
+        ]
+        columns = list(columns or schema)
+        known = set(schema) | {TIME_COLUMN, FALLBACK_COLUMN}
+        for name in [*columns, *(c[0] for c in conditions), *([histogram] if histogram else [])]:
+            if name not in known:
+                raise ValueError(f"Unknown column for {endpoint}: {name}")
+        for _, op, _ in conditions:
+            if op not in OPERATORS:
+                raise ValueError(f"Unknown operator: {op}")
+        if histogram and histogram not in columns:
+            columns.append(histogram)
+        if bins < 1:
+            raise ValueError("bins must be at least 1")
+
+        needed = {TIME_COLUMN, FALLBACK_COLUMN, *columns, *(c[0] for c in conditions)}
+        aggregates = {name: [0, 0.0, 0.0, math.inf, -math.inf] for name in columns}
+        matched_values = [] if histogram and value_range is None else None
+        edges = np.linspace(value_range[0], value_range[1], bins + 1) if histogram and value_range else None
+        counts = np.zeros(bins, dtype=np.int64) if histogram else None
+        segments = rows_scanned = matched = 0
+
+        for segment in self._segments(endpoint, since, until):
+            data, rows = self._map(segment, needed, np)
+            if not rows:
+                continue
+            segments += 1
+            rows_scanned += rows
+            mask = np.ones(rows, dtype=bool)
+            ts = data[TIME_COLUMN]
+            if since is not None:
+                mask &= ts >= since
+            if until is not None:
+                mask &= ts < until
+            if not include_fallbacks:
+                mask &= data[FALLBACK_COLUMN] == 0
+            for name, op, value in conditions:
+                mask &= OPERATORS[op](data[name], value)
+            selected = int(mask.sum())
+            if not selected:
+                continue
+            matched += selected
+
+            for name in columns:
+                values = data[name][mask].astype(np.float64)
+                values = values[~np.isnan(values)]
+                if not values.size:
+                    continue
+                aggregate = aggregates[name]
+                aggregate[0] += values.size
+                aggregate[1] += float(values.sum())
+                aggregate[2] += float(np.square(values).sum())
+                aggregate[3] = min(aggregate[3], float(values.min()))
+                aggregate[4] = max(aggregate[4], float(values.max()))
+                if name == histogram:
+                    if edges is not None:
+                        counts += np.histogram(values, bins=edges)[0]
+                    else:
+                        # Without a range, the bins are only known once every value has been seen
+                        matched_values.append(values)
+
+        result = {
+            "endpoint": endpoint,
+            "since": since,
+            "until": until,
+            "where": [f"{name}{op}{value:g}" for name, op, value in conditions],
+            "include_fallbacks": include_fallbacks,
+            "segments": segments,
+            "rows_scanned": rows_scanned,
+            "count": matched,
+            "columns": {name: self._summary(*aggregate) for name, aggregate in aggregates.items()},
+        }
+        if histogram:
+            if edges is None:
+                low, high = aggregates[histogram][3], aggregates[histogram][4]
+                if math.isinf(low):
+                    low, high = 0.0, 1.0
+                edges = np.linspace(low, high if high > low else low + 1, bins + 1)
+                for values in matched_values:
+                    counts += np.histogram(values, bins=edges)[0]
+            result["histogram"] = {
+                "column": histogram,
+                "edges": [round(float(edge), 6) for edge in edges],
+                "counts": counts.tolist(),
+            }
+        return result
+
+    def stats(self) -> Dict:
+        return {
+            **self._counters,
+            "pending": len(self._pending),
+            "max_pending": self.max_pending,
+            "flush_interval": self.flush_interval,
+            "root": self.root,
+        }
+
+    def close(self):
+        """Stop the writer thread after a final flush"""
+        writer, self._writer = self._writer, None
+        if writer is not None:
+            self._wake.set()
+            writer.join(timeout=5)
+        self.flush()
+
+    def _start_writer(self):
+        """Start this process's writer thread (again after a fork, which does not copy threads)"""
+        with self._writer_lock:
+            if self._pid == os.getpid():
+                return
+            if self._pid is not None:
+                # Records queued by the parent are the parent's to write
+                self._pending = deque()
+                self._flush_lock = threading.Lock()
+            self._pid = os.getpid()
+            self._writer_id = self._new_writer_id()
+            self._writer = threading.Thread(target=self._run, name="report-store-writer", daemon=True)
+            self._writer.start()
+            atexit.register(self.flush)
+
+    def _run(self):
+        writer = self._writer
+        while self._writer is writer:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                # A full disk or a removed directory should not stop later writes
+                logger.exception("Report store flush failed, %d records queued", len(self._pending))
+
+    def _segments(self, endpoint: str, since: float = None, until: float = None):
+        """Writer directories of the days that overlap [since, until)"""
+        base = os.path.join(self.root, self._directory(endpoint))
+        if not os.path.isdir(base):
+            return
+        first = time.strftime("%Y-%m-%d", time.gmtime(since)) if since is not None else None
+        last = time.strftime("%Y-%m-%d", time.gmtime(until)) if until is not None else None
+        for day in sorted(os.listdir(base)):
+            if (first and day < first) or (last and day > last):
+                continue
+            day_path = os.path.join(base, day)
+            for writer in sorted(os.listdir(day_path)):
+                yield os.path.join(day_path, writer)
+
+    def _map(self, segment: str, names, np) -> Tuple[Dict, int]:
+        """Memory-map the named columns of a segment; missing metric columns read as NaN"""
+        files = {}
+        for name in names:
+            dtype = self.DTYPES.get(name, self.METRIC_DTYPE)
+            path = os.path.join(segment, f"{name}.{dtype}")
+            size = os.path.getsize(path) if os.path.exists(path) else None
+            files[name] = (path, np.dtype(dtype), size)
+        present = [size // dtype.itemsize for _, dtype, size in files.values() if size is not None]
+        rows = min(present) if present and files[TIME_COLUMN][2] is not None else 0
+        if not rows:
+            return {}, 0
+        data = {}
+        for name, (path, dtype, size) in files.items():
+            if size is None:
+                data[name] = np.full(rows, np.nan if dtype.kind == "f" else 0, dtype=dtype)
+            else:
+                data[name] = np.memmap(path, dtype=dtype, mode="r", shape=(rows,))
+        return data, rows
+
+    @staticmethod
+    def _new_writer_id() -> str:
+        return f"w{os.getpid()}-{secrets.token_hex(4)}"
+
+    @staticmethod
+    def _directory(endpoint: str) -> str:
+        return endpoint.replace("/", "-")
+
+    @staticmethod
+    def _summary(count, total, squares, low, high) -> Dict:
+        if not count:
+            return {"count": 0, "mean": None, "std": None, "min": None, "max": None}
+        mean = total / count
+        return {
+            "count": count,
+            "mean": round(mean, 4),
+            "std": round(math.sqrt(max(0.0, squares / count - mean * mean)), 4),
+            "min": round(low, 4),
+            "max": round(high, 4),
+        }
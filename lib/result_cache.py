@@ -0,0 +1,317 @@
+"""
+Result Cache Module for VerifyAI
+Content-addressed cache for model results, keyed by image hash and prompt version
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, Optional
+
+if TYPE_CHECKING:
+    import sqlite3
+
+
+class DiskCacheBackend:
+    """
+    File-per-entry cache shared by every process that points at the same
+    directory. Entries are sharded by key prefix and written atomically
+    (temp file + rename), so concurrent readers never see a partial entry.
+    """
+
+    def __init__(self, directory: str, ttl: float = 3600):
+        self.directory = directory
+        self.ttl = ttl
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the stored payload, or None if missing or expired"""
+        path = self._path(key)
+        try:
+            if self.ttl and time.time() - os.path.getmtime(path) > self.ttl:
+                os.remove(path)
+                return None
+            with open(path, 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def set(self, key: str, payload: bytes):
+        """Store a payload, replacing any previous entry"""
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+
+
+class SqliteCacheBackend:
+    """
+    Bounded LRU store in a local SQLite database in WAL mode, shared by
+    every process on the host (e.g. the workers of a prefork server).
+
+    WAL lets readers run alongside the single writer without locking each
+    other out, and a read only writes back its access time when the stored
+    one is more than touch_interval seconds old, so hot entries are read
+    without taking the write lock. Running totals of entries and bytes are
+    kept by triggers; a write that takes the store past max_entries or
+    max_bytes drops expired entries, then the least recently used ones.
+    Connections are per thread and per process, so the backend can be
+    created before a server forks its workers.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS entries (
+            key TEXT PRIMARY KEY,
+            payload BLOB NOT NULL,
+            size INTEGER NOT NULL,
+            stored_at REAL NOT NULL,
+            accessed_at REAL NOT NULL
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at);
+        CREATE TABLE IF NOT EXISTS totals (
+            id INTEGER PRIMARY KEY CHECK (id = 0),
+            entries INTEGER NOT NULL,
+            bytes INTEGER NOT NULL
+        );
+        INSERT OR IGNORE INTO totals VALUES (0, 0, 0);
+        CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries BEGIN
+            UPDATE totals SET entries = entries + 1, bytes = bytes + NEW.size;
+        END;
+        CREATE TRIGGER IF NOT EXISTS entries_update AFTER UPDATE OF size ON entries BEGIN
+            UPDATE totals SET bytes = bytes + NEW.size - OLD.size;
+        END;
+        CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE ON entries BEGIN
+            UPDATE totals SET entries = entries - 1, bytes = bytes - OLD.size;
+        END;
+    """
+
+    def __init__(self,
+                 path: str,
+                 ttl: float = 3600,
+                 max_entries: int = 100_000,
+                 max_bytes: int = 512 * 1024 * 1024,
+                 touch_interval: float = 60):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.touch_interval = touch_interval
+        self._local = threading.local()
+        self._evictions = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connection().executescript(self.SCHEMA)
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the stored payload, or None if missing or expired"""
+        import sqlite3
+        now = time.time()
+        try:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT payload, stored_at, accessed_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            payload, stored_at, accessed_at = row
+            if self.ttl and now - stored_at > self.ttl:
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                return None
+            if now - accessed_at > self.touch_interval:
+                conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            return payload
+        except sqlite3.Error:
+            return None
+
+    def set(self, key: str, payload: bytes):
+        """Store a payload, replacing any previous entry, and evict past the bounds"""
+        import sqlite3
+        now = time.time()
+        try:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT INTO entries VALUES (?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET "
+                    "payload = excluded.payload, size = excluded.size, "
+                    "stored_at = excluded.stored_at, accessed_at = excluded.accessed_at",
+                    (key, payload, len(payload), now, now)
+                )
+                self._evict(conn, now)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error:
+            pass
+
+    def stats(self) -> Dict:
+        import sqlite3
+        try:
+            entries, size = self._connection().execute("SELECT entries, bytes FROM totals").fetchone()
+        except sqlite3.Error:
+            entries, size = None, None
+        return {
+            "path": self.path,
+            "entries": entries,
+            "bytes": size,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "evictions": self._evictions
+        }
+
+    def _evict(self, conn: "sqlite3.Connection", now: float):
+        """Drop expired, then least recently used, entries until within the bounds"""
+        entries, size = conn.execute("SELECT entries, bytes FROM totals").fetchone()
+        if entries <= self.max_entries and size <= self.max_bytes:
+            return
+        if self.ttl:
+            self._evictions += conn.execute("DELETE FROM entries WHERE stored_at < ?", (now - self.ttl,)).rowcount
+            entries, size = conn.execute("SELECT entries, bytes FROM totals").fetchone()
+        while entries > self.max_entries or (size > self.max_bytes and entries > 1):
+            # Evict in batches so a full store does not pay for a delete on every write
+            batch = max(entries - self.max_entries, entries // 64, 1)
+            self._evictions += conn.execute(
+                "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY accessed_at LIMIT ?)", (batch,)
+            ).rowcount
+            entries, size = conn.execute("SELECT entries, bytes FROM totals").fetchone()
+
+    def _connection(self) -> "sqlite3.Connection":
+        """This thread's connection, reopened in a forked child"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            # Imported on first use to keep it off the cold-start path
+            import sqlite3
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA mmap_size=268435456")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+
+class ResultCache:
+    """
+    In-process LRU cache of JSON-serializable results with a TTL and
+    entry/byte bounds, optionally backed by a store shared across
+    processes (DiskCacheBackend or SqliteCacheBackend).
+
+    Values are stored serialized, so callers always get a fresh copy and
+    the byte bound reflects real memory use.
+    """
+
+    def __init__(self,
+                 max_entries: int = 1024,
+                 max_bytes: int = 64 * 1024 * 1024,
+                 ttl: float = 3600,
+                 disk_backend: DiskCacheBackend = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.disk_backend = disk_backend
+        self._entries = OrderedDict()  # key -> (expires_at, payload)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {
+            "hits": 0,
+            "misses": 0,
+            "disk_hits": 0,
+            "evictions": 0,
+            "expirations": 0
+        }
+
+    @staticmethod
+    def make_key(image_data: bytes, endpoint: str, prompt: str, model_name: str) -> str:
+        """Build a content-addressed key from the image bytes and request identity"""
+        digest = hashlib.sha256()
+        for part in (endpoint, model_name, prompt):
+            encoded = part.encode('utf-8')
+            digest.update(len(encoded).to_bytes(4, 'big'))
+            digest.update(encoded)
+        digest.update(hashlib.sha256(image_data).digest())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Return a cached result, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, payload = entry
+                if expires_at >= time.monotonic():
+                    self._entries.move_to_end(key)
+                    self._counters["hits"] += 1
+                    return json.loads(payload)
+                self._remove(key)
+                self._counters["expirations"] += 1
+
+        if self.disk_backend is not None:
+            payload = self.disk_backend.get(key)
+            if payload is not None:
+                with self._lock:
+                    self._store(key, payload)
+                    self._counters["hits"] += 1
+                    self._counters["disk_hits"] += 1
+                return json.loads(payload)
+
+        with self._lock:
+            self._counters["misses"] += 1
+        return None
+
+    def set(self, key: str, value: Dict):
+        """Cache a result"""
+        payload = json.dumps(value, separators=(',', ':')).encode('utf-8')
+        if len(payload) > self.max_bytes:
+            return
+        with self._lock:
+            self._store(key, payload)
+        if self.disk_backend is not None:
+            self.disk_backend.set(key, payload)
+
+    def stats(self) -> Dict:
+        """Return hit/miss/eviction counters and current size"""
+        shared = self.disk_backend.stats() if hasattr(self.disk_backend, "stats") else None
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                **self._counters,
+                "hit_rate": round(self._counters["hits"] / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "disk_enabled": self.disk_backend is not None,
+                "shared": shared
+            }
+
+    def clear(self):
+        """Drop every in-process entry"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _store(self, key: str, payload: bytes):
+        """Insert under the lock and evict least-recently-used entries"""
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time.monotonic() + self.ttl, payload)
+        self._bytes += len(payload)
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self._counters["evictions"] += 1
+
+    def _remove(self, key: str):
+        _, payload = self._entries.pop(key)
+        self._bytes -= len(payload)
@@ -0,0 +1,240 @@
+"""
+Semantic Cache Module for VerifyAI
+Similarity cache for text prompts: ideas are normalized and shingled, and
+MinHash/LSH finds earlier near-identical ideas whose results can be reused
+"""
+
+import re
+import json
+import time
+import struct
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from lib import metrics
+
+SEMANTIC_LOOKUPS = metrics.registry.counter(
+    "verifyai_semantic_cache_lookups_total",
+    "Semantic cache lookups by outcome (exact, similar, miss, or skipped for texts with no words)",
+    ("endpoint", "outcome")
+)
+
+# Words that do not change what an idea is about
+STOPWORDS = frozenset(
+    "a an the and or for of to in on with by from at as is are be that this it its "
+    "my our your their i we you they app platform startup idea like".split()
+)
+
+
+def normalize(text: str) -> List[str]:
+    """Lowercase words (in any script) without punctuation, stopwords or plural endings"""
+    words = re.findall(r"\w+", text.lower(), re.UNICODE)
+    tokens = []
+    for word in words:
+        if word in STOPWORDS:
+            continue
+        if len(word) > 4 and word.endswith("ies"):
+            word = word[:-3] + "y"
+        elif len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+            word = word[:-1]
+        tokens.append(word)
+    return tokens
+
+
+def shingles(text: str) -> FrozenSet[str]:
+    """Word unigrams and bigrams of the normalized text"""
+    tokens = normalize(text)
+    return frozenset(tokens) | frozenset(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    """Similarity of two shingle sets; an empty set resembles nothing"""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class MinHasher:
+    """
+    num_perm MinHash values of a shingle set. Each value is the minimum of
+    an independent 32-bit hash over the shingles; the hashes are the words
+    of salted BLAKE2b digests, 16 per digest.
+    """
+
+    HASHES_PER_DIGEST = 16
+
+    def __init__(self, num_perm: int = 64):
+        self.num_perm = num_perm
+        digests = -(-num_perm // self.HASHES_PER_DIGEST)
+        self._salts = [i.to_bytes(16, "little") for i in range(digests)]
+        self._unpack = struct.Struct(f"<{digests * self.HASHES_PER_DIGEST}I").unpack
+
+    def signature(self, shingle_set: FrozenSet[str]) -> Tuple[int, ...]:
+        if not shingle_set:
+            return (0xFFFFFFFF,) * self.num_perm
+        hashes = [
+            self._unpack(b"".join(
+                hashlib.blake2b(shingle.encode("utf-8"), digest_size=64, salt=salt).digest()
+                for salt in self._salts
+            ))
+            for shingle in shingle_set
+        ]
+        return tuple(map(min, zip(*hashes)))[:self.num_perm]
+
+
+class SemanticCache:
+    """
+    In-process LRU cache of JSON results keyed by text similarity.
+
+    Each text is reduced to a shingle set (normalize, then word unigrams
+    and bigrams) and a MinHash signature split into LSH bands; texts that
+    share a band are candidates, and a candidate is a hit when the exact
+    Jaccard similarity of the shingle sets reaches threshold. The band
+    layout is chosen so that pairs at the threshold almost always share a
+    band. Lookups are scoped (e.g. by model), and entries expire after ttl
+    seconds or are evicted least-recently-used past max_entries. Texts with
+    no words left after normalization (only stopwords or punctuation) are
+    neither looked up nor stored, since they cannot be told apart.
+    """
+
+    def __init__(self,
+                 threshold: float = 0.8,
+                 max_entries: int = 4096,
+                 ttl: float = 86400,
+                 num_perm: int = 64):
+        if not 0 < threshold <= 1:
+            raise ValueError("threshold must be in (0, 1]")
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hasher = MinHasher(num_perm)
+        self.bands, self.rows = self._band_layout(num_perm, threshold)
+        self._entries = OrderedDict()  # key -> (expires_at, scope, shingles, band keys, payload)
+        self._buckets = {}  # (scope, band, band values) -> set of keys
+        self._lock = threading.Lock()
+        self._counters = {
+            "hits": 0,
+            "similar_hits": 0,
+            "misses": 0,
+            "skipped": 0,
+            "evictions": 0,
+            "expirations": 0
+        }
+
+    def get(self, text: str, scope: str = "", endpoint: str = "") -> Optional[Tuple[Dict, float]]:
+        """Return (cached result, similarity) for the most similar cached text, or None"""
+        shingle_set = shingles(text)
+        if not shingle_set:
+            with self._lock:
+                self._counters["skipped"] += 1
+            SEMANTIC_LOOKUPS.inc(endpoint=endpoint, outcome="skipped")
+            return None
+        key = self._key(scope, shingle_set)
+        band_keys = self._band_keys(scope, shingle_set)
+        now = time.monotonic()
+        with self._lock:
+            candidates = {key} if key in self._entries else set()
+            for band_key in band_keys:
+                candidates |= self._buckets.get(band_key, set())
+
+            best, best_similarity = None, 0.0
+            for candidate in candidates:
+                expires_at, candidate_scope, candidate_shingles, _, _ = self._entries[candidate]
+                if expires_at < now:
+                    self._remove(candidate)
+                    self._counters["expirations"] += 1
+                    continue
+                if candidate_scope != scope:
+                    continue
+                similarity = jaccard(shingle_set, candidate_shingles)
+                if similarity >= self.threshold and similarity > best_similarity:
+                    best, best_similarity = candidate, similarity
+
+            if best is None:
+                self._counters["misses"] += 1
+                SEMANTIC_LOOKUPS.inc(endpoint=endpoint, outcome="miss")
+                return None
+            self._entries.move_to_end(best)
+            self._counters["hits"] += 1
+            exact = best == key
+            if not exact:
+                self._counters["similar_hits"] += 1
+            SEMANTIC_LOOKUPS.inc(endpoint=endpoint, outcome="exact" if exact else "similar")
+            return json.loads(self._entries[best][4]), round(best_similarity, 4)
+
+    def set(self, text: str, value: Dict, scope: str = ""):
+        """Cache a result for text"""
+        shingle_set = shingles(text)
+        if not shingle_set:
+            return
+        key = self._key(scope, shingle_set)
+        band_keys = self._band_keys(scope, shingle_set)
+        payload = json.dumps(value, separators=(',', ':')).encode('utf-8')
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, scope, shingle_set, band_keys, payload)
+            for band_key in band_keys:
+                self._buckets.setdefault(band_key, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self._counters["evictions"] += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                **self._counters,
+                "hit_rate": round(self._counters["hits"] / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "threshold": self.threshold,
+                "bands": self.bands,
+                "rows": self.rows
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def _band_keys(self, scope: str, shingle_set: FrozenSet[str]) -> List[Tuple]:
+        signature = self.hasher.signature(shingle_set)
+        return [
+            (scope, band, signature[band * self.rows:(band + 1) * self.rows])
+            for band in range(self.bands)
+        ]
+
+    def _remove(self, key: str):
+        _, _, _, band_keys, _ = self._entries.pop(key)
+        for band_key in band_keys:
+            bucket = self._buckets.get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band_key]
+
+    @staticmethod
+    def _key(scope: str, shingle_set: FrozenSet[str]) -> str:
+        """Identical shingle sets (same idea up to case, punctuation and stopwords) share a key"""
+        digest = hashlib.sha256(scope.encode("utf-8"))
+        for shingle in sorted(shingle_set):
+            digest.update(b"\0" + shingle.encode("utf-8"))
+        return digest.hexdigest()
+
+    @staticmethod
+    def _band_layout(num_perm: int, threshold: float) -> Tuple[int, int]:
+        """
+        (bands, rows) with bands * rows <= num_perm that gives a pair at the
+        threshold at least a 99% chance of sharing a band, with as many rows
+        per band (fewer false candidates) as that allows
+        """
+        best = (num_perm, 1)
+        for rows in range(1, num_perm + 1):
+            bands = num_perm // rows
+            if 1 - (1 - threshold ** rows) ** bands >= 0.99:
+                best = (bands, rows)
+        return best
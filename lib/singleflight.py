@@ -0,0 +1,98 @@
+"""
+Single-Flight Module for VerifyAI
+Coalesces concurrent identical requests onto one in-progress model call
+"""
+
+import copy
+import threading
+from typing import Callable, Dict, Tuple
+
+
+class _Call:
+    """One in-progress call and the callers waiting on it"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time. Callers that arrive while a call
+    for the same key is in progress wait for it and receive a copy of its
+    result (or its exception) instead of starting their own.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._counters = {"calls": 0, "coalesced": 0}
+
+    def do(self, key: str, func: Callable) -> Tuple[object, bool]:
+        """Return (result, shared), where shared is True for coalesced callers"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self._counters["coalesced"] += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self._counters["calls"] += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result), True
+
+        try:
+            call.result = func()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        # Waiters copy the shared result, so the leader may keep the original
+        return (copy.deepcopy(call.result) if call.waiters else call.result), False
+
+    def stats(self) -> Dict:
+        """Return call and coalescing counters"""
+        with self._lock:
+            return {**self._counters, "in_flight": len(self._calls)}
+
+
+class AsyncSingleFlight:
+    """SingleFlight for coroutines running on one event loop"""
+
+    def __init__(self):
+        self._calls = {}
+        self._counters = {"calls": 0, "coalesced": 0}
+
+    async def do(self, key: str, func: Callable) -> Tuple[object, bool]:
+        """Await func() once per key; return (result, shared)"""
+        # Imported here so WSGI workers never load asyncio
+        import asyncio
+        future = self._calls.get(key)
+        if future is not None:
+            self._counters["coalesced"] += 1
+            # Shield so one waiter disconnecting does not cancel the shared call
+            result = await asyncio.shield(future)
+            return copy.deepcopy(result), True
+
+        future = asyncio.ensure_future(func())
+        self._calls[key] = future
+        self._counters["calls"] += 1
+        future.add_done_callback(lambda _: self._calls.pop(key, None))
+        result = await asyncio.shield(future)
+        return copy.deepcopy(result), False
+
+    def stats(self) -> Dict:
+        """Return call and coalescing counters"""
+        return {**self._counters, "in_flight": len(self._calls)}
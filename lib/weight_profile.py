@@ -0,0 +1,67 @@
+"""
+Weight Profile Module for VerifyAI
+Weights and thresholds shared by the scalar bio-authenticity scoring and its
+vectorized re-scoring in lib/batch_scoring.py
+"""
+
+from typing import Dict
+
+
+class WeightProfile:
+    """
+    Weights and thresholds of the bio-authenticity scoring. The defaults are
+    the ones calculate_true_age_vs_apparent_age and build_report use, so
+    scoring with DEFAULT_PROFILE reproduces stored reports. Kept free of
+    NumPy so the scalar scoring can read it without importing the
+    vectorized one.
+    """
+
+    FIELDS = {
+        # Apparent age: feature weights, years each feature can add, and the floor
+        "skin_weight": 0.35,
+        "eye_weight": 0.35,
+        "dental_weight": 0.30,
+        "wrinkle_max_years": 60,
+        "eye_max_years": 50,
+        "dental_max_years": 40,
+        "base_age": 18,
+        # True age: filter impact weights and the years filters can hide
+        "skin_filter_weight": 0.4,
+        "eye_filter_weight": 0.35,
+        "dental_filter_weight": 0.25,
+        "filter_max_years": 15,
+        # Age manipulation: (threshold, points) per signal
+        "skin_filter_threshold": 60,
+        "skin_filter_points": 30,
+        "eye_filter_threshold": 50,
+        "eye_filter_points": 25,
+        "dental_filter_threshold": 60,
+        "dental_filter_points": 20,
+        "stated_age_tolerance": 10,
+        "stated_age_points": 15,
+        "manipulated_threshold": 50,
+        # Confidence: high below the first manipulation score, medium below the second, else low
+        "confidence_high_below": 30,
+        "confidence_medium_below": 60,
+        "confidence_high": 85,
+        "confidence_medium": 70,
+        "confidence_low": 55,
+        # Overall authenticity
+        "skin_authenticity_weight": 0.35,
+        "eye_authenticity_weight": 0.35,
+        "dental_authenticity_weight": 0.30,
+        "authentic_threshold": 65,
+    }
+
+    def __init__(self, **overrides):
+        unknown = set(overrides) - set(self.FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown weight profile fields: {', '.join(sorted(unknown))}")
+        for name, default in self.FIELDS.items():
+            setattr(self, name, overrides.get(name, default))
+
+    def to_dict(self) -> Dict:
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+
+DEFAULT_PROFILE = WeightProfile()